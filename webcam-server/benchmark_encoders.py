@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark encoder frame: waktu encode, ukuran per frame, dan biaya decode di client
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server"))
+
+from encoders import (  # noqa: E402
+    ENCODER_FORMATS, OpenCVJpegEncoder, SimpleJpegEncoder, get_encoder, simplejpeg
+)
+
+RESOLUTIONS = ((640, 480), (1280, 720), (1920, 1080))
+QUALITY = 80
+
+
+def make_sample_frame(width: int, height: int, seed: int = 0) -> np.ndarray:
+    """
+    Frame sintetis mirip gambar kamera: gradient halus, bentuk, dan noise sensor
+    """
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 1, width, dtype=np.float32)
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    frame = np.empty((height, width, 3), np.float32)
+    frame[..., 0] = 60 + 120 * x
+    frame[..., 1] = 80 + 100 * y
+    frame[..., 2] = 140 + 60 * x * y
+
+    for _ in range(12):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        radius = int(rng.integers(height // 20, height // 5))
+        color = tuple(float(c) for c in rng.integers(0, 256, 3))
+        cv2.circle(frame, center, radius, color, -1, cv2.LINE_AA)
+
+    frame = cv2.GaussianBlur(frame, (0, 0), 1.5)
+    frame += rng.normal(0, 4, frame.shape).astype(np.float32)
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def load_frames(paths: list) -> list:
+    """
+    Siapkan sample frame: gambar dari argumen (di-resize ke setiap resolusi) atau frame sintetis
+
+    Returns:
+        List tuple (label, frame)
+    """
+    frames = []
+    for width, height in RESOLUTIONS:
+        if paths:
+            for path in paths:
+                image = cv2.imread(path, cv2.IMREAD_COLOR)
+                if image is None:
+                    print(f"⚠️  Cannot read {path}")
+                    continue
+                frames.append((f"{os.path.basename(path)} {width}x{height}",
+                               cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)))
+        else:
+            frames.append((f"synthetic {width}x{height}", make_sample_frame(width, height)))
+    return frames
+
+
+def get_backends() -> list:
+    """
+    Semua backend yang tersedia, termasuk varian flag JPEG OpenCV
+
+    Returns:
+        List tuple (nama, encoder, format)
+    """
+    backends = [
+        ("jpeg opencv", OpenCVJpegEncoder(False, False, "420"), "jpeg"),
+        ("jpeg opencv optimize", OpenCVJpegEncoder(True, False, "420"), "jpeg"),
+        ("jpeg opencv progressive", OpenCVJpegEncoder(False, True, "420"), "jpeg"),
+        ("jpeg opencv 444", OpenCVJpegEncoder(False, False, "444"), "jpeg"),
+    ]
+    if simplejpeg is not None:
+        backends.append(("jpeg simplejpeg", SimpleJpegEncoder("420"), "jpeg"))
+    for fmt in ENCODER_FORMATS:
+        if fmt != "jpeg":
+            backends.append((fmt, get_encoder(fmt), fmt))
+    return backends
+
+
+def decode(data: bytes, fmt: str, width: int, height: int) -> np.ndarray:
+    """
+    Decode seperti yang dilakukan client
+    """
+    if fmt == "bgr":
+        return np.frombuffer(data, np.uint8).reshape(height, width, 3)
+    if fmt == "rgba":
+        return np.frombuffer(data, np.uint8).reshape(height, width, 4)
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+def measure(fn, iterations: int) -> float:
+    """
+    Rata-rata durasi fn dalam ms
+    """
+    fn()  # Warm-up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) * 1000.0 / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark frame encoder backends")
+    parser.add_argument("images", nargs="*", help="Sample images (default: synthetic frames)")
+    parser.add_argument("--iterations", type=int, default=30, help="Iterations per measurement")
+    parser.add_argument("--quality", type=int, default=QUALITY, help="Quality for lossy formats")
+    args = parser.parse_args()
+
+    backends = get_backends()
+    if simplejpeg is None:
+        print("ℹ️  simplejpeg not installed; skipping libjpeg-turbo backend")
+
+    for label, frame in load_frames(args.images):
+        height, width = frame.shape[:2]
+        print(f"\n{label} (raw {frame.nbytes / 1024:.0f} KB)")
+        print(f"{'backend':<24} | {'encode ms':>9} | {'KB/frame':>9} | {'decode ms':>9} | {'PSNR dB':>7}")
+
+        for name, encoder, fmt in backends:
+            data = encoder.encode(frame, args.quality)
+            encode_ms = measure(lambda: encoder.encode(frame, args.quality), args.iterations)
+            decode_ms = measure(lambda: decode(data, fmt, width, height), args.iterations)
+
+            decoded = decode(data, fmt, width, height)
+            if decoded.shape[2] == 4:
+                decoded = cv2.cvtColor(decoded, cv2.COLOR_RGBA2BGR)
+            psnr = cv2.PSNR(frame, decoded)
+            psnr_text = "inf" if psnr >= 100 else f"{psnr:.1f}"
+
+            print(f"{name:<24} | {encode_ms:>9.2f} | {len(data) / 1024:>9.1f} | "
+                  f"{decode_ms:>9.2f} | {psnr_text:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark untuk hat overlay: blending float lama vs compositing uint8 in-place
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server"))
+
+from head_detector import HeadDetector  # noqa: E402
+
+FRAME_WIDTH, FRAME_HEIGHT = 1280, 720
+HEAD_SIZE = 120
+ITERATIONS = 200
+
+
+def legacy_overlay_hat(hat_img: np.ndarray, frame: np.ndarray, x: int, y: int, w: int, h: int) -> np.ndarray:
+    """
+    Implementasi overlay sebelum sprite cache (resize + blending float64 setiap frame)
+    """
+    hat_width = int(w * 1.5)
+    hat_height = int(h * 1.5)
+    hat_resized = cv2.resize(hat_img, (hat_width, hat_height))
+
+    hat_x = max(0, int(x + (w - hat_width) / 2))
+    hat_y = max(0, int(y - hat_height * 0.6))
+    hat_x_end = min(frame.shape[1], hat_x + hat_width)
+    hat_y_end = min(frame.shape[0], hat_y + hat_height)
+    valid_hat_width = hat_x_end - hat_x
+    valid_hat_height = hat_y_end - hat_y
+    if valid_hat_width <= 0 or valid_hat_height <= 0:
+        return frame
+
+    hat_bgr = hat_resized[:valid_hat_height, :valid_hat_width, :3]
+    hat_alpha = hat_resized[:valid_hat_height, :valid_hat_width, 3:4] / 255.0
+    frame_roi = frame[hat_y:hat_y_end, hat_x:hat_x_end]
+    frame[hat_y:hat_y_end, hat_x:hat_x_end] = (
+        hat_bgr * hat_alpha + frame_roi * (1 - hat_alpha)
+    ).astype(np.uint8)
+    return frame
+
+
+def make_heads(count: int) -> list:
+    """
+    Buat posisi kepala dalam grid yang tersebar di frame
+    """
+    columns = int(np.ceil(np.sqrt(count)))
+    rows = int(np.ceil(count / columns))
+    step_x = FRAME_WIDTH // columns
+    step_y = FRAME_HEIGHT // rows
+    heads = []
+    for i in range(count):
+        x = (i % columns) * step_x + (step_x - HEAD_SIZE) // 2
+        y = (i // columns) * step_y + (step_y - HEAD_SIZE) // 2
+        heads.append((x, y, HEAD_SIZE, HEAD_SIZE))
+    return heads
+
+
+def run(overlay, frame: np.ndarray, heads: list) -> tuple:
+    """
+    Jalankan overlay untuk semua kepala, ukur waktu per frame dan peak alokasi Python/numpy
+
+    Returns:
+        Tuple (ms per frame, peak bytes teralokasi per frame)
+    """
+    # Warm-up (mengisi sprite cache)
+    for (x, y, w, h) in heads:
+        overlay(frame, x, y, w, h)
+
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        for (x, y, w, h) in heads:
+            overlay(frame, x, y, w, h)
+    elapsed_ms = (time.perf_counter() - start) * 1000.0 / ITERATIONS
+
+    tracemalloc.start()
+    for (x, y, w, h) in heads:
+        overlay(frame, x, y, w, h)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed_ms, peak
+
+
+def main():
+    detector = HeadDetector()
+    if detector.current_hat is None:
+        print("❌ No hat images found")
+        return
+
+    hat_img = detector.current_hat["image"]
+    frame = np.random.default_rng(0).integers(0, 256, (FRAME_HEIGHT, FRAME_WIDTH, 3), dtype=np.uint8)
+
+    print(f"Frame {FRAME_WIDTH}x{FRAME_HEIGHT}, head {HEAD_SIZE}px, {ITERATIONS} iterations")
+    print(f"{'heads':>5} | {'legacy ms':>10} {'legacy alloc':>13} | {'in-place ms':>11} {'in-place alloc':>15} | speedup")
+
+    for count in (1, 4, 16):
+        heads = make_heads(count)
+        legacy_ms, legacy_peak = run(
+            lambda f, x, y, w, h: legacy_overlay_hat(hat_img, f, x, y, w, h), frame.copy(), heads
+        )
+        new_ms, new_peak = run(detector.overlay_hat, frame.copy(), heads)
+        print(f"{count:>5} | {legacy_ms:>10.3f} {legacy_peak / 1024:>11.1f}KB | "
+              f"{new_ms:>11.3f} {new_peak / 1024:>13.1f}KB | {legacy_ms / new_ms:>6.1f}x")
+
+    print(f"Sprite cache: {detector.sprite_cache.get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
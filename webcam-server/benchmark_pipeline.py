@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Benchmark pipeline end-to-end tanpa webcam: timing per-stage (resize, grayscale,
+deteksi, overlay, encode, send) per resolusi, tipe cascade, dan jumlah kepala.
+
+Contoh:
+    python benchmark_pipeline.py --output before.json
+    python benchmark_pipeline.py --output after.json --compare before.json
+    python benchmark_pipeline.py --source video --source-path sample.mp4 --cascades haar_biwi
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+
+import cv2
+import numpy as np
+import websockets
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server"))
+
+from camera import Camera  # noqa: E402
+from config import (JPEG_QUALITY, DETECTION_MODE, DETECTION_BACKEND, DETECTION_MAX_DIMENSION,  # noqa: E402
+                    IDLE_RELEASE_DELAY)
+from encoders import ENCODER_FORMATS, get_encoder  # noqa: E402
+from frame_sources import create_frame_source  # noqa: E402
+from head_detector import HeadDetector  # noqa: E402
+from pipeline import FramePipeline  # noqa: E402
+
+STAGES = ("resize", "gray", "detect", "overlay", "encode", "send")
+RESOLUTIONS = ("640x480", "1280x720", "1920x1080")
+CASCADES = (HeadDetector.CASCADE_HAAR_BIWI, HeadDetector.CASCADE_LBP_BIWI, HeadDetector.CASCADE_OPENCV_DEFAULT)
+HEAD_COUNTS = (0, 1, 2, 4)
+NATIVE_RESOLUTION = "1920x1080"  # Resolusi "sensor" sumber sintetis sebelum resize
+
+
+def parse_resolution(text: str) -> tuple:
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def summarize(values: list) -> dict:
+    """
+    Ringkasan distribusi durasi (ms)
+    """
+    if not values:
+        return {"mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    data = np.asarray(values, dtype=np.float64)
+    p50, p95, p99 = np.percentile(data, (50, 95, 99))
+    return {
+        "mean": round(float(data.mean()), 3),
+        "p50": round(float(p50), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3),
+        "max": round(float(data.max()), 3)
+    }
+
+
+class LoopbackSender:
+    """
+    Koneksi WebSocket localhost sungguhan untuk mengukur stage send; server
+    penerima hanya membuang pesan
+    """
+
+    async def start(self):
+        async def drain(websocket):
+            async for _ in websocket:
+                pass
+
+        self.server = await websockets.serve(drain, "127.0.0.1", 0, max_size=None)
+        port = next(iter(self.server.sockets)).getsockname()[1]
+        self.client = await websockets.connect(f"ws://127.0.0.1:{port}", max_size=None)
+
+    async def send(self, payload: bytes):
+        await self.client.send(payload)
+
+    async def close(self):
+        await self.client.close()
+        self.server.close()
+        await self.server.wait_closed()
+
+
+def open_source(args, heads: int, native: tuple):
+    """
+    Buka sumber frame tanpa pacing (frame dibaca secepat mungkin)
+    """
+    if args.source == "synthetic":
+        source = create_frame_source("synthetic", fps=args.fps, heads=heads, seed=args.seed)
+    else:
+        source = create_frame_source(args.source, args.source_path, fps=args.fps)
+    source.pace = False
+    if not source.open(*native):
+        raise SystemExit(f"❌ Cannot open {args.source} source")
+    return source
+
+
+async def run_case(args, detector: HeadDetector, sender: LoopbackSender,
+                   resolution: str, cascade: str, heads) -> dict:
+    """
+    Jalankan satu kombinasi resolusi/cascade/jumlah kepala secara berurutan per frame
+
+    Returns:
+        Dictionary hasil (timing per-stage dan throughput)
+    """
+    width, height = parse_resolution(resolution)
+    detector.set_cascade(cascade)
+    detector.set_detection_mode(args.detection_mode)  # Reset state tracking
+    encoder = get_encoder(args.format)
+    source = open_source(args, heads or 0, parse_resolution(args.native_resolution))
+
+    timings = {stage: [] for stage in STAGES}
+    totals = []
+    detected = []
+    payload_bytes = []
+
+    try:
+        for index in range(args.warmup + args.frames):
+            ok, frame = source.read()
+            if not ok:
+                break
+
+            t0 = time.perf_counter()
+            if frame.shape[1] != width or frame.shape[0] != height:
+                frame = cv2.resize(frame, (width, height))
+            t1 = time.perf_counter()
+            gray, scale = detector.prepare_gray(frame)
+            t2 = time.perf_counter()
+            found = detector.detect_heads_gray(gray, scale)
+            t3 = time.perf_counter()
+            frame = detector.draw_heads(frame, found)
+            t4 = time.perf_counter()
+            payload = encoder.encode(frame, args.quality)
+            t5 = time.perf_counter()
+            await sender.send(payload)
+            t6 = time.perf_counter()
+
+            if index < args.warmup:
+                continue
+            for stage, start, end in zip(STAGES, (t0, t1, t2, t3, t4, t5), (t1, t2, t3, t4, t5, t6)):
+                timings[stage].append((end - start) * 1000.0)
+            totals.append((t6 - t0) * 1000.0)
+            detected.append(len(found))
+            payload_bytes.append(len(payload))
+    finally:
+        source.release()
+
+    total = summarize(totals)
+    return {
+        "resolution": resolution,
+        "cascade": cascade,
+        "heads": heads,
+        "frames": len(totals),
+        "detected_heads_avg": round(float(np.mean(detected)), 3) if detected else 0.0,
+        "payload_kb_avg": round(float(np.mean(payload_bytes)) / 1024.0, 1) if payload_bytes else 0.0,
+        "throughput_fps": round(1000.0 / total["mean"], 1) if total["mean"] else 0.0,
+        "total": total,
+        "stages": {stage: summarize(values) for stage, values in timings.items()}
+    }
+
+
+async def measure_wake(camera: Camera, variant: tuple, state: str, timeout: float) -> float:
+    """
+    Lepas client sampai pipeline mencapai state idle yang diminta, daftarkan
+    lagi, dan ukur waktu sampai frame segar pertama terbit
+
+    Returns:
+        Time-to-first-frame dalam ms, atau None jika state / frame tidak tercapai
+    """
+    camera.remove_stream_client(variant)
+    deadline = time.perf_counter() + timeout
+    while camera.idle_state != state and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+    reached = camera.idle_state == state
+
+    wakeups = camera.publisher.wakeups
+    camera.add_stream_client(variant)
+    if not reached:
+        return None
+
+    last_seq = camera.publisher.seq
+    deadline = time.perf_counter() + timeout
+    while camera.publisher.wakeups == wakeups and time.perf_counter() < deadline:
+        try:
+            packet = await asyncio.wait_for(camera.publisher.wait_for_frame(last_seq), 1.0)
+        except asyncio.TimeoutError:
+            continue
+        last_seq = packet.seq
+    if camera.publisher.wakeups == wakeups:
+        return None
+    return camera.publisher.last_time_to_first_frame_ms
+
+
+async def run_end_to_end(args, resolution: str, heads: int) -> dict:
+    """
+    Jalankan Camera + FramePipeline (thread capture/detect/encode) dengan sumber
+    sintetis ber-pacing dan ukur frame yang dipublikasikan, lalu time-to-first-frame
+    setelah idle
+
+    Returns:
+        Dictionary hasil (FPS terpublikasi, latency capture->publish, timing stage,
+        time-to-first-frame per state idle)
+    """
+    width, height = parse_resolution(resolution)
+    source = create_frame_source("synthetic", fps=args.fps, heads=heads, seed=args.seed)
+    camera = Camera(source=source)
+    camera.set_resolution(width, height)
+    if not await camera.initialize():
+        raise SystemExit("❌ Cannot initialize camera")
+
+    # Tanpa client terdaftar pipeline langsung idle (IDLE_WHEN_NO_CLIENTS)
+    variant = (Camera.STREAM_OVERLAY, args.format, args.quality, 1.0)
+    camera.add_stream_client(variant)
+    task = asyncio.create_task(camera.start_capture_loop())
+    latency, detect_ms, overlay_ms, encode_ms = [], [], [], []
+    last_seq = 0
+    wake_ms = {}
+    try:
+        start = time.perf_counter()
+        while time.perf_counter() - start < args.e2e_seconds:
+            try:
+                packet = await asyncio.wait_for(camera.publisher.wait_for_frame(last_seq), 1.0)
+            except asyncio.TimeoutError:
+                continue
+            last_seq = packet.seq
+            latency.append((time.time() - packet.capture_ts) * 1000.0)
+            detect_ms.append(packet.detect_ms)
+            overlay_ms.append(packet.overlay_ms)
+            encode_ms.append(packet.encode_ms)
+        elapsed = time.perf_counter() - start
+        pipeline_stats = camera.pipeline.get_stats() if camera.pipeline else {}
+
+        wake_ms["idle"] = await measure_wake(camera, variant, FramePipeline.STATE_IDLE, 5.0)
+        if args.wake_released:
+            wake_ms["released"] = await measure_wake(camera, variant, FramePipeline.STATE_RELEASED,
+                                                     IDLE_RELEASE_DELAY + 5.0)
+    finally:
+        camera.remove_stream_client(variant)
+        await camera.stop()
+        task.cancel()
+
+    return {
+        "resolution": resolution,
+        "heads": heads,
+        "source_fps": args.fps,
+        "published_fps": round(len(latency) / elapsed, 1),
+        "latency": summarize(latency),
+        "stages": {
+            "detect": summarize(detect_ms),
+            "overlay": summarize(overlay_ms),
+            "encode": summarize(encode_ms)
+        },
+        "dropped": {
+            "detect_queue": pipeline_stats.get("detect", {}).get("queue", {}).get("dropped", 0),
+            "encode_queue": pipeline_stats.get("encode", {}).get("queue", {}).get("dropped", 0)
+        },
+        "time_to_first_frame_ms": wake_ms
+    }
+
+
+def print_case(result: dict):
+    stages = " ".join(f"{stage}={result['stages'][stage]['p50']:.2f}/{result['stages'][stage]['p99']:.2f}"
+                      for stage in STAGES)
+    heads = "rec" if result["heads"] is None else result["heads"]
+    print(f"{result['resolution']:>9} {result['cascade']:<14} heads={heads:<3} "
+          f"found={result['detected_heads_avg']:<5} {result['throughput_fps']:>6.1f} fps | "
+          f"p50/p99 ms {stages}", flush=True)
+
+
+def compare(results: dict, baseline_path: str):
+    """
+    Cetak perubahan p50 total dan per-stage dibanding hasil sebelumnya
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    def key(run):
+        return run["resolution"], run["cascade"], run["heads"]
+
+    previous = {key(run): run for run in baseline.get("runs", [])}
+    print(f"\nComparison with {baseline_path} (p50 ms, negative = faster)")
+    for run in results["runs"]:
+        old = previous.get(key(run))
+        if old is None:
+            continue
+        deltas = []
+        for stage in ("total",) + STAGES:
+            new_value = run["total"]["p50"] if stage == "total" else run["stages"][stage]["p50"]
+            old_value = old["total"]["p50"] if stage == "total" else old["stages"][stage]["p50"]
+            percent = (new_value - old_value) / old_value * 100.0 if old_value else 0.0
+            deltas.append(f"{stage} {new_value - old_value:+.2f} ({percent:+.0f}%)")
+        print(f"{run['resolution']:>9} {run['cascade']:<14} heads={run['heads']}: " + ", ".join(deltas))
+
+
+async def main_async(args):
+    detector = HeadDetector()
+    cascades = [c for c in args.cascades if c in detector.cascades]
+    missing = set(args.cascades) - set(cascades)
+    if missing:
+        print(f"⚠️  Cascades not available, skipped: {', '.join(sorted(missing))}")
+
+    head_counts = args.heads if args.source == "synthetic" else [None]
+    sender = LoopbackSender()
+    await sender.start()
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "cpu_count": os.cpu_count(),
+            "source": args.source,
+            "source_path": args.source_path,
+            "native_resolution": args.native_resolution,
+            "format": args.format,
+            "quality": args.quality,
+            "detection_mode": args.detection_mode,
+            "detection_max_dimension": DETECTION_MAX_DIMENSION,
+            "detection_backend": DETECTION_BACKEND,
+            "frames": args.frames,
+            "warmup": args.warmup
+        },
+        "runs": [],
+        "end_to_end": []
+    }
+
+    try:
+        for resolution in args.resolutions:
+            for cascade in cascades:
+                for heads in head_counts:
+                    result = await run_case(args, detector, sender, resolution, cascade, heads)
+                    results["runs"].append(result)
+                    print_case(result)
+    finally:
+        await sender.close()
+
+    if args.e2e_seconds > 0 and args.source == "synthetic":
+        for resolution in args.resolutions:
+            result = await run_end_to_end(args, resolution, max(head_counts))
+            results["end_to_end"].append(result)
+            print(f"{resolution:>9} end-to-end: {result['published_fps']} fps published, "
+                  f"capture->publish p50 {result['latency']['p50']:.1f} ms / p99 {result['latency']['p99']:.1f} ms, "
+                  "first frame after " + ", ".join(f"{state} {ms} ms" for state, ms in
+                                                   result["time_to_first_frame_ms"].items()),
+                  flush=True)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless per-stage pipeline benchmark")
+    parser.add_argument("--source", choices=("synthetic", "video", "images"), default="synthetic")
+    parser.add_argument("--source-path", default="", help="Video file or image directory (recorded frames)")
+    parser.add_argument("--native-resolution", default=NATIVE_RESOLUTION,
+                        help="Resolution produced by the source before the resize stage")
+    parser.add_argument("--resolutions", nargs="+", default=list(RESOLUTIONS))
+    parser.add_argument("--cascades", nargs="+", default=list(CASCADES))
+    parser.add_argument("--heads", nargs="+", type=int, default=list(HEAD_COUNTS),
+                        help="Head counts for the synthetic source")
+    parser.add_argument("--frames", type=int, default=60, help="Measured frames per case")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured frames per case")
+    parser.add_argument("--fps", type=float, default=30, help="Source frame rate (synthetic timeline)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=ENCODER_FORMATS, default="jpeg")
+    parser.add_argument("--quality", type=int, default=JPEG_QUALITY)
+    parser.add_argument("--detection-mode", choices=HeadDetector.DETECTION_MODES, default=DETECTION_MODE)
+    parser.add_argument("--e2e-seconds", type=float, default=5.0,
+                        help="Seconds of threaded Camera pipeline per resolution (0 = skip)")
+    parser.add_argument("--wake-released", action="store_true",
+                        help="Also measure first frame after the source is released "
+                             f"(waits IDLE_RELEASE_DELAY = {IDLE_RELEASE_DELAY:.0f}s per resolution)")
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    parser.add_argument("--compare", help="Previous JSON results to compare against")
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Results written to {args.output}")
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
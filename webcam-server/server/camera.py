@@ -3,76 +3,101 @@ Camera module untuk menangkap dan mengolah video dari webcam
 """
 
 import asyncio
-import cv2
-import numpy as np
+from collections import Counter
 import logging
-from typing import Optional, Tuple
+import threading
+import time
+from typing import Optional
 from config import (
     CAMERA_INDEX, DEFAULT_WIDTH, DEFAULT_HEIGHT, 
-    JPEG_QUALITY, CAMERA_LOOP_DELAY
+    JPEG_QUALITY, DEFAULT_FORMAT, DETECTION_BACKEND, DEFAULT_CAMERA_NAME,
+    DETECTION_WORKERS, DETECTION_RING_SLOTS
 )
 from head_detector import HeadDetector
+from detection_pool import DetectionPool
+from frame_sources import FrameSource, create_frame_source
+from metrics import METRICS
+from pipeline import FramePipeline, FramePacket
+from publisher import FramePublisher
 
 class Camera:
     """
     Class untuk mengelola webcam dan encoding frame
     """
     
-    def __init__(self, camera_index: int = CAMERA_INDEX):
+    # Stream modes
+    STREAM_OVERLAY = "overlay"  # Topi dan bounding box digambar di server
+    STREAM_RAW = "raw"  # Frame bersih + pesan deteksi, compositing di client
+    STREAM_MODES = (STREAM_OVERLAY, STREAM_RAW)
+    
+    def __init__(self, camera_index: int = CAMERA_INDEX, source: Optional[FrameSource] = None,
+                 name: str = DEFAULT_CAMERA_NAME, detection_workers: int = DETECTION_WORKERS):
         """
         Initialize camera
         
         Args:
             camera_index: Index kamera (default 0)
+            source: Sumber frame (default: sesuai FRAME_SOURCE di config)
+            name: Nama kamera (dipakai client untuk memilih sumber)
+            detection_workers: Jumlah worker process deteksi untuk backend "process"
+                (dibagi dengan kamera lain oleh server)
         """
+        self.name = name
         self.camera_index = camera_index
-        self.cap = None
-        self.latest_frame = None
+        self.source = source if source is not None else create_frame_source(camera_index=camera_index)
+        self.cap = None  # Sumber frame yang sedang terbuka (dibaca oleh capture thread)
+        self.publisher = FramePublisher()
+        self.stream_demand = Counter()  # (stream mode, format, kualitas, skala) -> jumlah client
+        self.demand_event = threading.Event()  # Set selama ada client (pipeline idle jika tidak)
         self.frame_lock = asyncio.Lock()
         self.is_running = False
+        self.pipeline = None
+        self._stopped = None
         self.width = DEFAULT_WIDTH
         self.height = DEFAULT_HEIGHT
         self.jpeg_quality = JPEG_QUALITY
         
-        # Head detection
+        # Head detection (cascade dan topi dibagi dengan kamera lain)
         self.head_detector = HeadDetector()
+        self.detection_pool = None
+        self.detection_workers = max(1, detection_workers)
         
         self.logger = logging.getLogger(__name__)
         
     async def initialize(self) -> bool:
         """
-        Initialize kamera
+        Initialize kamera (buka sumber frame)
         
         Returns:
             True jika berhasil, False jika gagal
         """
         try:
-            self.cap = cv2.VideoCapture(self.camera_index)
-            
-            if not self.cap.isOpened():
-                self.logger.error(f"Cannot open camera {self.camera_index}")
+            if not self.source.open(self.width, self.height):
+                self.source.release()
                 return False
-                
-            # Set resolusi
-            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
-            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
             
             # Test capture
-            ret, frame = self.cap.read()
+            ret, frame = self.source.read()
             if not ret:
-                self.logger.error("Cannot read from camera")
+                self.logger.error(f"Cannot read from {self.source.kind} source ({self.name})")
+                self.source.release()
                 return False
-                
-            self.logger.info(f"Camera initialized successfully: {self.width}x{self.height}")
+            
+            self.cap = self.source
+            self.logger.info(f"Camera {self.name} initialized successfully ({self.source.kind}): {self.width}x{self.height}")
             return True
             
         except Exception as e:
-            self.logger.error(f"Failed to initialize camera: {e}")
+            self.logger.error(f"Failed to initialize camera {self.name}: {e}")
             return False
     
     async def start_capture_loop(self):
         """
-        Mulai loop untuk menangkap frame dari kamera
+        Mulai pipeline capture/detect/encode di thread terpisah.
+
+        Event loop hanya menerima buffer JPEG yang sudah jadi melalui
+        `_on_frame_encoded`, sehingga broadcast, ping, dan pesan config
+        tidak terblokir oleh pemrosesan frame.
         """
         if self.cap is None:
             self.logger.error("Camera not initialized")
@@ -81,37 +106,69 @@ class Camera:
         self.is_running = True
         self.logger.info("Starting camera capture loop")
         
-        while self.is_running:
-            try:
-                ret, frame = self.cap.read()
-                
-                if not ret:
-                    self.logger.warning("Failed to read frame from camera")
-                    await asyncio.sleep(CAMERA_LOOP_DELAY)
-                    continue
-                
-                # Resize frame jika perlu
-                if frame.shape[1] != self.width or frame.shape[0] != self.height:
-                    frame = cv2.resize(frame, (self.width, self.height))
-                
-                # Apply head detection dan hat overlay jika diaktifkan
-                processed_frame = frame
-                if self.head_detector.enabled:
-                    processed_frame, _ = self.head_detector.process_frame(frame)
-                
-                # Encode ke JPEG
-                encode_params = [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
-                ret, jpeg_frame = cv2.imencode('.jpg', processed_frame, encode_params)
-                
-                if ret:
-                    async with self.frame_lock:
-                        self.latest_frame = jpeg_frame.tobytes()
-                
-                await asyncio.sleep(CAMERA_LOOP_DELAY)
-                
-            except Exception as e:
-                self.logger.error(f"Error in capture loop: {e}")
-                await asyncio.sleep(CAMERA_LOOP_DELAY)
+        if DETECTION_BACKEND == "process" and self.detection_pool is None:
+            slots = max(self.detection_workers, DETECTION_RING_SLOTS * self.detection_workers // DETECTION_WORKERS)
+            self.detection_pool = DetectionPool(self.head_detector.cascade_paths,
+                                                self.detection_workers, slots)
+            self.detection_pool.start()
+        
+        loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        self.pipeline = FramePipeline(
+            self,
+            lambda packet: loop.call_soon_threadsafe(self._on_frame_encoded, packet)
+        )
+        self.pipeline.start()
+        
+        try:
+            await self._stopped.wait()
+        finally:
+            self.pipeline.stop()
+    
+    def release_source(self):
+        """
+        Lepas sumber frame selama tidak ada client (dipanggil capture thread)
+        """
+        cap, self.cap = self.cap, None
+        if cap is not None:
+            cap.release()
+    
+    def reopen_source(self) -> bool:
+        """
+        Buka ulang sumber frame yang dilepas saat idle (dipanggil capture thread)
+        
+        Returns:
+            True jika berhasil
+        """
+        try:
+            if not self.source.open(self.width, self.height):
+                self.source.release()
+                return False
+        except Exception as e:
+            self.logger.error(f"Failed to reopen camera {self.name}: {e}")
+            return False
+        
+        self.cap = self.source
+        return True
+    
+    @property
+    def idle_state(self) -> str:
+        """
+        State demand pipeline: "active", "idle" (tanpa client), atau "released"
+        (sumber frame dilepas)
+        """
+        return self.pipeline.state if self.pipeline is not None else FramePipeline.STATE_ACTIVE
+    
+    def _on_frame_encoded(self, packet: FramePacket):
+        """
+        Terima frame yang sudah di-encode dari pipeline (dijalankan di event loop)
+        
+        Args:
+            packet: FramePacket berisi JPEG bytes
+        """
+        self.publisher.publish(packet)
+        if METRICS is not None:
+            METRICS.frame_latency.observe((time.time() - packet.capture_ts) * 1000.0)
     
     async def get_latest_frame(self) -> Optional[bytes]:
         """
@@ -120,8 +177,94 @@ class Camera:
         Returns:
             JPEG frame sebagai bytes, atau None jika tidak ada frame
         """
-        async with self.frame_lock:
-            return self.latest_frame
+        packet = self.publisher.latest
+        if packet is None:
+            return None
+        jpegs = [(variant, data) for variant, data in packet.encoded.items() if variant[1] == "jpeg"]
+        for variant, jpeg in jpegs:
+            if variant[0] == self.STREAM_OVERLAY:
+                return jpeg
+        return jpegs[0][1] if jpegs else None
+    
+    def resolve_variant(self, variant: tuple) -> tuple:
+        """
+        Varian yang benar-benar diproduksi untuk permintaan client. Pipeline
+        lokal bisa meng-encode varian apa pun (lihat relay.RelayCamera untuk
+        kamera dengan varian tetap).
+        
+        Args:
+            variant: Tuple (stream mode, format, kualitas, skala resolusi)
+            
+        Returns:
+            Varian yang sama
+        """
+        return variant
+    
+    def add_stream_client(self, variant: tuple):
+        """
+        Daftarkan client untuk varian stream tertentu
+        
+        Args:
+            variant: Tuple (stream mode, format, kualitas, skala resolusi)
+        """
+        first = not self.stream_demand
+        self.stream_demand[variant] += 1
+        
+        if first:
+            idle_state = self.idle_state
+            if idle_state != FramePipeline.STATE_ACTIVE:
+                # Frame yang di-capture sebelum ini masih sisa dari sebelum idle
+                self.publisher.mark_wake(idle_state, captured_after=time.time())
+            self.demand_event.set()
+    
+    def remove_stream_client(self, variant: tuple):
+        """
+        Hapus pendaftaran client dari varian stream
+        
+        Args:
+            variant: Tuple (stream mode, format, kualitas, skala resolusi)
+        """
+        self.stream_demand[variant] -= 1
+        if self.stream_demand[variant] <= 0:
+            del self.stream_demand[variant]
+        
+        if not self.stream_demand:
+            self.demand_event.clear()
+    
+    def get_stream_variants(self) -> tuple:
+        """
+        Varian stream yang sedang diminta client. Tanpa client (pipeline
+        idle dimatikan lewat IDLE_WHEN_NO_CLIENTS), frame overlay tetap
+        diproduksi seperti sebelumnya.
+        
+        Returns:
+            Tuple varian (stream mode, format, kualitas, skala) yang perlu di-encode
+        """
+        variants = tuple(sorted(self.stream_demand))
+        return variants or ((self.STREAM_OVERLAY, DEFAULT_FORMAT, self.jpeg_quality, 1.0),)
+    
+    def get_stream_modes(self) -> tuple:
+        """
+        Stream mode yang sedang diminta client
+        
+        Returns:
+            Tuple stream mode yang perlu di-render
+        """
+        return self.get_modes(self.get_stream_variants())
+    
+    @classmethod
+    def get_modes(cls, variants: tuple) -> tuple:
+        """
+        Stream mode unik dari daftar varian
+        
+        Args:
+            variants: Tuple varian (stream mode, format, kualitas, skala)
+            
+        Returns:
+            Tuple stream mode sesuai urutan STREAM_MODES
+        """
+        modes = {variant[0] for variant in variants}
+        return tuple(mode for mode in cls.STREAM_MODES if mode in modes)
     
     def set_resolution(self, width: int, height: int):
         """
@@ -134,15 +277,14 @@ class Camera:
         self.width = width
         self.height = height
         
-        if self.cap and self.cap.isOpened():
-            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
-            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if self.cap is not None:
+            self.cap.set_resolution(width, height)
             
         self.logger.info(f"Resolution set to {width}x{height}")
     
     def set_jpeg_quality(self, quality: int):
         """
-        Set kualitas JPEG encoding
+        Set kualitas JPEG default (kualitas maksimum untuk client baru)
         
         Args:
             quality: Kualitas JPEG (1-100)
@@ -158,14 +300,27 @@ class Camera:
             Dictionary berisi informasi kamera
         """
         info = {
+            "name": self.name,
             "width": self.width,
             "height": self.height,
             "jpeg_quality": self.jpeg_quality,
             "camera_index": self.camera_index,
+            "source": self.source.get_info(),
             "is_running": self.is_running,
-            "head_detection_enabled": self.head_detector.enabled
+            "head_detection_enabled": self.head_detector.enabled,
+            "stream_variants": [
+                {"stream_mode": mode, "format": fmt, "quality": quality, "scale": scale, "clients": count}
+                for (mode, fmt, quality, scale), count in sorted(self.stream_demand.items())
+            ]
         }
         
+        info["frame_buffer"] = self.publisher.buffer.get_stats()
+        info["idle_state"] = self.idle_state
+        info["time_to_first_frame"] = self.publisher.get_wake_stats()
+        
+        if self.pipeline:
+            info["pipeline"] = self.pipeline.get_stats()
+        
         # Tambahkan info head detector
         info["head_detector"] = self.head_detector.get_info()
             
@@ -203,6 +358,30 @@ class Camera:
         """
         return self.head_detector.set_cascade(cascade_type)
     
+    def set_detection_mode(self, mode: str) -> bool:
+        """
+        Set mode deteksi kepala
+        
+        Args:
+            mode: Mode deteksi (full, track, roi)
+            
+        Returns:
+            True jika berhasil, False jika gagal
+        """
+        return self.head_detector.set_detection_mode(mode)
+    
+    def set_detection_profile(self, name: str) -> bool:
+        """
+        Set profil parameter deteksi kepala
+        
+        Args:
+            name: Nama profil (lihat models/detection_profiles.json)
+            
+        Returns:
+            True jika berhasil, False jika gagal
+        """
+        return self.head_detector.set_detection_profile(name)
+    
     def set_hat(self, hat_index: int) -> bool:
         """
         Set topi untuk hat overlay
@@ -239,11 +418,22 @@ class Camera:
         """
         self.is_running = False
         
+        if self._stopped is not None:
+            self._stopped.set()
+        
+        # Thread capture harus berhenti sebelum device dilepas
+        if self.pipeline:
+            self.pipeline.stop()
+        
+        if self.detection_pool:
+            self.detection_pool.close()
+            self.detection_pool = None
+        
         if self.cap:
             self.cap.release()
             self.cap = None
             
-        self.logger.info("Camera stopped")
+        self.logger.info(f"Camera {self.name} stopped")
     
     def __del__(self):
         """
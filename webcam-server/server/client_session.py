@@ -0,0 +1,658 @@
+"""
+Client session module: sender per-client yang berlangganan ke FramePublisher
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Optional
+
+import websockets
+
+from camera import Camera
+from config import TARGET_FPS, ADAPTIVE_QUALITY_ENABLED, DEFAULT_FORMAT
+from encoders import get_encoder
+from metrics import METRICS
+from pipeline import FramePacket
+from rate_control import AdaptiveQualityController
+from upload import UploadResult, UploadSession, UploadWorkerPool
+from utils import (
+    create_detections_message, create_metadata_message, create_resume_message,
+    pack_frame_envelope, scale_resolution
+)
+
+
+class ClientSession:
+    """
+    State dan sender coroutine untuk satu koneksi client.
+
+    Setiap client punya sender sendiri, sehingga client dengan koneksi lambat
+    hanya menurunkan FPS miliknya sendiri tanpa menahan client lain. Sender
+    selalu mengambil frame terbaru dari publisher (latest-frame-wins) dan
+    dibatasi oleh deadline scheduler sesuai FPS milik client, yang bisa
+    diubah kapan saja lewat pesan config. Kualitas dan resolusi dipilih
+    per-client oleh AdaptiveQualityController; session mendaftarkan
+    variannya (stream mode, format, kualitas, skala) ke Camera agar
+    pipeline meng-encode varian tersebut.
+
+    Dalam mode upload (`start_upload`), client tidak menerima frame kamera;
+    frame yang dikirim client diproses UploadSession dan hasilnya (frame
+    overlay atau pesan deteksi) dikirim balik sesuai varian client.
+    """
+
+    LATENCY_SMOOTHING = 0.1  # Bobot EMA untuk send latency
+
+    def __init__(self, websocket: Any, camera: Camera, fps: int = TARGET_FPS,
+                 adaptive: bool = ADAPTIVE_QUALITY_ENABLED):
+        """
+        Initialize session
+
+        Args:
+            websocket: WebSocket connection
+            camera: Camera (publisher frame dan registry varian stream)
+            fps: Batas FPS untuk client ini
+            adaptive: Aktifkan penyesuaian kualitas/resolusi otomatis
+        """
+        self.websocket = websocket
+        self.remote_address = websocket.remote_address
+        self.logger = logging.getLogger(__name__)
+        self.camera = camera
+        self.publisher = camera.publisher
+        self.fps = fps
+        self.stream_mode = Camera.STREAM_OVERLAY
+        self.envelope_version = 0  # 0 = JPEG polos (client lama)
+        self.format = DEFAULT_FORMAT
+        self.controller = AdaptiveQualityController(camera.jpeg_quality)
+        self.adaptive = adaptive
+        self.variant = self._current_variant()
+        self._registered = False
+        self._start_seq: Optional[int] = None  # Sender mulai setelah seq ini (resume)
+        self.task: Optional[asyncio.Task] = None
+        self.upload: Optional[UploadSession] = None  # Mode upload (frame dari kamera client)
+        self._upload_size = (0, 0)  # Resolusi frame upload terakhir
+        self.connected_at = time.time()
+
+        # Frame pacing: frame berikutnya baru dikirim setelah _next_due (perf_counter)
+        self._next_due = 0.0
+        self._last_send_at = 0.0
+        self._pacing_changed = asyncio.Event()
+
+        # Statistik per-client
+        self.frames_sent = 0
+        self.frames_dropped = 0  # Frame tertimpa saat send sebelumnya masih berjalan
+        self.frames_skipped = 0  # Frame tertimpa saat menunggu rate limit
+        self.bytes_sent = 0
+        self.detections_sent = 0
+        self.detections_seq = 0
+        self.frames_resent = 0  # Frame dari ring buffer (resume)
+        self.last_send_ms = 0.0
+        self.avg_send_ms = 0.0
+        self.max_send_ms = 0.0
+
+    @property
+    def client_id(self) -> str:
+        address = self.remote_address
+        if isinstance(address, tuple) and len(address) >= 2:
+            return f"{address[0]}:{address[1]}"
+        return str(address)
+
+    @property
+    def quality(self) -> int:
+        return self.variant[2]
+
+    @property
+    def scale(self) -> float:
+        return self.variant[3]
+
+    def start(self):
+        """
+        Daftarkan varian stream dan jalankan sender coroutine
+        """
+        if not self._registered:
+            self.camera.add_stream_client(self.variant)
+            self._registered = True
+        if self.task is None:
+            self.task = asyncio.create_task(self._sender_loop())
+
+    async def stop(self):
+        """
+        Hentikan sender coroutine dan lepas varian stream
+        """
+        await self._cancel_sender()
+        if self._registered:
+            self.camera.remove_stream_client(self.variant)
+            self._registered = False
+
+    async def close(self):
+        """
+        Hentikan sender dan mode upload (client disconnect)
+        """
+        await self.stop()
+        if self.upload is not None:
+            await self.upload.stop()
+            self.upload = None
+
+    async def start_upload(self, pool: UploadWorkerPool):
+        """
+        Pindah ke mode upload: stream kamera berhenti (varian dilepas agar
+        kamera bisa idle) dan frame binary dari client diproses di `pool`
+
+        Args:
+            pool: Worker pool upload bersama
+        """
+        if self.upload is not None:
+            return
+
+        await self.stop()
+        upload = UploadSession(pool, self._send_upload_result)
+        await upload.start(getattr(self.camera, "head_detector", None))
+        self.upload = upload
+        self._upload_size = (0, 0)
+        await self.send_metadata()
+
+    async def stop_upload(self):
+        """
+        Keluar dari mode upload dan kembali menerima stream kamera
+        """
+        if self.upload is None:
+            return
+
+        await self.upload.stop()
+        self.upload = None
+        await self.send_metadata()
+        self.start()
+
+    def receive_upload(self, message: bytes) -> bool:
+        """
+        Serahkan frame upload ke UploadSession (tidak memblokir event loop)
+
+        Args:
+            message: Pesan binary dari client
+
+        Returns:
+            True jika client sedang dalam mode upload
+        """
+        if self.upload is None:
+            return False
+        self.upload.receive(message, self.variant)
+        return True
+
+    async def _send_upload_result(self, result: UploadResult):
+        """
+        Kirim hasil frame upload: frame overlay (stream mode overlay) atau
+        pesan deteksi (stream mode raw, compositing di client)
+
+        Args:
+            result: Hasil dari UploadSession
+        """
+        if (result.width, result.height) != self._upload_size:
+            self._upload_size = (result.width, result.height)
+            await self.send_metadata()
+
+        if result.payload is None:
+            await self.websocket.send(create_detections_message(
+                result.seq, result.heads, result.hat_index, result.width, result.height
+            ))
+            self.detections_sent += 1
+            return
+
+        payload = result.payload
+        if self.envelope_version:
+            payload = pack_frame_envelope(
+                result.seq, result.capture_ts, result.detect_ms, result.encode_ms, payload
+            )
+        start = time.perf_counter()
+        await self.websocket.send(payload)
+        self._record_send((time.perf_counter() - start) * 1000.0, len(payload))
+
+    async def _cancel_sender(self) -> bool:
+        """
+        Hentikan sender coroutine (varian tetap terdaftar)
+
+        Returns:
+            True jika sender sedang berjalan
+        """
+        if self.task is None:
+            return False
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+        return True
+
+    async def resume(self, after_seq: int):
+        """
+        Kirim frame dari ring buffer publisher dengan sequence setelah
+        `after_seq` (client yang stall sebentar atau reconnect), lalu lanjut
+        live. Frame dikirim tanpa pacing; didahului pesan "resume" berisi
+        rentang yang dikirim dan jumlah frame yang sudah tidak ada di buffer.
+
+        Args:
+            after_seq: Sequence frame terakhir yang diterima client
+        """
+        await self._cancel_sender()
+        buffer = self.publisher.buffer
+        after_seq = max(0, min(after_seq, self.publisher.seq))
+        frames = [frame for frame in buffer.since(after_seq) if self.variant in frame.offsets]
+        first_available = max(after_seq + 1, buffer.oldest_seq) if buffer.latest_seq else after_seq + 1
+        missing = first_available - after_seq - 1
+
+        try:
+            await self.websocket.send(create_resume_message(
+                after_seq, [frame.seq for frame in frames], missing
+            ))
+            self.detections_seq = after_seq
+            for frame in frames:
+                # Slot bisa tertimpa frame baru selama send sebelumnya
+                if not buffer.contains(frame.seq):
+                    continue
+                if self.variant[0] == Camera.STREAM_RAW:
+                    await self._send_detections(frame)
+                    if not buffer.contains(frame.seq):
+                        continue
+                payload = frame.view(self.variant)
+                if self.envelope_version:
+                    payload = pack_frame_envelope(
+                        frame.seq, frame.capture_ts, frame.detect_ms, frame.encode_ms, payload
+                    )
+                start = time.perf_counter()
+                await self.websocket.send(payload)
+                self._record_send((time.perf_counter() - start) * 1000.0, len(payload))
+                self.frames_resent += 1
+        except websockets.exceptions.ConnectionClosed:
+            return
+
+        # Live berlanjut dari frame terbaru setelah frame buffer terakhir
+        self._start_seq = frames[-1].seq if frames else after_seq
+        self.start()
+
+    async def set_camera(self, camera: Camera):
+        """
+        Pindahkan client ke kamera lain tanpa memutus koneksi. Sender dan
+        pendaftaran varian dipindah ke kamera baru; metadata (resolusi
+        kamera baru) dikirim sebelum frame pertama dari kamera tersebut.
+
+        Args:
+            camera: Kamera tujuan
+        """
+        if camera is self.camera:
+            return
+
+        running = self.task is not None
+        await self.stop()
+        self.camera = camera
+        self.publisher = camera.publisher
+        self.variant = self._current_variant()
+        self._next_due = 0.0
+        await self.send_metadata()
+        if running:
+            self.start()
+
+    def _current_variant(self) -> tuple:
+        """
+        Varian stream sesuai pengaturan client saat ini
+
+        Returns:
+            Tuple (stream mode, format, kualitas, skala resolusi)
+        """
+        quality = self.controller.quality if self.adaptive else self.controller.max_quality
+        scale = self.controller.scale if self.adaptive else 1.0
+        if not get_encoder(self.format).lossy:
+            quality = 0  # Format lossless: semua client berbagi satu varian
+        return self.camera.resolve_variant((self.stream_mode, self.format, quality, scale))
+
+    def _update_variant(self) -> bool:
+        """
+        Pindahkan pendaftaran ke varian baru jika pengaturan berubah
+
+        Returns:
+            True jika varian berubah
+        """
+        variant = self._current_variant()
+        if variant == self.variant:
+            return False
+        if self._registered:
+            # Daftar dulu agar demand kamera tidak sempat nol (pipeline tidak masuk idle)
+            self.camera.add_stream_client(variant)
+            self.camera.remove_stream_client(self.variant)
+        self.variant = variant
+        return True
+
+    async def refresh(self):
+        """
+        Terapkan ulang varian setelah kamera mengganti varian yang tersedia
+        (misal relay yang upstream-nya berubah) dan kirim metadata baru
+        """
+        self._update_variant()
+        await self.send_metadata()
+
+    async def set_stream_mode(self, mode: str):
+        """
+        Ganti stream mode client
+
+        Args:
+            mode: Stream mode (overlay, raw)
+        """
+        self.stream_mode = mode
+        if self._update_variant():
+            await self.send_metadata()
+
+    async def set_format(self, fmt: str):
+        """
+        Ganti format frame client
+
+        Args:
+            fmt: Nama format (lihat encoders.ENCODER_FORMATS)
+        """
+        self.format = fmt
+        if self._update_variant():
+            await self.send_metadata()
+
+    async def set_jpeg_quality(self, quality: int):
+        """
+        Set kualitas maksimum client; controller mulai lagi dari kualitas ini
+
+        Args:
+            quality: Kualitas JPEG (1-100)
+        """
+        self.controller.set_max_quality(quality)
+        if self._update_variant():
+            await self.send_metadata()
+
+    async def set_fps(self, fps: int):
+        """
+        Ganti target FPS client tanpa restart; jadwal frame berikutnya
+        langsung dihitung ulang dari waktu send terakhir
+
+        Args:
+            fps: FPS yang sudah divalidasi
+        """
+        if fps == self.fps:
+            return
+
+        self.fps = fps
+        if self._last_send_at:
+            self._next_due = self._last_send_at + self.frame_interval
+
+        # Bangunkan sender yang sedang menunggu jadwal lama
+        event, self._pacing_changed = self._pacing_changed, asyncio.Event()
+        event.set()
+        await self.send_metadata()
+
+    @property
+    def frame_interval(self) -> float:
+        return 1.0 / self.fps
+
+    async def set_adaptive(self, enable: bool):
+        """
+        Enable/disable penyesuaian kualitas otomatis
+
+        Args:
+            enable: True untuk enable, False untuk kualitas tetap
+        """
+        self.adaptive = enable
+        if self._update_variant():
+            await self.send_metadata()
+
+    async def send_metadata(self):
+        """
+        Kirim pesan metadata: resolusi frame yang diterima client, FPS, dan
+        pengaturan yang sedang dipilih untuk client ini
+        """
+        if self.upload is not None:
+            # Resolusi hasil = resolusi frame upload terakhir
+            width, height = self._upload_size
+        else:
+            width, height = scale_resolution(self.camera.width, self.camera.height, self.scale)
+        metadata = create_metadata_message(width, height, self.fps, {
+            "camera": self.camera.name,
+            "upload": self.upload is not None,
+            "stream_mode": self.variant[0],
+            "envelope": self.envelope_version,
+            "format": self.variant[1],
+            "jpeg_quality": self.quality,
+            "scale": self.scale,
+            "adaptive": self.adaptive,
+            "source_width": self.camera.width,
+            "source_height": self.camera.height
+        })
+
+        try:
+            await self.websocket.send(metadata)
+            self.logger.debug(f"Metadata sent to {self.remote_address}")
+        except websockets.exceptions.ConnectionClosed:
+            self.logger.warning(f"Client {self.remote_address} disconnected during metadata send")
+
+    async def _sender_loop(self):
+        """
+        Loop pengiriman frame untuk client ini
+        """
+        try:
+            await self._send_frames()
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        except Exception as e:
+            self.logger.error(f"Error sending frame to {self.remote_address}: {e}")
+
+    async def _send_frames(self):
+        """
+        Kirim frame terbaru sesuai stream mode dan jadwal FPS client
+        """
+        # Client baru langsung menerima frame terbaru yang tersedia, kecuali
+        # kamera baru bangun dari idle (frame terakhir sudah basi)
+        if self._start_seq is not None:
+            last_seq = self._start_seq
+        elif self.publisher.wake_pending:
+            last_seq = self.publisher.seq
+        else:
+            last_seq = max(0, self.publisher.seq - 1)
+        self._start_seq = None
+        seq_after_send = last_seq
+        self.detections_seq = last_seq
+
+        while True:
+            packet = await self.publisher.wait_for_frame(last_seq)
+            self._count_missed(last_seq, seq_after_send, packet.seq)
+
+            raw = self.variant[0] == Camera.STREAM_RAW
+            if raw:
+                await self._send_detections(packet)
+
+            payload = self._get_payload(packet)
+            if payload is None:
+                # Varian baru saja diganti; pipeline belum meng-encode varian ini
+                last_seq = seq_after_send = packet.seq
+                continue
+
+            start = time.perf_counter()
+            await self.websocket.send(payload)
+            send_ms = (time.perf_counter() - start) * 1000.0
+            self._record_send(send_ms, len(payload))
+            last_seq = packet.seq
+            seq_after_send = self.publisher.seq
+
+            if self.adaptive and self.controller.update(send_ms, self._buffered_bytes(), self.fps):
+                if self._update_variant():
+                    self.logger.info(f"Adaptive quality for {self.remote_address}: "
+                                     f"quality {self.quality}, scale {self.scale}")
+                    await self.send_metadata()
+
+            # Frame pacing per-client: tunggu sampai slot frame berikutnya.
+            # Pada mode raw, deteksi tetap diteruskan selama menunggu.
+            self._schedule_next(start)
+            if raw:
+                await self._forward_detections()
+            else:
+                await self._wait_until_due()
+
+    def _schedule_next(self, sent_at: float):
+        """
+        Hitung slot frame berikutnya (deadline scheduler). Slot maju tepat satu
+        interval dari slot sebelumnya sehingga rata-rata FPS sesuai target
+        walaupun frame datang tidak sejajar dengan jadwal; jika sender sudah
+        tertinggal, jadwal dimulai ulang dari waktu send tanpa mengirim burst.
+
+        Args:
+            sent_at: Waktu (perf_counter) send frame terakhir dimulai
+        """
+        self._last_send_at = sent_at
+        self._next_due = max(self._next_due + self.frame_interval, sent_at)
+
+    async def _wait_until_due(self):
+        """
+        Tunggu sampai slot frame berikutnya; bangun lebih awal jika FPS diganti
+        """
+        while True:
+            remaining = self._next_due - time.perf_counter()
+            if remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(self._pacing_changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return
+
+    def _get_payload(self, packet: FramePacket) -> Optional[bytes]:
+        """
+        Payload binary untuk client ini: JPEG polos atau dengan envelope header
+
+        Args:
+            packet: FramePacket yang sudah dipublikasikan
+
+        Returns:
+            Bytes yang dikirim, atau None jika varian client belum di-encode
+        """
+        jpeg = packet.encoded.get(self.variant)
+        if jpeg is None or not self.envelope_version:
+            return jpeg
+
+        # Envelope dibuat sekali per frame dan dipakai bersama oleh client dengan varian sama
+        payload = packet.enveloped.get(self.variant)
+        if payload is None:
+            payload = pack_frame_envelope(
+                packet.seq, packet.capture_ts, packet.detect_ms, packet.encode_ms, jpeg
+            )
+            packet.enveloped[self.variant] = payload
+        return payload
+
+    def _buffered_bytes(self) -> int:
+        """
+        Jumlah data yang masih menunggu di write buffer transport
+
+        Returns:
+            Ukuran write buffer (bytes), 0 jika tidak tersedia
+        """
+        transport = getattr(self.websocket, "transport", None)
+        if transport is None:
+            return 0
+        try:
+            return transport.get_write_buffer_size()
+        except Exception:
+            return 0
+
+    async def _send_detections(self, packet: FramePacket):
+        """
+        Kirim pesan deteksi untuk frame (sekali per frame)
+
+        Args:
+            packet: FramePacket yang sudah dipublikasikan
+        """
+        if packet.seq <= self.detections_seq:
+            return
+
+        self.detections_seq = packet.seq
+        heads = packet.heads
+        width, height = packet.width, packet.height
+        if self.scale < 1.0:
+            # Koordinat mengikuti resolusi frame yang diterima client
+            width, height = scale_resolution(width, height, self.scale)
+            heads = [tuple(int(round(v * self.scale)) for v in head) for head in heads]
+        await self.websocket.send(create_detections_message(
+            packet.seq, heads, packet.hat_index, width, height
+        ))
+        self.detections_sent += 1
+
+    async def _forward_detections(self):
+        """
+        Teruskan deteksi dari frame baru sampai slot frame video berikutnya.
+        Jadwal dibaca ulang setiap frame, sehingga perubahan FPS langsung berlaku.
+        """
+        while True:
+            remaining = self._next_due - time.perf_counter()
+            if remaining <= 0:
+                return
+            try:
+                packet = await asyncio.wait_for(
+                    self.publisher.wait_for_frame(self.detections_seq), remaining
+                )
+            except asyncio.TimeoutError:
+                return
+            await self._send_detections(packet)
+
+    def _count_missed(self, last_seq: int, seq_after_send: int, seq: int):
+        """
+        Hitung frame yang terlewat antara frame terkirim sebelumnya dan frame saat ini
+
+        Args:
+            last_seq: Sequence frame terakhir yang terkirim
+            seq_after_send: Sequence publisher saat send terakhir selesai
+            seq: Sequence frame yang akan dikirim
+        """
+        if last_seq == 0:
+            return
+        if seq <= seq_after_send:
+            self.frames_dropped += seq - last_seq - 1
+        else:
+            self.frames_dropped += seq_after_send - last_seq
+            self.frames_skipped += seq - seq_after_send - 1
+
+    def _record_send(self, send_ms: float, size: int):
+        """
+        Update statistik setelah frame terkirim
+
+        Args:
+            send_ms: Durasi send (ms)
+            size: Ukuran frame (bytes)
+        """
+        self.frames_sent += 1
+        self.bytes_sent += size
+        if METRICS is not None:
+            METRICS.observe_send(send_ms, size)
+        self.last_send_ms = send_ms
+        self.max_send_ms = max(self.max_send_ms, send_ms)
+        if self.frames_sent == 1:
+            self.avg_send_ms = send_ms
+        else:
+            self.avg_send_ms += self.LATENCY_SMOOTHING * (send_ms - self.avg_send_ms)
+
+    def get_stats(self) -> dict:
+        """
+        Dapatkan statistik client
+
+        Returns:
+            Dictionary berisi jumlah frame terkirim/drop dan send latency
+        """
+        return {
+            "address": str(self.remote_address),
+            "camera": self.camera.name,
+            "connected_for": round(time.time() - self.connected_at, 1),
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "frames_skipped": self.frames_skipped,
+            "fps": self.fps,
+            "stream_mode": self.stream_mode,
+            "envelope": self.envelope_version,
+            "format": self.format,
+            "adaptive": self.adaptive,
+            "quality": self.controller.get_stats(),
+            "detections_sent": self.detections_sent,
+            "frames_resent": self.frames_resent,
+            "upload": self.upload.get_stats() if self.upload is not None else None,
+            "bytes_sent": self.bytes_sent,
+            "send_ms": {
+                "last": round(self.last_send_ms, 3),
+                "avg": round(self.avg_send_ms, 3),
+                "max": round(self.max_send_ms, 3)
+            }
+        }
@@ -2,6 +2,8 @@
 Konfigurasi untuk Webcam WebSocket Server
 """
 
+import os
+
 # Server Configuration
 SERVER_HOST = "0.0.0.0"
 SERVER_PORT = 8765
@@ -11,18 +13,109 @@ CAMERA_INDEX = 0  # Default camera (0 = primary camera)
 DEFAULT_WIDTH = 640
 DEFAULT_HEIGHT = 480
 TARGET_FPS = 15
+MAX_FRAME_WIDTH = 1920  # Batas atas resolusi (lihat utils.validate_resolution)
+MAX_FRAME_HEIGHT = 1080
+
+# Frame Source Configuration (bisa di-override lewat argumen command line server.py)
+FRAME_SOURCE = "device"  # "device" (webcam), "video" (file video), "images" (direktori gambar), atau "synthetic"
+FRAME_SOURCE_PATH = ""  # Path file video atau direktori gambar
+SOURCE_FPS = 0  # FPS sumber selain device (0 = FPS file video, atau TARGET_FPS)
+SOURCE_LOOP = True  # Putar ulang file video / urutan gambar saat habis
+SYNTHETIC_HEADS = 2  # Jumlah kepala pada sumber synthetic
+SYNTHETIC_SEED = 0  # Seed sumber synthetic (hasil sama di setiap mesin)
+
+# Multi-Camera Configuration (bisa di-override dengan --camera NAMA=SPEC di server.py)
+CAMERA_SOURCES = {}  # Nama -> spec sumber, misal {"front": "device:0", "side": "device:1"}; kosong = satu sumber dari FRAME_SOURCE
+DEFAULT_CAMERA_NAME = "default"  # Nama sumber tunggal, dan kamera untuk client di path "/" (jika tidak ada: kamera pertama)
+
+# Relay Configuration (server.py --relay ws://host:8765/kamera)
+RELAY_STREAM_MODE = "overlay"  # Stream mode yang diminta dari upstream; semua client relay menerima mode ini
+RELAY_FORMAT = "jpeg"  # Format frame yang diminta dari upstream (relay tidak decode/encode ulang)
+RELAY_UPSTREAM_FPS = 60  # FPS yang diminta dari upstream; pacing per-client dilakukan oleh relay
+RELAY_CONNECT_TIMEOUT = 10.0  # Detik menunggu frame pertama dari upstream saat start
+RELAY_RECONNECT_DELAY = 1.0  # Detik sebelum reconnect setelah upstream terputus
+
+# Upload Configuration (client mengirim frame dari kamera sendiri, server mengembalikan hasil try-on)
+UPLOAD_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # Thread decode/deteksi/encode yang dipakai bersama semua client upload
+UPLOAD_MAX_BYTES = 2 * 1024 * 1024  # Frame upload lebih besar dari ini dibuang
+WEBSOCKET_MAX_MESSAGE_BYTES = UPLOAD_MAX_BYTES + 64 * 1024  # Pesan client lebih besar dari ini menutup koneksi (1009); sisa untuk envelope dan pesan teks
 
 # JPEG Encoding Configuration
 JPEG_QUALITY = 80  # 1-100, higher = better quality but larger file size
 
+# Encoder Configuration
+DEFAULT_FORMAT = "jpeg"  # Format frame default: jpeg, webp, png, bgr, rgba (client bisa ganti via config "format")
+JPEG_BACKEND = "auto"  # "auto" (simplejpeg jika terinstall), "opencv", atau "simplejpeg"
+JPEG_OPTIMIZE = False  # Huffman table optimal: file lebih kecil, encode lebih lambat (hanya OpenCV)
+JPEG_PROGRESSIVE = False  # JPEG progressive (hanya OpenCV)
+JPEG_SUBSAMPLING = "420"  # Chroma subsampling: "444", "422", atau "420"
+PNG_COMPRESSION = 1  # Level kompresi PNG (0-9); rendah = encode lebih cepat
+
+# Adaptive Quality Configuration (per-client)
+ADAPTIVE_QUALITY_ENABLED = True  # Sesuaikan kualitas/resolusi per-client berdasarkan send latency
+ADAPTIVE_MIN_QUALITY = 40  # Kualitas JPEG terendah yang boleh dipilih controller
+ADAPTIVE_QUALITY_STEP = 10  # Perubahan kualitas per penyesuaian (juga membatasi jumlah varian encode)
+ADAPTIVE_SCALES = (1.0, 0.75, 0.5)  # Tangga skala resolusi, dipakai setelah kualitas mencapai minimum
+ADAPTIVE_HIGH_LOAD = 0.8  # Turunkan jika rata-rata send time > fraksi frame budget (1 / fps) ini
+ADAPTIVE_LOW_LOAD = 0.3  # Naikkan jika rata-rata send time < fraksi ini dan write buffer kosong
+ADAPTIVE_BUFFER_HIGH = 256 * 1024  # Turunkan jika data di write buffer melebihi ini (bytes)
+ADAPTIVE_WINDOW = 15  # Jumlah frame terkirim per keputusan controller
+
 # Server Behavior
-MAX_CLIENTS = 10  # Maximum simultaneous clients
-FRAME_BUFFER_SIZE = 1  # Number of frames to buffer
+MAX_CLIENTS = 10  # Maximum simultaneous clients (ukur batas sebenarnya dengan test_client.py --find-ceiling)
+FRAME_BUFFER_SIZE = 30  # Jumlah frame ter-encode terakhir di ring buffer (resume setelah stall/reconnect)
+FRAME_BUFFER_SLOT_BYTES = 256 * 1024  # Kapasitas awal arena per slot (semua varian satu frame), tumbuh jika kurang
+FRAME_BUFFER_MAX_BYTES = 32 * 1024 * 1024  # Batas total arena ring buffer; varian yang tidak muat tidak disimpan
+
+# Pipeline Configuration
+PIPELINE_QUEUE_SIZE = 1  # Max frames waiting per pipeline stage (oldest dropped when full)
+
+# Idle Configuration (pipeline hanya bekerja selama ada client)
+IDLE_WHEN_NO_CLIENTS = True  # Tanpa client: deteksi dan encoding berhenti, device hanya dikuras tanpa decode
+IDLE_RELEASE_DELAY = 30.0  # Detik tanpa client sebelum sumber frame / upstream relay dilepas (-1 = tidak pernah)
+
+# Static Scene Skip Configuration
+STATIC_SKIP_ENABLED = True  # Pakai ulang deteksi saat scene tidak berubah
+STATIC_REUSE_JPEG = True  # Pakai ulang JPEG terakhir juga (tanpa overlay dan encode)
+STATIC_THUMBNAIL_SIZE = (32, 24)  # Ukuran thumbnail grayscale untuk change detection
+STATIC_DIFF_THRESHOLD = 1.0  # Mean absolute difference (0-255) maksimum untuk scene statis
+
+# Detection Backend Configuration
+DETECTION_BACKEND = "thread"  # "thread" (in-process) atau "process" (process pool + shared memory)
+DETECTION_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # Total worker process untuk backend "process" (dibagi antar kamera, minimal 1 per kamera)
+DETECTION_RING_SLOTS = 2 * DETECTION_WORKERS  # Slot frame di ring shared memory
+DETECTION_RESULT_TIMEOUT = 2.0  # Detik sebelum hasil worker dianggap hilang
+
+# Detection Resolution Configuration
+DETECTION_MAX_DIMENSION = 480  # Deteksi di gambar grayscale yang diperkecil ke sisi terpanjang ini (0 = resolusi penuh)
+
+# Detection Profile Configuration (parameter detectMultiScale per cascade, hasil tune_cascade.py)
+DETECTION_PROFILES_FILE = "detection_profiles.json"  # Di folder models/; jika tidak ada hanya profil "default" yang tersedia
+DETECTION_PROFILE = ""  # Profil awal ("" = profil "active" di file, atau "default")
+
+# Hat Overlay Configuration
+SPRITE_CACHE_MAX_BYTES = 32 * 1024 * 1024  # Batas memori cache sprite topi
+SPRITE_SIZE_BUCKET = 8  # Kuantisasi ukuran sprite (pixel); sprite hanya di-resize saat bucket berubah
+
+# Detection Mode Configuration (hanya untuk backend "thread")
+DETECTION_MODE = "full"  # "full" (cascade setiap frame), "track" (cascade di keyframe, tracking di antaranya), atau "roi"
+TRACK_KEYFRAME_INTERVAL = 10  # Jalankan cascade penuh setiap N frame
+TRACK_MIN_CONFIDENCE = 0.6  # Skor template matching minimum (0-1); di bawah ini langsung re-detect
+TRACK_SEARCH_MARGIN = 0.5  # Margin area pencarian, relatif terhadap ukuran box
+TRACK_TEMPLATE_SIZE = 32  # Sisi terpanjang template (pixel) saat matching
+ROI_PADDING = 0.5  # Padding window pencarian mode "roi", relatif terhadap ukuran box sebelumnya
+ROI_MIN_SIZE_FACTOR = 0.7  # minSize = ukuran box sebelumnya * faktor ini
+ROI_MAX_SIZE_FACTOR = 1.4  # maxSize = ukuran box sebelumnya * faktor ini
+ROI_FULL_SCAN_INTERVAL = 15  # Scan full-frame setiap N frame agar orang baru tetap terdeteksi
+
+# Metrics Configuration
+METRICS_ENABLED = True  # False = instrumentasi, endpoint HTTP, dan pesan "stats" dimatikan sepenuhnya
+METRICS_HOST = "127.0.0.1"  # Endpoint Prometheus hanya lokal secara default
+METRICS_PORT = 9108  # Port HTTP untuk GET /metrics (0 = tanpa endpoint HTTP)
 
 # Logging Configuration
 LOG_LEVEL = "INFO"  # DEBUG, INFO, WARNING, ERROR, CRITICAL
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 
 # Performance Settings
-CAMERA_LOOP_DELAY = 0.01  # Delay between camera reads (seconds)
-BROADCAST_DELAY = 1.0 / TARGET_FPS  # Delay between broadcasts to clients
+CAMERA_LOOP_DELAY = 0.01  # Delay before retrying a failed camera read (seconds)
@@ -0,0 +1,395 @@
+"""
+Detection pool module: deteksi kepala di beberapa worker process
+
+Frame grayscale dikirim ke worker melalui ring `multiprocessing.shared_memory`
+(tanpa pickling pixel data). Hanya metadata kecil (sequence number, slot,
+ukuran, parameter cascade) yang lewat queue.
+"""
+
+import logging
+import multiprocessing as mp
+import queue
+import time
+from collections import deque
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from config import (
+    DETECTION_WORKERS, DETECTION_RING_SLOTS, DETECTION_RESULT_TIMEOUT,
+    MAX_FRAME_WIDTH, MAX_FRAME_HEIGHT
+)
+
+
+def _detection_worker(shm_name: str, slot_size: int, cascade_paths: Dict[str, str],
+                      task_queue, result_queue):
+    """
+    Entry point worker process: baca frame dari slot shared memory dan jalankan cascade
+
+    Args:
+        shm_name: Nama blok shared memory ring
+        slot_size: Ukuran satu slot (bytes)
+        cascade_paths: Mapping tipe cascade -> path file XML
+        task_queue: Queue berisi task (seq, slot, height, width, params)
+        result_queue: Queue untuk hasil (seq, slot, heads)
+    """
+    # Satu thread OpenCV per worker, paralelisme datang dari jumlah process
+    cv2.setNumThreads(1)
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    cascades = {}
+
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+
+            seq, slot, height, width, params = task
+            cascade_type, scale_factor, min_neighbors, min_size = params
+
+            cascade = cascades.get(cascade_type)
+            if cascade is None and cascade_type in cascade_paths:
+                cascade = cv2.CascadeClassifier(cascade_paths[cascade_type])
+                cascades[cascade_type] = cascade
+
+            heads = []
+            if cascade is not None:
+                offset = slot * slot_size
+                gray = np.ndarray((height, width), dtype=np.uint8,
+                                  buffer=shm.buf, offset=offset)
+                detected = cascade.detectMultiScale(
+                    gray,
+                    scaleFactor=scale_factor,
+                    minNeighbors=min_neighbors,
+                    minSize=min_size
+                )
+                heads = [tuple(int(v) for v in box) for box in detected]
+                del gray
+
+            result_queue.put((seq, slot, heads))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shm.close()
+
+
+class DetectionPool:
+    """
+    Pool worker process untuk deteksi kepala dengan handoff frame via shared memory.
+
+    Hasil dikembalikan berurutan sesuai sequence number frame yang di-submit,
+    sehingga overlay tidak pernah tertukar urutannya meskipun worker selesai
+    dalam urutan acak. Frame yang hasilnya timeout dikembalikan tanpa deteksi,
+    tetapi slot-nya dikarantina (worker mungkin masih membacanya) sampai hasil
+    terlambatnya datang. Jika ada worker yang mati, atau slot karantina tidak
+    kunjung dilepas (worker hang), semua worker dijalankan ulang dengan queue
+    baru (worker yang mati bisa saja sedang memegang lock queue) dan semua
+    slot kembali ke ring.
+    """
+
+    WORKER_CHECK_INTERVAL = 0.5  # Detik antar pemeriksaan worker yang mati
+
+    def __init__(self, cascade_paths: Dict[str, str], workers: int = DETECTION_WORKERS,
+                 slots: int = DETECTION_RING_SLOTS):
+        """
+        Initialize pool (belum menjalankan worker)
+
+        Args:
+            cascade_paths: Mapping tipe cascade -> path file XML
+            workers: Jumlah worker process
+            slots: Jumlah slot pada ring shared memory
+        """
+        self.logger = logging.getLogger(__name__)
+        self.cascade_paths = dict(cascade_paths)
+        self.workers = max(1, workers)
+        self.slots = max(self.workers, slots)
+        self.slot_size = MAX_FRAME_WIDTH * MAX_FRAME_HEIGHT
+
+        self._ctx = mp.get_context("spawn")
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._processes = []
+        self._task_queue = None
+        self._result_queue = None
+
+        self._free_slots = deque()
+        self._order = deque()  # Sequence number sesuai urutan submit
+        self._submitted_at: Dict[int, float] = {}
+        self._slot_of: Dict[int, int] = {}  # Sequence number in-flight -> slot ring
+        self._quarantine: Dict[int, Tuple[int, float]] = {}  # Seq timeout -> (slot, waktu timeout)
+        self._results: Dict[int, list] = {}
+        self._last_worker_check = 0.0
+
+        self.submitted_count = 0
+        self.completed_count = 0
+        self.timeout_count = 0
+        self.late_count = 0
+        self.lost_count = 0
+        self.respawn_count = 0
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._processes)
+
+    def start(self):
+        """
+        Alokasikan ring shared memory dan jalankan worker process
+        """
+        if self.is_running:
+            return
+
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_size)
+        self._free_slots = deque(range(self.slots))
+        self._spawn_workers()
+
+        self.logger.info(f"Detection pool started: {self.workers} workers, {self.slots} slots")
+
+    def _spawn_workers(self):
+        """
+        Buat queue task/hasil baru dan jalankan semua worker process
+        """
+        self._task_queue = self._ctx.Queue()
+        self._result_queue = self._ctx.Queue()
+        self._processes = []
+        for i in range(self.workers):
+            process = self._ctx.Process(
+                target=_detection_worker,
+                args=(self._shm.name, self.slot_size, self.cascade_paths,
+                      self._task_queue, self._result_queue),
+                name=f"detect-worker-{i}",
+                daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+
+    def _check_workers(self):
+        """
+        Jalankan ulang semua worker jika ada yang mati atau hang (slot
+        karantina tidak dilepas dalam DETECTION_RESULT_TIMEOUT)
+        """
+        now = time.monotonic()
+        if now - self._last_worker_check < self.WORKER_CHECK_INTERVAL:
+            return
+        self._last_worker_check = now
+
+        dead = [process for process in self._processes if not process.is_alive()]
+        if dead:
+            self._restart_workers(f"worker {dead[0].name} died (exit code {dead[0].exitcode})")
+            return
+
+        oldest = min((since for _, since in self._quarantine.values()), default=now)
+        if now - oldest >= DETECTION_RESULT_TIMEOUT:
+            self._restart_workers(f"{len(self._quarantine)} timed-out frames still held by workers")
+
+    def _restart_workers(self, reason: str):
+        """
+        Hentikan semua worker dan jalankan ulang dengan queue baru. Frame
+        in-flight selesai tanpa deteksi dan semua slot kembali ke ring.
+
+        Args:
+            reason: Alasan restart (untuk log)
+        """
+        self.logger.warning(f"Detection pool: {reason}, restarting {self.workers} workers, "
+                            f"{len(self._slot_of)} frames lost")
+        for process in self._processes:
+            if process.is_alive():
+                process.terminate()
+            process.join(1.0)
+            if process.is_alive():
+                process.kill()
+                process.join(1.0)
+        for q in (self._task_queue, self._result_queue):
+            q.close()
+            q.cancel_join_thread()
+
+        for seq in self._slot_of:
+            self._results[seq] = []
+        self.lost_count += len(self._slot_of)
+        self._slot_of.clear()
+        self._quarantine.clear()
+        self._submitted_at.clear()
+        self._free_slots = deque(range(self.slots))
+
+        self._spawn_workers()
+        self.respawn_count += 1
+
+    def has_free_slot(self) -> bool:
+        """
+        Cek apakah masih ada slot kosong di ring
+
+        Returns:
+            True jika frame baru bisa di-submit
+        """
+        return bool(self._free_slots)
+
+    def submit(self, seq: int, frame: np.ndarray, params: Tuple, scale: float = 1.0) -> bool:
+        """
+        Kirim frame ke worker. Konversi grayscale ditulis langsung ke slot shared memory.
+
+        Args:
+            seq: Sequence number frame
+            frame: Frame BGR
+            params: Tuple (cascade_type, scale_factor, min_neighbors, min_size)
+            scale: Faktor skala deteksi; box hasil dalam koordinat skala ini
+
+        Returns:
+            True jika berhasil, False jika ring penuh atau frame terlalu besar
+        """
+        if not self._free_slots:
+            return False
+
+        if scale < 1.0:
+            frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+        height, width = frame.shape[:2]
+        if height * width > self.slot_size:
+            self.logger.error(f"Frame {width}x{height} exceeds detection ring slot size")
+            return False
+
+        slot = self._free_slots.popleft()
+        gray = np.ndarray((height, width), dtype=np.uint8,
+                          buffer=self._shm.buf, offset=slot * self.slot_size)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=gray)
+        del gray
+
+        self._order.append(seq)
+        self._submitted_at[seq] = time.monotonic()
+        self._slot_of[seq] = slot
+        self._task_queue.put((seq, slot, height, width, params))
+        self.submitted_count += 1
+        return True
+
+    def skip(self, seq: int):
+        """
+        Daftarkan frame tanpa deteksi (misal deteksi dimatikan) agar urutan tetap terjaga
+
+        Args:
+            seq: Sequence number frame
+        """
+        self._order.append(seq)
+        self._results[seq] = []
+
+    def pending_count(self) -> int:
+        """
+        Jumlah frame yang belum dikembalikan
+
+        Returns:
+            Jumlah frame in-flight
+        """
+        return len(self._order)
+
+    def get_results(self, timeout: float = 0.0) -> List[Tuple[int, list]]:
+        """
+        Ambil hasil deteksi yang sudah siap, berurutan sesuai sequence number
+
+        Args:
+            timeout: Waktu tunggu maksimum untuk hasil pertama (detik)
+
+        Returns:
+            List of (seq, heads) sesuai urutan submit
+        """
+        if not self.is_running:
+            return []
+
+        self._check_workers()
+
+        block = timeout > 0 and not (self._order and self._order[0] in self._results)
+        while True:
+            try:
+                if block:
+                    seq, slot, heads = self._result_queue.get(timeout=timeout)
+                    block = False
+                else:
+                    seq, slot, heads = self._result_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if self._slot_of.get(seq) != slot:
+                # Hasil terlambat: frame sudah timeout, slot boleh dipakai lagi
+                if self._quarantine.get(seq, (None,))[0] == slot:
+                    del self._quarantine[seq]
+                    self._free_slots.append(slot)
+                self.late_count += 1
+                continue
+            del self._slot_of[seq]
+            self._free_slots.append(slot)
+            self.completed_count += 1
+            del self._submitted_at[seq]
+            self._results[seq] = heads
+
+        # Jangan biarkan worker yang hang menahan seluruh stream
+        now = time.monotonic()
+        while self._order and self._order[0] not in self._results:
+            seq = self._order[0]
+            if now - self._submitted_at.get(seq, now) < DETECTION_RESULT_TIMEOUT:
+                break
+            self.logger.warning(f"Detection result for frame {seq} timed out")
+            del self._submitted_at[seq]
+            self._quarantine[seq] = (self._slot_of.pop(seq), now)
+            self._results[seq] = []
+            self.timeout_count += 1
+
+        ready = []
+        while self._order and self._order[0] in self._results:
+            seq = self._order.popleft()
+            ready.append((seq, self._results.pop(seq)))
+
+        return ready
+
+    def close(self, timeout: float = 2.0):
+        """
+        Hentikan worker dan lepaskan shared memory
+
+        Args:
+            timeout: Waktu tunggu maksimum per worker (detik)
+        """
+        if not self.is_running:
+            return
+
+        for _ in self._processes:
+            self._task_queue.put(None)
+
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout)
+            if process.is_alive():
+                process.kill()
+        self._processes = []
+
+        self._order.clear()
+        self._results.clear()
+        self._submitted_at.clear()
+        self._slot_of.clear()
+        self._quarantine.clear()
+
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+        self.logger.info("Detection pool stopped")
+
+    def get_stats(self) -> dict:
+        """
+        Dapatkan statistik pool
+
+        Returns:
+            Dictionary berisi jumlah worker, slot, dan frame
+        """
+        return {
+            "workers": self.workers,
+            "slots": self.slots,
+            "free_slots": len(self._free_slots),
+            "quarantined_slots": len(self._quarantine),
+            "in_flight": len(self._order),
+            "submitted": self.submitted_count,
+            "completed": self.completed_count,
+            "timeouts": self.timeout_count,
+            "late_results": self.late_count,
+            "lost": self.lost_count,
+            "worker_restarts": self.respawn_count
+        }
@@ -0,0 +1,237 @@
+"""
+Encoder module: backend encoding frame (JPEG, WebP, PNG, dan raw BGR/RGBA) dan decoding frame upload
+"""
+
+import logging
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+from config import (
+    JPEG_BACKEND, JPEG_OPTIMIZE, JPEG_PROGRESSIVE, JPEG_SUBSAMPLING, PNG_COMPRESSION
+)
+
+try:
+    import simplejpeg  # Opsional: libjpeg-turbo langsung, tanpa lapisan imgcodecs OpenCV
+except ImportError:
+    simplejpeg = None
+
+logger = logging.getLogger(__name__)
+
+# Chroma subsampling -> flag OpenCV
+_CV_SUBSAMPLING = {
+    "444": cv2.IMWRITE_JPEG_SAMPLING_FACTOR_444,
+    "422": cv2.IMWRITE_JPEG_SAMPLING_FACTOR_422,
+    "420": cv2.IMWRITE_JPEG_SAMPLING_FACTOR_420,
+}
+
+
+class FrameEncoder:
+    """
+    Base class encoder frame BGR ke bytes
+    """
+
+    name = ""
+    lossy = True  # False = parameter kualitas diabaikan
+    compressed = True  # False = pixel mentah (tidak disimpan di ring buffer resume)
+
+    def encode(self, frame: np.ndarray, quality: int) -> bytes:
+        """
+        Encode frame BGR
+
+        Args:
+            frame: Frame BGR (uint8)
+            quality: Kualitas 1-100 (hanya untuk encoder lossy)
+
+        Returns:
+            Frame ter-encode sebagai bytes
+        """
+        raise NotImplementedError
+
+
+class OpenCVJpegEncoder(FrameEncoder):
+    """
+    JPEG melalui cv2.imencode dengan flag optimize/progressive/subsampling
+    """
+
+    name = "jpeg_opencv"
+
+    def __init__(self, optimize: bool = JPEG_OPTIMIZE, progressive: bool = JPEG_PROGRESSIVE,
+                 subsampling: str = JPEG_SUBSAMPLING):
+        """
+        Initialize encoder
+
+        Args:
+            optimize: Hitung Huffman table optimal (file lebih kecil, encode lebih lambat)
+            progressive: Encode JPEG progressive
+            subsampling: Chroma subsampling ("444", "422", "420")
+        """
+        self._flags = []
+        if optimize:
+            self._flags += [cv2.IMWRITE_JPEG_OPTIMIZE, 1]
+        if progressive:
+            self._flags += [cv2.IMWRITE_JPEG_PROGRESSIVE, 1]
+        if subsampling in _CV_SUBSAMPLING:
+            self._flags += [cv2.IMWRITE_JPEG_SAMPLING_FACTOR, _CV_SUBSAMPLING[subsampling]]
+
+    def encode(self, frame: np.ndarray, quality: int) -> bytes:
+        ret, data = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality] + self._flags)
+        if not ret:
+            raise ValueError("JPEG encoding failed")
+        return data.tobytes()
+
+
+class SimpleJpegEncoder(FrameEncoder):
+    """
+    JPEG melalui simplejpeg (libjpeg-turbo); tidak mendukung optimize/progressive
+    """
+
+    name = "jpeg_turbo"
+
+    def __init__(self, subsampling: str = JPEG_SUBSAMPLING):
+        """
+        Initialize encoder
+
+        Args:
+            subsampling: Chroma subsampling ("444", "422", "420")
+        """
+        if simplejpeg is None:
+            raise RuntimeError("simplejpeg is not installed")
+        self.subsampling = subsampling if subsampling in _CV_SUBSAMPLING else "420"
+
+    def encode(self, frame: np.ndarray, quality: int) -> bytes:
+        return simplejpeg.encode_jpeg(frame, quality, colorspace="BGR",
+                                      colorsubsampling=self.subsampling, fastdct=True)
+
+
+class OpenCVWebpEncoder(FrameEncoder):
+    """
+    WebP lossy melalui cv2.imencode
+    """
+
+    name = "webp"
+
+    def encode(self, frame: np.ndarray, quality: int) -> bytes:
+        ret, data = cv2.imencode('.webp', frame, [cv2.IMWRITE_WEBP_QUALITY, quality])
+        if not ret:
+            raise ValueError("WebP encoding failed")
+        return data.tobytes()
+
+
+class OpenCVPngEncoder(FrameEncoder):
+    """
+    PNG lossless melalui cv2.imencode
+    """
+
+    name = "png"
+    lossy = False
+
+    def __init__(self, compression: int = PNG_COMPRESSION):
+        """
+        Initialize encoder
+
+        Args:
+            compression: Level kompresi zlib (0-9)
+        """
+        self.compression = max(0, min(9, compression))
+
+    def encode(self, frame: np.ndarray, quality: int) -> bytes:
+        ret, data = cv2.imencode('.png', frame, [cv2.IMWRITE_PNG_COMPRESSION, self.compression])
+        if not ret:
+            raise ValueError("PNG encoding failed")
+        return data.tobytes()
+
+
+class RawFrameEncoder(FrameEncoder):
+    """
+    Pixel tanpa kompresi (baris top-down, width x height dari pesan meta)
+    untuk client di host yang sama yang ingin melewati decoding
+    """
+
+    lossy = False
+    compressed = False
+
+    def __init__(self, pixel_format: str = "bgr"):
+        """
+        Initialize encoder
+
+        Args:
+            pixel_format: "bgr" (3 byte/pixel) atau "rgba" (4 byte/pixel)
+        """
+        if pixel_format not in ("bgr", "rgba"):
+            raise ValueError(f"Unsupported pixel format: {pixel_format}")
+        self.name = pixel_format
+
+    def encode(self, frame: np.ndarray, quality: int) -> bytes:
+        if self.name == "rgba":
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA)
+        return np.ascontiguousarray(frame).tobytes()
+
+
+def _create_jpeg_encoder() -> FrameEncoder:
+    """
+    Pilih backend JPEG sesuai JPEG_BACKEND; kembali ke OpenCV jika simplejpeg
+    tidak tersedia atau flag yang diminta hanya didukung OpenCV
+
+    Returns:
+        Encoder JPEG
+    """
+    wants_turbo = JPEG_BACKEND == "simplejpeg" or (
+        JPEG_BACKEND == "auto" and not (JPEG_OPTIMIZE or JPEG_PROGRESSIVE)
+    )
+    if wants_turbo and simplejpeg is not None:
+        return SimpleJpegEncoder()
+    if JPEG_BACKEND == "simplejpeg":
+        logger.warning("simplejpeg not installed, falling back to OpenCV JPEG encoder")
+    return OpenCVJpegEncoder()
+
+
+# Format yang bisa dipilih client -> factory encoder
+ENCODER_FACTORIES = {
+    "jpeg": _create_jpeg_encoder,
+    "webp": OpenCVWebpEncoder,
+    "png": OpenCVPngEncoder,
+    "bgr": lambda: RawFrameEncoder("bgr"),
+    "rgba": lambda: RawFrameEncoder("rgba"),
+}
+ENCODER_FORMATS = tuple(ENCODER_FACTORIES)
+
+_encoders: Dict[str, FrameEncoder] = {}
+
+
+def get_encoder(fmt: str) -> FrameEncoder:
+    """
+    Dapatkan encoder untuk format (dibuat sekali lalu dipakai ulang)
+
+    Args:
+        fmt: Nama format (lihat ENCODER_FORMATS)
+
+    Returns:
+        Instance FrameEncoder
+    """
+    encoder = _encoders.get(fmt)
+    if encoder is None:
+        if fmt not in ENCODER_FACTORIES:
+            raise ValueError(f"Unknown frame format: {fmt}")
+        encoder = _encoders.setdefault(fmt, ENCODER_FACTORIES[fmt]())
+    return encoder
+
+
+def decode_frame(data: bytes) -> Optional[np.ndarray]:
+    """
+    Decode frame upload dari client (JPEG lewat simplejpeg jika tersedia,
+    format lain lewat OpenCV)
+
+    Args:
+        data: Gambar ter-encode (JPEG, PNG, WebP)
+
+    Returns:
+        Frame BGR, atau None jika data tidak bisa di-decode
+    """
+    if simplejpeg is not None and bytes(data[:2]) == b"\xff\xd8":
+        try:
+            return simplejpeg.decode_jpeg(data, colorspace="BGR", fastdct=True)
+        except ValueError:
+            pass  # JPEG tidak standar: coba OpenCV
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
@@ -0,0 +1,202 @@
+"""
+Frame buffer module: ring buffer frame ter-encode terakhir dengan sequence number
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from config import FRAME_BUFFER_SIZE, FRAME_BUFFER_SLOT_BYTES, FRAME_BUFFER_MAX_BYTES
+from encoders import get_encoder
+
+ARENA_ALIGN = 64 * 1024  # Arena baru dibulatkan ke kelipatan ini
+
+
+class BufferedFrame:
+    """
+    Satu slot ring buffer: metadata frame dan arena bytes yang dipakai ulang.
+
+    Payload setiap varian disalin berurutan ke `arena`; `offsets` menyimpan
+    posisi (offset, panjang) per varian. Arena hanya diganti (bukan di-resize)
+    jika payload satu frame melebihi kapasitasnya, dan tidak pernah melebihi
+    jatah byte per slot, sehingga setelah pemanasan tidak ada alokasi baru.
+    """
+
+    __slots__ = ("seq", "capture_ts", "detect_ms", "encode_ms", "width", "height",
+                 "heads", "hat_index", "arena", "offsets")
+
+    def __init__(self, slot_bytes: int):
+        self.seq = 0
+        self.capture_ts = 0.0
+        self.detect_ms = 0.0
+        self.encode_ms = 0.0
+        self.width = 0
+        self.height = 0
+        self.heads: List = []
+        self.hat_index = 0
+        self.arena = bytearray(slot_bytes)
+        self.offsets: Dict[Tuple, Tuple[int, int]] = {}
+
+    def view(self, variant: Tuple) -> Optional[memoryview]:
+        """
+        View zero-copy payload satu varian
+
+        Args:
+            variant: Tuple (stream mode, format, kualitas, skala)
+
+        Returns:
+            memoryview ke arena, atau None jika varian tidak ada di frame ini
+        """
+        position = self.offsets.get(variant)
+        if position is None:
+            return None
+        offset, length = position
+        return memoryview(self.arena)[offset:offset + length]
+
+
+class FrameRingBuffer:
+    """
+    Ring buffer berkapasitas tetap berisi frame ter-encode terakhir.
+
+    Slot dan arena dialokasikan sekali di awal dan dipakai ulang; `put`
+    hanya menyalin payload ke arena slot tertua. Ring tidak menyimpan
+    referensi ke FramePacket, sehingga frame mentah (numpy array) milik
+    packet lama tetap bisa dibebaskan.
+
+    Total arena dibatasi `max_bytes` (jatah per slot = max_bytes / capacity).
+    Varian format tanpa kompresi (bgr, rgba) tidak disimpan, dan varian yang
+    melebihi jatah slot dilewati; client varian tersebut tidak mendapat frame
+    saat resume.
+
+    Harus dipakai dari satu thread (thread event loop). View yang dikembalikan
+    hanya berlaku sampai slot-nya ditimpa `capacity` frame kemudian; pembaca
+    yang menyimpan view melewati `await` sebaiknya memeriksa `contains(seq)`
+    sebelum memakainya.
+    """
+
+    def __init__(self, capacity: int = FRAME_BUFFER_SIZE, slot_bytes: int = FRAME_BUFFER_SLOT_BYTES,
+                 max_bytes: int = FRAME_BUFFER_MAX_BYTES):
+        """
+        Initialize ring buffer (semua slot langsung dialokasikan)
+
+        Args:
+            capacity: Jumlah frame yang disimpan
+            slot_bytes: Kapasitas awal arena per slot (semua varian satu frame)
+            max_bytes: Batas total arena semua slot
+        """
+        self.capacity = max(1, capacity)
+        self.max_bytes = max_bytes
+        self.slot_budget = max(1, max_bytes // self.capacity)
+        self._slots = [BufferedFrame(min(slot_bytes, self.slot_budget)) for _ in range(self.capacity)]
+        self.latest_seq = 0
+        self.arena_growths = 0
+        self.skipped_variants = 0
+
+    def put(self, packet) -> BufferedFrame:
+        """
+        Simpan frame yang baru dipublikasikan ke slot tertua
+
+        Args:
+            packet: FramePacket dengan seq dan payload `encoded` per varian
+
+        Returns:
+            Slot yang diisi
+        """
+        slot = self._slots[packet.seq % self.capacity]
+        slot.seq = packet.seq
+        slot.capture_ts = packet.capture_ts
+        slot.detect_ms = packet.detect_ms
+        slot.encode_ms = packet.encode_ms
+        slot.width = packet.width
+        slot.height = packet.height
+        slot.heads = packet.heads
+        slot.hat_index = packet.hat_index
+
+        payloads = []
+        total = 0
+        for variant, payload in packet.encoded.items():
+            if not get_encoder(variant[1]).compressed or total + len(payload) > self.slot_budget:
+                self.skipped_variants += 1
+                continue
+            payloads.append((variant, payload))
+            total += len(payload)
+
+        if total > len(slot.arena):
+            # Arena baru secukupnya, tidak melebihi jatah slot (view lama tetap memegang arena lama)
+            size = -(-(total + total // 4) // ARENA_ALIGN) * ARENA_ALIGN
+            slot.arena = bytearray(min(size, self.slot_budget))
+            self.arena_growths += 1
+
+        slot.offsets.clear()
+        offset = 0
+        arena = slot.arena
+        for variant, payload in payloads:
+            length = len(payload)
+            arena[offset:offset + length] = payload
+            slot.offsets[variant] = (offset, length)
+            offset += length
+
+        self.latest_seq = packet.seq
+        return slot
+
+    @property
+    def oldest_seq(self) -> int:
+        """
+        Sequence frame tertua yang masih tersimpan (0 jika kosong)
+        """
+        if not self.latest_seq:
+            return 0
+        return max(1, self.latest_seq - self.capacity + 1)
+
+    def contains(self, seq: int) -> bool:
+        """
+        Cek apakah frame dengan sequence ini masih ada di buffer
+
+        Args:
+            seq: Sequence number
+
+        Returns:
+            True jika slot-nya belum ditimpa
+        """
+        return seq > 0 and self._slots[seq % self.capacity].seq == seq
+
+    def get(self, seq: int) -> Optional[BufferedFrame]:
+        """
+        Ambil frame berdasarkan sequence number
+
+        Args:
+            seq: Sequence number
+
+        Returns:
+            BufferedFrame, atau None jika sudah ditimpa / belum ada
+        """
+        return self._slots[seq % self.capacity] if self.contains(seq) else None
+
+    def since(self, after_seq: int) -> List[BufferedFrame]:
+        """
+        Semua frame yang masih tersimpan dengan sequence lebih besar dari `after_seq`
+
+        Args:
+            after_seq: Sequence terakhir yang sudah diterima pembaca
+
+        Returns:
+            List BufferedFrame urut naik (bisa mulai setelah celah jika
+            sebagian frame sudah ditimpa)
+        """
+        first = max(after_seq + 1, self.oldest_seq)
+        return [self._slots[seq % self.capacity] for seq in range(first, self.latest_seq + 1)]
+
+    def get_stats(self) -> dict:
+        """
+        Dapatkan statistik buffer
+
+        Returns:
+            Dictionary berisi kapasitas, rentang sequence, dan memori arena
+        """
+        return {
+            "capacity": self.capacity,
+            "oldest_seq": self.oldest_seq,
+            "latest_seq": self.latest_seq,
+            "arena_bytes": sum(len(slot.arena) for slot in self._slots),
+            "max_bytes": self.max_bytes,
+            "arena_growths": self.arena_growths,
+            "skipped_variants": self.skipped_variants
+        }
@@ -0,0 +1,504 @@
+"""
+Frame source module: sumber frame untuk Camera (device, file video, direktori gambar, sintetis)
+"""
+
+import logging
+import math
+import os
+import time
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from config import (
+    FRAME_SOURCE, FRAME_SOURCE_PATH, SOURCE_FPS, SOURCE_LOOP,
+    SYNTHETIC_HEADS, SYNTHETIC_SEED, CAMERA_INDEX, TARGET_FPS
+)
+
+FRAME_SOURCE_TYPES = ("device", "video", "images", "synthetic")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+class FrameSource:
+    """
+    Base class sumber frame. Interface-nya mengikuti cv2.VideoCapture
+    (open/read/release) sehingga capture thread tidak perlu tahu jenis sumber.
+
+    Sumber selain device tidak dibatasi hardware, jadi read() diberi pacing
+    sesuai `fps` agar perilaku pipeline sama seperti dengan kamera asli.
+    """
+
+    kind = ""
+    pace = True  # False: read() secepat mungkin (benchmark), FPS hanya untuk timeline sintetis
+    live = False  # True: frame menumpuk di buffer driver jika tidak dibaca (perlu dikuras saat idle)
+
+    def __init__(self, fps: float = 0):
+        """
+        Initialize source
+
+        Args:
+            fps: FPS pacing untuk read() (0 = tanpa pacing)
+        """
+        self.fps = fps
+        self.width = 0
+        self.height = 0
+        self.frame_index = 0
+        self._next_due = 0.0
+        self.logger = logging.getLogger(__name__)
+
+    def open(self, width: int, height: int) -> bool:
+        """
+        Buka sumber frame
+
+        Args:
+            width: Lebar frame yang diminta
+            height: Tinggi frame yang diminta
+
+        Returns:
+            True jika berhasil
+        """
+        self.width = width
+        self.height = height
+        return True
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """
+        Baca frame berikutnya (blocking sampai jadwal frame berikutnya)
+
+        Returns:
+            Tuple (berhasil, frame BGR)
+        """
+        self._wait_for_next_frame()
+        frame = self._read_frame()
+        if frame is None:
+            return False, None
+        self.frame_index += 1
+        return True, frame
+
+    def grab(self) -> bool:
+        """
+        Lewati satu frame tanpa mengembalikannya (dipakai saat pipeline idle)
+
+        Returns:
+            True jika berhasil
+        """
+        return self.read()[0]
+
+    def _read_frame(self) -> Optional[np.ndarray]:
+        """
+        Ambil frame dari sumber (diimplementasikan subclass)
+
+        Returns:
+            Frame BGR, atau None jika gagal
+        """
+        raise NotImplementedError
+
+    def _wait_for_next_frame(self):
+        """
+        Pacing read() sesuai FPS sumber (deadline scheduler)
+        """
+        if self.fps <= 0 or not self.pace:
+            return
+        now = time.perf_counter()
+        if self._next_due > now:
+            time.sleep(self._next_due - now)
+            now = self._next_due
+        self._next_due = max(self._next_due + 1.0 / self.fps, now)
+
+    def set_resolution(self, width: int, height: int):
+        """
+        Ganti resolusi yang diminta (sumber yang tidak mendukung di-resize oleh pipeline)
+
+        Args:
+            width: Lebar frame
+            height: Tinggi frame
+        """
+        self.width = width
+        self.height = height
+
+    def isOpened(self) -> bool:
+        return True
+
+    def release(self):
+        """
+        Lepas resource sumber
+        """
+
+    def get_info(self) -> dict:
+        """
+        Dapatkan informasi sumber frame
+
+        Returns:
+            Dictionary berisi jenis sumber, FPS, dan jumlah frame terbaca
+        """
+        return {
+            "type": self.kind,
+            "fps": self.fps,
+            "frames_read": self.frame_index
+        }
+
+
+class DeviceSource(FrameSource):
+    """
+    Webcam / capture device melalui cv2.VideoCapture
+    """
+
+    kind = "device"
+    live = True
+
+    def __init__(self, index: int = CAMERA_INDEX):
+        """
+        Initialize source
+
+        Args:
+            index: Index kamera (0 = primary camera)
+        """
+        super().__init__(fps=0)  # Device sudah dibatasi hardware
+        self.index = index
+        self.cap = None
+
+    def open(self, width: int, height: int) -> bool:
+        super().open(width, height)
+        self.cap = cv2.VideoCapture(self.index)
+        if not self.cap.isOpened():
+            self.logger.error(f"Cannot open camera {self.index}")
+            return False
+        self.set_resolution(width, height)
+        return True
+
+    def _read_frame(self) -> Optional[np.ndarray]:
+        if self.cap is None:
+            return None
+        ret, frame = self.cap.read()
+        return frame if ret else None
+
+    def grab(self) -> bool:
+        # Ambil frame dari driver tanpa decode
+        return self.cap is not None and self.cap.grab()
+
+    def set_resolution(self, width: int, height: int):
+        super().set_resolution(width, height)
+        if self.cap is not None and self.cap.isOpened():
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+
+    def isOpened(self) -> bool:
+        return self.cap is not None and self.cap.isOpened()
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def get_info(self) -> dict:
+        info = super().get_info()
+        info["camera_index"] = self.index
+        return info
+
+
+class VideoFileSource(FrameSource):
+    """
+    File video yang diputar berulang (atau berhenti di frame terakhir)
+    """
+
+    kind = "video"
+
+    def __init__(self, path: str, fps: float = SOURCE_FPS, loop: bool = SOURCE_LOOP):
+        """
+        Initialize source
+
+        Args:
+            path: Path file video
+            fps: FPS pemutaran (0 = FPS dari file)
+            loop: Ulang dari awal saat file habis; jika False, frame terakhir diulang
+        """
+        super().__init__(fps)
+        self.path = path
+        self.loop = loop
+        self.cap = None
+        self.loops = 0
+        self._last_frame = None
+
+    def open(self, width: int, height: int) -> bool:
+        super().open(width, height)
+        self.cap = cv2.VideoCapture(self.path)
+        if not self.cap.isOpened():
+            self.logger.error(f"Cannot open video file {self.path}")
+            return False
+        if self.fps <= 0:
+            file_fps = self.cap.get(cv2.CAP_PROP_FPS)
+            self.fps = file_fps if 0 < file_fps <= 240 else TARGET_FPS
+        return True
+
+    def _read_frame(self) -> Optional[np.ndarray]:
+        if self.cap is None:
+            return None
+        ret, frame = self.cap.read()
+        if not ret:
+            if not self.loop:
+                return self._last_frame
+            # Kembali ke awal file
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            self.loops += 1
+            ret, frame = self.cap.read()
+            if not ret:
+                return None
+        self._last_frame = frame
+        return frame
+
+    def isOpened(self) -> bool:
+        return self.cap is not None and self.cap.isOpened()
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def get_info(self) -> dict:
+        info = super().get_info()
+        info.update({"path": self.path, "loop": self.loop, "loops": self.loops})
+        return info
+
+
+class ImageDirectorySource(FrameSource):
+    """
+    Urutan gambar dalam satu direktori (urut nama file), diputar berulang
+    """
+
+    kind = "images"
+
+    def __init__(self, path: str, fps: float = SOURCE_FPS, loop: bool = SOURCE_LOOP):
+        """
+        Initialize source
+
+        Args:
+            path: Direktori berisi gambar
+            fps: FPS pemutaran (0 = TARGET_FPS)
+            loop: Ulang dari gambar pertama; jika False, gambar terakhir diulang
+        """
+        super().__init__(fps if fps > 0 else TARGET_FPS)
+        self.path = path
+        self.loop = loop
+        self.files: List[str] = []
+
+    def open(self, width: int, height: int) -> bool:
+        super().open(width, height)
+        if not os.path.isdir(self.path):
+            self.logger.error(f"Image directory not found: {self.path}")
+            return False
+        self.files = sorted(
+            os.path.join(self.path, name) for name in os.listdir(self.path)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        if not self.files:
+            self.logger.error(f"No images found in {self.path}")
+            return False
+        return True
+
+    def _read_frame(self) -> Optional[np.ndarray]:
+        if not self.files:
+            return None
+        index = self.frame_index % len(self.files) if self.loop else min(self.frame_index, len(self.files) - 1)
+        frame = cv2.imread(self.files[index], cv2.IMREAD_COLOR)
+        if frame is None:
+            self.logger.warning(f"Cannot read image {self.files[index]}")
+        return frame
+
+    def get_info(self) -> dict:
+        info = super().get_info()
+        info.update({"path": self.path, "images": len(self.files), "loop": self.loop})
+        return info
+
+
+class SyntheticSource(FrameSource):
+    """
+    Generator frame deterministik: background bertekstur tetap dan beberapa
+    patch mirip kepala (wajah oval dengan rambut, mata, dan mulut) yang
+    bergerak di lintasan Lissajous. Posisi hanya bergantung pada nomor frame,
+    sehingga run benchmark bisa direproduksi di mesin mana pun. Wajah
+    sintetis terdeteksi oleh cascade opencv_default; ground truth tersedia
+    lewat get_head_boxes().
+    """
+
+    kind = "synthetic"
+
+    def __init__(self, fps: float = SOURCE_FPS, heads: int = SYNTHETIC_HEADS, seed: int = SYNTHETIC_SEED):
+        """
+        Initialize source
+
+        Args:
+            fps: FPS generator (0 = TARGET_FPS)
+            heads: Jumlah patch kepala
+            seed: Seed untuk background dan lintasan
+        """
+        super().__init__(fps if fps > 0 else TARGET_FPS)
+        self.heads = max(0, heads)
+        self.seed = seed
+        self._background = None
+        self._paths = []
+
+    def open(self, width: int, height: int) -> bool:
+        super().open(width, height)
+        self._build()
+        return True
+
+    def set_resolution(self, width: int, height: int):
+        super().set_resolution(width, height)
+        self._build()
+
+    def _build(self):
+        """
+        Render background dan parameter lintasan untuk resolusi saat ini
+        """
+        rng = np.random.default_rng(self.seed)
+        width, height = self.width, self.height
+
+        x = np.linspace(0, 1, width, dtype=np.float32)
+        y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+        background = np.empty((height, width, 3), np.float32)
+        background[..., 0] = 90 + 60 * x
+        background[..., 1] = 100 + 50 * y
+        background[..., 2] = 110 + 40 * (1 - x) * y
+        background += rng.normal(0, 3, background.shape).astype(np.float32)
+        self._background = np.clip(background, 0, 255).astype(np.uint8)
+
+        self._paths = []
+        for _ in range(self.heads):
+            self._paths.append({
+                "size": float(rng.uniform(0.15, 0.25)) * min(width, height),
+                "freq_x": float(rng.uniform(0.2, 0.5)),
+                "freq_y": float(rng.uniform(0.15, 0.4)),
+                "phase_x": float(rng.uniform(0, 2 * math.pi)),
+                "phase_y": float(rng.uniform(0, 2 * math.pi)),
+                "skin": tuple(float(c) for c in rng.uniform((120, 150, 190), (160, 190, 230)))
+            })
+
+    def get_head_boxes(self, frame_index: int) -> List[Tuple[int, int, int, int]]:
+        """
+        Bounding box kepala pada frame tertentu (ground truth untuk benchmark)
+
+        Args:
+            frame_index: Nomor frame
+
+        Returns:
+            List (x, y, w, h)
+        """
+        t = frame_index / self.fps
+        boxes = []
+        for path in self._paths:
+            w = int(path["size"])
+            h = int(path["size"] * 1.25)
+            cx = (0.5 + 0.35 * math.sin(2 * math.pi * path["freq_x"] * t + path["phase_x"])) * self.width
+            cy = (0.5 + 0.3 * math.sin(2 * math.pi * path["freq_y"] * t + path["phase_y"])) * self.height
+            boxes.append((int(cx - w / 2), int(cy - h / 2), w, h))
+        return boxes
+
+    def _read_frame(self) -> Optional[np.ndarray]:
+        frame = self._background.copy()
+        for path, (x, y, w, h) in zip(self._paths, self.get_head_boxes(self.frame_index)):
+            self._draw_head(frame, x, y, w, h, path["skin"])
+        return frame
+
+    @staticmethod
+    def _draw_head(frame: np.ndarray, x: int, y: int, w: int, h: int, skin: tuple):
+        """
+        Gambar patch kepala: rambut, wajah oval, area mata gelap, batang hidung
+        terang, dan mulut (pola terang-gelap yang dikenali Haar cascade)
+
+        Args:
+            frame: Frame BGR (diubah in-place)
+            x, y, w, h: Bounding box kepala
+            skin: Warna kulit (BGR)
+        """
+        dark = (30, 30, 40)
+        shade = tuple(c * 0.55 for c in skin)
+        bright = tuple(min(255.0, c * 1.15) for c in skin)
+        center_x, center_y = x + w // 2, y + h // 2
+
+        cv2.ellipse(frame, (center_x, center_y - h // 10), (w // 2, h // 2), 0, 180, 360, dark, -1, cv2.LINE_AA)
+        cv2.ellipse(frame, (center_x, center_y), (int(w * 0.42), int(h * 0.45)), 0, 0, 360, skin, -1, cv2.LINE_AA)
+
+        eye_y = y + int(h * 0.42)
+        for eye_x in (x + int(w * 0.32), x + int(w * 0.68)):
+            cv2.ellipse(frame, (eye_x, eye_y), (max(1, w // 7), max(1, h // 14)), 0, 0, 360, shade, -1, cv2.LINE_AA)
+            cv2.ellipse(frame, (eye_x, eye_y), (max(1, w // 14), max(1, h // 28)), 0, 0, 360, dark, -1, cv2.LINE_AA)
+            cv2.line(frame, (eye_x - w // 9, eye_y - h // 9), (eye_x + w // 9, eye_y - h // 9), dark, max(2, h // 40))
+
+        nose_y = y + int(h * 0.6)
+        cv2.rectangle(frame, (center_x - w // 20, eye_y - h // 20), (center_x + w // 20, nose_y), bright, -1)
+        cv2.ellipse(frame, (center_x, nose_y), (max(1, w // 10), max(1, h // 30)), 0, 0, 360,
+                    tuple(c * 0.7 for c in skin), -1, cv2.LINE_AA)
+        cv2.ellipse(frame, (center_x, y + int(h * 0.72)), (max(1, w // 7), max(1, h // 28)), 0, 0, 360,
+                    (60, 60, 140), -1, cv2.LINE_AA)
+
+    def get_info(self) -> dict:
+        info = super().get_info()
+        info.update({"heads": self.heads, "seed": self.seed})
+        return info
+
+
+def create_frame_source(kind: str = FRAME_SOURCE, path: str = FRAME_SOURCE_PATH,
+                        camera_index: int = CAMERA_INDEX, fps: float = SOURCE_FPS,
+                        loop: bool = SOURCE_LOOP, heads: int = SYNTHETIC_HEADS,
+                        seed: int = SYNTHETIC_SEED) -> FrameSource:
+    """
+    Buat sumber frame sesuai jenis
+
+    Args:
+        kind: Jenis sumber (device, video, images, synthetic)
+        path: Path file video atau direktori gambar
+        camera_index: Index kamera untuk sumber device
+        fps: FPS untuk sumber selain device (0 = default sumber)
+        loop: Putar ulang file video / urutan gambar
+        heads: Jumlah kepala untuk sumber synthetic
+        seed: Seed untuk sumber synthetic
+
+    Returns:
+        Instance FrameSource
+    """
+    if kind == "device":
+        return DeviceSource(camera_index)
+    if kind == "video":
+        return VideoFileSource(path, fps, loop)
+    if kind == "images":
+        return ImageDirectorySource(path, fps, loop)
+    if kind == "synthetic":
+        return SyntheticSource(fps, heads, seed)
+    raise ValueError(f"Unknown frame source: {kind}")
+
+
+def create_frame_source_from_spec(spec: str, fps: float = SOURCE_FPS, loop: bool = SOURCE_LOOP,
+                                  seed: int = SYNTHETIC_SEED) -> FrameSource:
+    """
+    Buat sumber frame dari spesifikasi teks "jenis[:argumen]", misalnya
+    "device:1", "video:booth.mp4", "images:frames/", atau "synthetic:3"
+
+    Args:
+        spec: Jenis sumber, opsional diikuti index kamera (device), path
+            (video/images), atau jumlah kepala (synthetic)
+        fps: FPS untuk sumber selain device (0 = default sumber)
+        loop: Putar ulang file video / urutan gambar
+        seed: Seed untuk sumber synthetic
+
+    Returns:
+        Instance FrameSource
+    """
+    kind, _, argument = spec.partition(":")
+    kind = kind.strip()
+    if kind not in FRAME_SOURCE_TYPES:
+        raise ValueError(f"Unknown frame source: {kind}")
+    if kind in ("video", "images") and not argument:
+        raise ValueError(f"Frame source {kind} needs a path, e.g. {kind}:PATH")
+
+    if kind in ("video", "images"):
+        return create_frame_source(kind, argument, fps=fps, loop=loop)
+
+    try:
+        number = int(argument) if argument else None
+    except ValueError:
+        raise ValueError(f"Invalid frame source spec: {spec}") from None
+    if kind == "device":
+        return create_frame_source(kind, camera_index=CAMERA_INDEX if number is None else number)
+    heads = SYNTHETIC_HEADS if number is None else number
+    return create_frame_source(kind, fps=fps, heads=heads, seed=seed)
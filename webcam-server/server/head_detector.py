@@ -4,10 +4,15 @@ Head Detector module untuk deteksi kepala dan overlay topi
 
 import cv2
 import numpy as np
-import os
-import glob
 import logging
 from typing import Optional, List, Tuple
+from shared_models import SharedModels, get_shared_models
+from sprite_cache import composite_sprite
+from config import (
+    DETECTION_MAX_DIMENSION, DETECTION_MODE, DETECTION_PROFILE, TRACK_KEYFRAME_INTERVAL, TRACK_MIN_CONFIDENCE,
+    TRACK_SEARCH_MARGIN, TRACK_TEMPLATE_SIZE, ROI_PADDING,
+    ROI_MIN_SIZE_FACTOR, ROI_MAX_SIZE_FACTOR, ROI_FULL_SCAN_INTERVAL
+)
 
 class HeadDetector:
     """
@@ -19,12 +24,29 @@ class HeadDetector:
     CASCADE_LBP_BIWI = "lbp_biwi"
     CASCADE_OPENCV_DEFAULT = "opencv_default"
     
-    def __init__(self):
+    # Detection modes
+    MODE_FULL = "full"
+    MODE_TRACK = "track"
+    MODE_ROI = "roi"
+    DETECTION_MODES = (MODE_FULL, MODE_TRACK, MODE_ROI)
+    
+    # Profil deteksi bawaan (parameter lama, selalu tersedia)
+    PROFILE_DEFAULT = "default"
+    DEFAULT_SCALE_FACTOR = 1.1
+    DEFAULT_MIN_NEIGHBORS = 3
+    DEFAULT_MIN_SIZE = (60, 60)
+    
+    def __init__(self, models: Optional[SharedModels] = None):
         """
         Initialize HeadDetector
+        
+        Args:
+            models: Cascade dan aset topi bersama (default: milik process ini)
         """
         self.logger = logging.getLogger(__name__)
+        self.models = models if models is not None else get_shared_models()
         self.cascades = {}
+        self.cascade_paths = {}
         self.current_cascade_type = self.CASCADE_HAAR_BIWI
         self.current_cascade = None
         
@@ -32,11 +54,41 @@ class HeadDetector:
         self.hat_images = []
         self.current_hat_idx = 0
         self.current_hat = None
-        
-        # Detection parameters
-        self.scale_factor = 1.1
-        self.min_neighbors = 3
-        self.min_size = (60, 60)
+        self.sprite_cache = None
+        
+        # Detection parameters (diatur profil deteksi per cascade)
+        self.scale_factor = self.DEFAULT_SCALE_FACTOR
+        self.min_neighbors = self.DEFAULT_MIN_NEIGHBORS
+        self.min_size = self.DEFAULT_MIN_SIZE
+        self.detection_profiles = self.models.detection_profiles
+        self.detection_profile = self.PROFILE_DEFAULT
+        
+        # Resolusi deteksi terpisah dari resolusi stream
+        self.detection_max_dimension = DETECTION_MAX_DIMENSION
+        self._detection_shape = None
+        self._detection_min_size = self.min_size
+        
+        # Detection mode dan state tracking
+        self.detection_mode = DETECTION_MODE if DETECTION_MODE in self.DETECTION_MODES else self.MODE_FULL
+        self.track_keyframe_interval = TRACK_KEYFRAME_INTERVAL
+        self.track_min_confidence = TRACK_MIN_CONFIDENCE
+        self.track_search_margin = TRACK_SEARCH_MARGIN
+        self.roi_padding = ROI_PADDING
+        self.roi_min_size_factor = ROI_MIN_SIZE_FACTOR
+        self.roi_max_size_factor = ROI_MAX_SIZE_FACTOR
+        self.roi_full_scan_interval = ROI_FULL_SCAN_INTERVAL
+        self._tracks = []  # List of (box, template, template_scale)
+        self._frames_since_keyframe = 0
+        self._needs_keyframe = True  # Keyframe langsung setelah start, ganti mode, atau ganti resolusi
+        self._last_heads = []  # Box hasil frame sebelumnya (mode roi)
+        self.detection_stats = {
+            "frames": 0,
+            "full_scans": 0,
+            "tracked_frames": 0,
+            "redetects": 0,
+            "roi_hits": 0,
+            "roi_misses": 0
+        }
         
         # Enable/disable detection - DEFAULT TRUE untuk langsung jalan!
         self.enabled = True
@@ -44,37 +96,14 @@ class HeadDetector:
         # Load cascades and hats
         self._load_cascades()
         self._load_hats()
+        self._load_profile()
     
     def _load_cascades(self):
         """
-        Load semua cascade classifiers
+        Ambil cascade classifiers dari model bersama (instance milik detector ini)
         """
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        models_dir = os.path.join(base_dir, "..", "models")
-        
-        # Load HAAR Biwi
-        haar_path = os.path.join(models_dir, "haar_biwi_cascade.xml")
-        if os.path.exists(haar_path):
-            self.cascades[self.CASCADE_HAAR_BIWI] = cv2.CascadeClassifier(haar_path)
-            self.logger.info(f"✓ HAAR Biwi cascade loaded from {haar_path}")
-        else:
-            self.logger.warning(f"✗ HAAR Biwi cascade not found at {haar_path}")
-        
-        # Load LBP Biwi
-        lbp_path = os.path.join(models_dir, "lbp_biwi_cascade.xml")
-        if os.path.exists(lbp_path):
-            self.cascades[self.CASCADE_LBP_BIWI] = cv2.CascadeClassifier(lbp_path)
-            self.logger.info(f"✓ LBP Biwi cascade loaded from {lbp_path}")
-        else:
-            self.logger.warning(f"✗ LBP Biwi cascade not found at {lbp_path}")
-        
-        # Load OpenCV default (haarcascade_frontalface_default)
-        opencv_path = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-        if os.path.exists(opencv_path):
-            self.cascades[self.CASCADE_OPENCV_DEFAULT] = cv2.CascadeClassifier(opencv_path)
-            self.logger.info(f"✓ OpenCV default cascade loaded")
-        else:
-            self.logger.warning(f"✗ OpenCV default cascade not found")
+        self.cascade_paths = dict(self.models.cascade_paths)
+        self.cascades = self.models.create_cascades()
         
         # Set current cascade
         if self.current_cascade_type in self.cascades:
@@ -85,32 +114,66 @@ class HeadDetector:
     
     def _load_hats(self):
         """
-        Load semua gambar topi dari folder assets/hats
+        Ambil gambar topi dan sprite cache dari model bersama
         """
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        hats_dir = os.path.join(base_dir, "..", "assets", "hats")
-        
-        if not os.path.exists(hats_dir):
-            self.logger.warning(f"Hats directory not found: {hats_dir}")
-            return
-        
-        # Load semua file PNG
-        hat_files = sorted(glob.glob(os.path.join(hats_dir, "*.png")))
-        
-        for hat_file in hat_files:
-            hat_img = cv2.imread(hat_file, cv2.IMREAD_UNCHANGED)
-            if hat_img is not None:
-                self.hat_images.append({
-                    "name": os.path.basename(hat_file),
-                    "image": hat_img
-                })
-                self.logger.info(f"✓ Hat loaded: {os.path.basename(hat_file)}")
+        self.hat_images = self.models.hat_images
+        self.sprite_cache = self.models.sprite_cache
         
         if self.hat_images:
             self.current_hat = self.hat_images[0]
             self.logger.info(f"Current hat: {self.current_hat['name']}")
+    
+    def _load_profile(self):
+        """
+        Pilih profil deteksi awal: DETECTION_PROFILE, lalu profil aktif di file
+        """
+        name = DETECTION_PROFILE or self.models.active_profile or self.PROFILE_DEFAULT
+        if not self.set_detection_profile(name):
+            self.set_detection_profile(self.PROFILE_DEFAULT)
+    
+    def _apply_profile(self):
+        """
+        Terapkan parameter profil aktif untuk cascade aktif (parameter bawaan
+        jika profil tidak punya entri untuk cascade ini)
+        """
+        params = self.detection_profiles.get(self.detection_profile, {}).get(self.current_cascade_type)
+        if params is None:
+            self.scale_factor = self.DEFAULT_SCALE_FACTOR
+            self.min_neighbors = self.DEFAULT_MIN_NEIGHBORS
+            self.min_size = self.DEFAULT_MIN_SIZE
         else:
-            self.logger.warning("No hat images found")
+            self.scale_factor = params["scale_factor"]
+            self.min_neighbors = params["min_neighbors"]
+            self.min_size = params["min_size"]
+    
+    def get_profile_names(self) -> List[str]:
+        """
+        Nama profil deteksi yang tersedia
+        
+        Returns:
+            List nama profil ("default" selalu ada)
+        """
+        return [self.PROFILE_DEFAULT] + [name for name in self.detection_profiles if name != self.PROFILE_DEFAULT]
+    
+    def set_detection_profile(self, name: str) -> bool:
+        """
+        Set profil deteksi (scale_factor, min_neighbors, min_size per cascade)
+        
+        Args:
+            name: Nama profil dari file profil, atau "default"
+            
+        Returns:
+            True jika berhasil, False jika profil tidak dikenal
+        """
+        if name != self.PROFILE_DEFAULT and name not in self.detection_profiles:
+            self.logger.error(f"Unknown detection profile: {name}")
+            return False
+        
+        self.detection_profile = name
+        self._apply_profile()
+        self.logger.info(f"Detection profile changed to: {name} (scale_factor={self.scale_factor}, "
+                         f"min_neighbors={self.min_neighbors}, min_size={self.min_size})")
+        return True
     
     def set_cascade(self, cascade_type: str) -> bool:
         """
@@ -128,6 +191,7 @@ class HeadDetector:
         
         self.current_cascade_type = cascade_type
         self.current_cascade = self.cascades[cascade_type]
+        self._apply_profile()
         self.logger.info(f"Cascade changed to: {cascade_type}")
         return True
     
@@ -184,6 +248,28 @@ class HeadDetector:
         self.logger.info(f"Hat changed to: {self.current_hat['name']}")
         return True
     
+    def set_detection_mode(self, mode: str) -> bool:
+        """
+        Set mode deteksi
+        
+        Args:
+            mode: "full", "track", atau "roi"
+            
+        Returns:
+            True jika berhasil, False jika mode tidak dikenal
+        """
+        if mode not in self.DETECTION_MODES:
+            self.logger.error(f"Unknown detection mode: {mode}")
+            return False
+        
+        self.detection_mode = mode
+        self._tracks = []
+        self._last_heads = []
+        self._frames_since_keyframe = 0
+        self._needs_keyframe = True
+        self.logger.info(f"Detection mode changed to: {mode}")
+        return True
+    
     def detect_heads(self, frame: np.ndarray) -> List[Tuple[int, int, int, int]]:
         """
         Deteksi kepala pada frame
@@ -197,19 +283,305 @@ class HeadDetector:
         if self.current_cascade is None:
             return []
         
-        # Convert to grayscale
+        gray, scale = self.prepare_gray(frame)
+        return self.detect_heads_gray(gray, scale)
+    
+    def prepare_gray(self, frame: np.ndarray) -> Tuple[np.ndarray, float]:
+        """
+        Convert frame ke grayscale, lalu perkecil ke resolusi deteksi
+        
+        Args:
+            frame: Frame BGR
+            
+        Returns:
+            Tuple (gambar grayscale, skala deteksi)
+        """
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        scale = self.get_detection_scale(gray.shape[1], gray.shape[0])
+        if scale < 1.0:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return gray, scale
+    
+    def detect_heads_gray(self, gray: np.ndarray, scale: float) -> List[Tuple[int, int, int, int]]:
+        """
+        Deteksi kepala pada gambar grayscale hasil prepare_gray
+        
+        Args:
+            gray: Gambar grayscale di resolusi deteksi
+            scale: Skala deteksi (dari prepare_gray)
+            
+        Returns:
+            List of (x, y, w, h) dalam koordinat frame asli
+        """
+        if self.current_cascade is None:
+            return []
+        
+        # State tracking/roi disimpan dalam koordinat deteksi
+        if gray.shape != self._detection_shape:
+            self._detection_shape = gray.shape
+            self._tracks = []
+            self._last_heads = []
+            self._frames_since_keyframe = 0
+            self._needs_keyframe = True
+        self._detection_min_size = self._scale_min_size(scale)
+        
+        self.detection_stats["frames"] += 1
+        
+        if self.detection_mode == self.MODE_TRACK:
+            heads = self._detect_track(gray)
+        elif self.detection_mode == self.MODE_ROI:
+            heads = self._detect_roi(gray)
+        else:
+            heads = self._detect_full(gray)
+        
+        return self.rescale_boxes(heads, scale)
+    
+    def get_detection_scale(self, width: int, height: int) -> float:
+        """
+        Faktor skala dari resolusi frame ke resolusi deteksi
+        
+        Args:
+            width: Lebar frame
+            height: Tinggi frame
+            
+        Returns:
+            Faktor skala (<= 1.0)
+        """
+        if self.detection_max_dimension <= 0:
+            return 1.0
+        return min(1.0, self.detection_max_dimension / max(width, height))
+    
+    def _scale_min_size(self, scale: float) -> Tuple[int, int]:
+        """
+        Sesuaikan min_size ke resolusi deteksi
+        
+        Args:
+            scale: Faktor skala deteksi
+            
+        Returns:
+            Tuple (min_width, min_height) dalam koordinat deteksi
+        """
+        return (max(1, int(round(self.min_size[0] * scale))),
+                max(1, int(round(self.min_size[1] * scale))))
+    
+    @staticmethod
+    def rescale_boxes(heads: List, scale: float) -> List[Tuple[int, int, int, int]]:
+        """
+        Petakan box dari koordinat deteksi kembali ke koordinat frame output
+        
+        Args:
+            heads: List of (x, y, w, h) dalam koordinat deteksi
+            scale: Faktor skala deteksi
+            
+        Returns:
+            List of (x, y, w, h) dalam koordinat frame
+        """
+        if scale == 1.0:
+            return list(heads)
+        return [tuple(int(round(v / scale)) for v in box) for box in heads]
+    
+    def _detect_full(self, gray: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        """
+        Scan cascade penuh pada seluruh frame grayscale
+        
+        Args:
+            gray: Frame grayscale
+            
+        Returns:
+            List of (x, y, w, h)
+        """
+        self.detection_stats["full_scans"] += 1
         
         # Detect heads
         heads = self.current_cascade.detectMultiScale(
             gray,
             scaleFactor=self.scale_factor,
             minNeighbors=self.min_neighbors,
-            minSize=self.min_size
+            minSize=self._detection_min_size
         )
         
+        return [tuple(int(v) for v in box) for box in heads]
+    
+    def _detect_roi(self, gray: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        """
+        Deteksi incremental: scan hanya window ber-padding di sekitar box sebelumnya.
+        
+        Scan full-frame tetap dijalankan secara periodik, dan langsung saat
+        pencarian ROI gagal, agar orang baru tetap terdeteksi.
+        
+        Args:
+            gray: Frame grayscale
+            
+        Returns:
+            List of (x, y, w, h)
+        """
+        if not self._last_heads or self._frames_since_keyframe >= self.roi_full_scan_interval - 1:
+            return self._full_scan_roi(gray)
+        
+        heads = []
+        for box in self._last_heads:
+            found = self._search_roi(gray, box)
+            if found is None:
+                self.detection_stats["roi_misses"] += 1
+                return self._full_scan_roi(gray)
+            heads.append(found)
+        
+        self.detection_stats["roi_hits"] += 1
+        self._frames_since_keyframe += 1
+        self._last_heads = heads
         return heads
     
+    def _full_scan_roi(self, gray: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        """
+        Scan full-frame untuk mode roi dan reset counter interval
+        
+        Args:
+            gray: Frame grayscale
+            
+        Returns:
+            List of (x, y, w, h)
+        """
+        heads = self._detect_full(gray)
+        self._last_heads = heads
+        self._frames_since_keyframe = 0
+        return heads
+    
+    def _search_roi(self, gray: np.ndarray,
+                    box: Tuple[int, int, int, int]) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Jalankan cascade pada window di sekitar box sebelumnya dengan rentang ukuran terbatas
+        
+        Args:
+            gray: Frame grayscale
+            box: Box sebelumnya (x, y, w, h)
+            
+        Returns:
+            Box baru yang paling dekat dengan box sebelumnya, atau None jika tidak ditemukan
+        """
+        x, y, w, h = box
+        pad_x = int(w * self.roi_padding)
+        pad_y = int(h * self.roi_padding)
+        
+        x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+        x1 = min(gray.shape[1], x + w + pad_x)
+        y1 = min(gray.shape[0], y + h + pad_y)
+        
+        min_size = (int(w * self.roi_min_size_factor), int(h * self.roi_min_size_factor))
+        max_size = (int(w * self.roi_max_size_factor), int(h * self.roi_max_size_factor))
+        
+        if x1 - x0 < min_size[0] or y1 - y0 < min_size[1]:
+            return None
+        
+        candidates = self.current_cascade.detectMultiScale(
+            gray[y0:y1, x0:x1],
+            scaleFactor=self.scale_factor,
+            minNeighbors=self.min_neighbors,
+            minSize=min_size,
+            maxSize=max_size
+        )
+        
+        if len(candidates) == 0:
+            return None
+        
+        # Pilih kandidat dengan pusat terdekat ke box sebelumnya
+        cx, cy = x + w / 2 - x0, y + h / 2 - y0
+        bx, by, bw, bh = min(
+            candidates,
+            key=lambda c: (c[0] + c[2] / 2 - cx) ** 2 + (c[1] + c[3] / 2 - cy) ** 2
+        )
+        return (x0 + int(bx), y0 + int(by), int(bw), int(bh))
+    
+    def _detect_track(self, gray: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        """
+        Detect-then-track: cascade hanya di keyframe, template matching di antaranya
+        
+        Args:
+            gray: Frame grayscale
+            
+        Returns:
+            List of (x, y, w, h)
+        """
+        # Awal, ganti mode, ganti resolusi: langsung keyframe. Keyframe kosong
+        # tetap menunggu interval agar scene tanpa kepala tidak di-scan setiap frame
+        if self._needs_keyframe or self._frames_since_keyframe >= self.track_keyframe_interval - 1:
+            return self._keyframe(gray)
+        
+        self._frames_since_keyframe += 1
+        
+        tracks = []
+        for box, template, template_scale in self._tracks:
+            new_box = self._track_box(gray, box, template, template_scale)
+            if new_box is None:
+                # Confidence turun: langsung re-detect
+                self.detection_stats["redetects"] += 1
+                return self._keyframe(gray)
+            tracks.append((new_box, template, template_scale))
+        
+        self._tracks = tracks
+        self.detection_stats["tracked_frames"] += 1
+        return [box for box, _, _ in tracks]
+    
+    def _keyframe(self, gray: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        """
+        Jalankan cascade penuh dan simpan template untuk tracking berikutnya
+        
+        Args:
+            gray: Frame grayscale
+            
+        Returns:
+            List of (x, y, w, h)
+        """
+        heads = self._detect_full(gray)
+        
+        self._tracks = []
+        for (x, y, w, h) in heads:
+            template_scale = min(1.0, TRACK_TEMPLATE_SIZE / max(w, h))
+            template = cv2.resize(gray[y:y + h, x:x + w], None,
+                                  fx=template_scale, fy=template_scale,
+                                  interpolation=cv2.INTER_AREA)
+            self._tracks.append(((x, y, w, h), template, template_scale))
+        
+        self._frames_since_keyframe = 0
+        self._needs_keyframe = False
+        return heads
+    
+    def _track_box(self, gray: np.ndarray, box: Tuple[int, int, int, int],
+                   template: np.ndarray, template_scale: float) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Cari posisi baru box dengan template matching di sekitar posisi lama
+        
+        Args:
+            gray: Frame grayscale
+            box: Box sebelumnya (x, y, w, h)
+            template: Template grayscale (sudah di-downscale)
+            template_scale: Faktor skala template terhadap frame
+            
+        Returns:
+            Box baru, atau None jika confidence di bawah threshold
+        """
+        x, y, w, h = box
+        margin_x = int(w * self.track_search_margin)
+        margin_y = int(h * self.track_search_margin)
+        
+        x0, y0 = max(0, x - margin_x), max(0, y - margin_y)
+        x1 = min(gray.shape[1], x + w + margin_x)
+        y1 = min(gray.shape[0], y + h + margin_y)
+        
+        window = cv2.resize(gray[y0:y1, x0:x1], None,
+                            fx=template_scale, fy=template_scale,
+                            interpolation=cv2.INTER_AREA)
+        if window.shape[0] < template.shape[0] or window.shape[1] < template.shape[1]:
+            return None
+        
+        result = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+        _, confidence, _, location = cv2.minMaxLoc(result)
+        
+        if confidence < self.track_min_confidence:
+            return None
+        
+        return (x0 + int(round(location[0] / template_scale)),
+                y0 + int(round(location[1] / template_scale)), w, h)
+    
     def overlay_hat(self, frame: np.ndarray, x: int, y: int, w: int, h: int) -> np.ndarray:
         """
         Overlay topi pada kepala yang terdeteksi
@@ -233,39 +605,18 @@ class HeadDetector:
         hat_width = int(w * 1.5)  # Topi lebih lebar dari kepala
         hat_height = int(h * 1.5)  # Tinggi topi
         
-        # Resize topi
-        hat_resized = cv2.resize(hat_img, (hat_width, hat_height))
+        # Ambil sprite dari cache (resize hanya saat size bucket berubah)
+        hat_premul, hat_inv_alpha = self.sprite_cache.get(
+            self.current_hat["name"], hat_img, hat_width, hat_height
+        )
+        hat_height, hat_width = hat_premul.shape[:2]
         
-        # Posisi topi di atas kepala
+        # Posisi topi di atas kepala (boleh keluar frame, sprite akan dipotong)
         hat_x = int(x + (w - hat_width) / 2)  # Center horizontally
         hat_y = int(y - hat_height * 0.6)  # Di atas kepala
         
-        # Pastikan topi tidak keluar dari frame
-        hat_x = max(0, hat_x)
-        hat_y = max(0, hat_y)
-        
-        # Hitung ROI di frame
-        hat_x_end = min(frame.shape[1], hat_x + hat_width)
-        hat_y_end = min(frame.shape[0], hat_y + hat_height)
-        
-        # Hitung ukuran topi yang valid
-        valid_hat_width = hat_x_end - hat_x
-        valid_hat_height = hat_y_end - hat_y
-        
-        if valid_hat_width <= 0 or valid_hat_height <= 0:
-            return frame
-        
-        # Extract alpha channel
-        hat_bgr = hat_resized[:valid_hat_height, :valid_hat_width, :3]
-        hat_alpha = hat_resized[:valid_hat_height, :valid_hat_width, 3:4] / 255.0
-        
-        # Ambil ROI dari frame
-        frame_roi = frame[hat_y:hat_y_end, hat_x:hat_x_end]
-        
-        # Overlay dengan alpha blending
-        frame[hat_y:hat_y_end, hat_x:hat_x_end] = (
-            hat_bgr * hat_alpha + frame_roi * (1 - hat_alpha)
-        ).astype(np.uint8)
+        # Overlay dengan alpha blending in-place
+        composite_sprite(frame, hat_premul, hat_inv_alpha, hat_x, hat_y)
         
         return frame
     
@@ -286,6 +637,22 @@ class HeadDetector:
         # Detect heads
         heads = self.detect_heads(frame)
         
+        frame = self.draw_heads(frame, heads, draw_bbox)
+        
+        return frame, heads
+    
+    def draw_heads(self, frame: np.ndarray, heads: List, draw_bbox: bool = True) -> np.ndarray:
+        """
+        Overlay topi (dan bounding box) untuk kepala yang sudah terdeteksi
+        
+        Args:
+            frame: Frame BGR
+            heads: List of (x, y, w, h)
+            draw_bbox: Jika True, gambar bounding box pada kepala
+            
+        Returns:
+            Frame dengan overlay
+        """
         # Process setiap kepala yang terdeteksi
         for (x, y, w, h) in heads:
             # Overlay topi
@@ -297,7 +664,20 @@ class HeadDetector:
                 cv2.putText(frame, "Head", (x, y-10), 
                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
         
-        return frame, heads
+        return frame
+    
+    def get_detection_params(self, scale: float = 1.0) -> Tuple:
+        """
+        Parameter deteksi saat ini dalam bentuk yang bisa dikirim ke worker process
+        
+        Args:
+            scale: Faktor skala deteksi (min_size disesuaikan)
+            
+        Returns:
+            Tuple (cascade_type, scale_factor, min_neighbors, min_size)
+        """
+        return (self.current_cascade_type, self.scale_factor,
+                self.min_neighbors, self._scale_min_size(scale))
     
     def toggle_detection(self, enable: bool):
         """
@@ -319,9 +699,20 @@ class HeadDetector:
         return {
             "enabled": self.enabled,
             "cascade_type": self.current_cascade_type,
+            "detection_mode": self.detection_mode,
+            "detection_profile": self.detection_profile,
+            "available_profiles": self.get_profile_names(),
+            "detection_params": {
+                "scale_factor": self.scale_factor,
+                "min_neighbors": self.min_neighbors,
+                "min_size": list(self.min_size)
+            },
+            "detection_max_dimension": self.detection_max_dimension,
+            "detection_stats": dict(self.detection_stats),
             "available_cascades": list(self.cascades.keys()),
             "current_hat": self.current_hat["name"] if self.current_hat else None,
             "current_hat_index": self.current_hat_idx,
             "total_hats": len(self.hat_images),
-            "available_hats": [hat["name"] for hat in self.hat_images]
+            "available_hats": [hat["name"] for hat in self.hat_images],
+            "sprite_cache": self.sprite_cache.get_stats()
         }
@@ -0,0 +1,357 @@
+"""
+Metrics module: counter/histogram per-stage, endpoint HTTP Prometheus, dan snapshot untuk pesan "stats"
+"""
+
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import METRICS_ENABLED
+
+# Bucket durasi (ms) untuk stage pipeline dan send
+DURATION_BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 35, 50, 75, 100, 150, 250, 500, 1000)
+
+# Bucket time-to-first-frame (ms) setelah pipeline idle; membuka ulang device bisa makan detik
+WAKE_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2000, 5000, 10000)
+
+# Satu family metric: (nama, tipe, help, [(labels, value)])
+MetricFamily = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+class Histogram:
+    """
+    Histogram thread-safe dengan bucket tetap (kumulatif saat di-render)
+    """
+
+    def __init__(self, name: str, help_text: str, buckets: tuple = DURATION_BUCKETS_MS,
+                 label_name: Optional[str] = None):
+        """
+        Initialize histogram
+
+        Args:
+            name: Nama metric
+            help_text: Deskripsi metric
+            buckets: Batas atas bucket (urut naik)
+            label_name: Nama label opsional (misal "stage")
+        """
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.label_name = label_name
+        self._series: Dict[str, list] = {}  # label value -> [counts per bucket + inf, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, label: str = ""):
+        """
+        Catat satu observasi
+
+        Args:
+            value: Nilai observasi
+            label: Nilai label (jika histogram punya label)
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label)
+            if series is None:
+                series = self._series[label] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def _copy(self) -> Dict[str, list]:
+        with self._lock:
+            return {label: [list(counts), total, count]
+                    for label, (counts, total, count) in self._series.items()}
+
+    def render(self) -> List[str]:
+        """
+        Render dalam format teks Prometheus
+
+        Returns:
+            List baris teks
+        """
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label, (counts, total, count) in sorted(self._copy().items()):
+            base = f'{self.label_name}="{label}",' if self.label_name else ""
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else format_value(bound)
+                lines.append(f'{self.name}_bucket{{{base}le="{le}"}} {cumulative}')
+            suffix = f"{{{base.rstrip(',')}}}" if base else ""
+            lines.append(f"{self.name}_sum{suffix} {format_value(total)}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+    def summary(self) -> Dict[str, dict]:
+        """
+        Ringkasan per label: jumlah, rata-rata, dan estimasi p50/p95/p99 dari bucket
+
+        Returns:
+            Dictionary label -> ringkasan
+        """
+        result = {}
+        for label, (counts, total, count) in self._copy().items():
+            result[label or "all"] = {
+                "count": count,
+                "mean": round(total / count, 3) if count else 0.0,
+                "p50": self._quantile(counts, count, 0.50),
+                "p95": self._quantile(counts, count, 0.95),
+                "p99": self._quantile(counts, count, 0.99)
+            }
+        return result
+
+    def _quantile(self, counts: list, count: int, q: float) -> float:
+        """
+        Estimasi quantile dengan interpolasi linear di dalam bucket
+        """
+        if not count:
+            return 0.0
+        target = q * count
+        cumulative = 0
+        lower = 0.0
+        for bound, bucket_count in zip(self.buckets, counts):
+            if cumulative + bucket_count >= target:
+                fraction = (target - cumulative) / bucket_count if bucket_count else 0.0
+                return round(lower + (bound - lower) * fraction, 3)
+            cumulative += bucket_count
+            lower = bound
+        return float(self.buckets[-1])
+
+
+class ServerMetrics:
+    """
+    Registry metric server.
+
+    Histogram diisi langsung oleh stage (capture, detect, overlay, encode,
+    send). Counter dan gauge lain dibaca dari statistik yang sudah ada
+    (pipeline, publisher, client session) saat di-scrape melalui collector,
+    sehingga tidak menambah biaya di jalur frame.
+    """
+
+    FPS_SMOOTHING = 0.1  # Bobot EMA untuk capture FPS
+
+    def __init__(self):
+        """
+        Initialize registry
+        """
+        self.stage_duration = Histogram(
+            "vto_stage_duration_ms", "Duration of pipeline stages in milliseconds", label_name="stage"
+        )
+        self.frame_latency = Histogram(
+            "vto_capture_to_publish_ms", "Latency from frame capture to publication in milliseconds"
+        )
+        self.send_duration = Histogram(
+            "vto_send_duration_ms", "Duration of websocket frame sends in milliseconds"
+        )
+        self.time_to_first_frame = Histogram(
+            "vto_time_to_first_frame_ms", "Time from the first client after idle to the first published frame "
+            "in milliseconds", buckets=WAKE_BUCKETS_MS, label_name="state"
+        )
+        self.bytes_sent = 0
+        self.frames_sent = 0
+        self.capture_fps: Dict[str, float] = {}  # Nama kamera -> capture FPS
+        self._last_capture: Dict[str, float] = {}
+        self._collectors: List[Callable[[], List[MetricFamily]]] = []
+        self.started_at = time.time()
+
+    def observe_capture(self, timestamp: float, camera: str = ""):
+        """
+        Catat waktu capture satu frame (untuk capture FPS per kamera)
+
+        Args:
+            timestamp: Waktu capture (perf_counter)
+            camera: Nama kamera
+        """
+        last = self._last_capture.get(camera)
+        if last:
+            interval = timestamp - last
+            if interval > 0:
+                fps = 1.0 / interval
+                current = self.capture_fps.get(camera)
+                self.capture_fps[camera] = fps if not current else \
+                    current + self.FPS_SMOOTHING * (fps - current)
+        self._last_capture[camera] = timestamp
+
+    def observe_idle(self, camera: str = ""):
+        """
+        Catat bahwa capture kamera berhenti (pipeline idle)
+
+        Args:
+            camera: Nama kamera
+        """
+        self.capture_fps[camera] = 0.0
+        self._last_capture.pop(camera, None)
+
+    def observe_send(self, send_ms: float, size: int):
+        """
+        Catat satu frame terkirim ke client
+
+        Args:
+            send_ms: Durasi send (ms)
+            size: Ukuran payload (bytes)
+        """
+        self.send_duration.observe(send_ms)
+        self.bytes_sent += size
+        self.frames_sent += 1
+
+    def add_collector(self, collector: Callable[[], List[MetricFamily]]):
+        """
+        Daftarkan fungsi yang mengembalikan metric family saat scrape
+
+        Args:
+            collector: Callable tanpa argumen
+        """
+        self._collectors.append(collector)
+
+    def collect(self) -> List[MetricFamily]:
+        """
+        Kumpulkan semua counter dan gauge
+
+        Returns:
+            List metric family
+        """
+        families: List[MetricFamily] = [
+            ("vto_uptime_seconds", "gauge", "Seconds since the server started",
+             [({}, time.time() - self.started_at)]),
+            ("vto_capture_fps", "gauge", "Smoothed capture frame rate",
+             [({"camera": camera} if camera else {}, fps) for camera, fps in list(self.capture_fps.items())]),
+            ("vto_frames_sent_total", "counter", "Frames sent to all clients",
+             [({}, self.frames_sent)]),
+            ("vto_bytes_sent_total", "counter", "Frame bytes sent to all clients",
+             [({}, self.bytes_sent)]),
+        ]
+        for collector in self._collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                logging.getLogger(__name__).debug(f"Metrics collector failed: {e}")
+        return families
+
+    def render_prometheus(self) -> str:
+        """
+        Render semua metric dalam format teks Prometheus (version 0.0.4)
+
+        Returns:
+            Teks exposition
+        """
+        lines = []
+        for name, metric_type, help_text, samples in self.collect():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{escape_label(val)}"' for key, val in labels.items())
+                lines.append(f"{name}{{{label_text}}} {format_value(value)}" if label_text
+                             else f"{name} {format_value(value)}")
+        for histogram in (self.stage_duration, self.frame_latency, self.send_duration, self.time_to_first_frame):
+            lines.extend(histogram.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """
+        Snapshot metric untuk pesan WebSocket "stats"
+
+        Returns:
+            Dictionary berisi counter, gauge, dan ringkasan histogram
+        """
+        values = {}
+        for name, _, _, samples in self.collect():
+            if len(samples) == 1 and not samples[0][0]:
+                values[name] = round(samples[0][1], 3)
+            else:
+                values[name] = [dict(labels, value=round(value, 3)) for labels, value in samples]
+        values["stage_duration_ms"] = self.stage_duration.summary()
+        values["capture_to_publish_ms"] = self.frame_latency.summary().get("all", {})
+        values["send_duration_ms"] = self.send_duration.summary().get("all", {})
+        values["time_to_first_frame_ms"] = self.time_to_first_frame.summary()
+        return values
+
+
+class MetricsHttpServer:
+    """
+    Endpoint HTTP minimal (GET /metrics) untuk scraping Prometheus
+    """
+
+    def __init__(self, registry: ServerMetrics, host: str, port: int):
+        """
+        Initialize endpoint
+
+        Args:
+            registry: Registry metric
+            host: Host bind (default lokal saja)
+            port: Port HTTP
+        """
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.server = None
+        self.logger = logging.getLogger(__name__)
+
+    async def start(self):
+        """
+        Mulai listen
+        """
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.logger.info(f"Metrics endpoint on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        """
+        Hentikan endpoint
+        """
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Layani satu request HTTP
+        """
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), 5.0)
+            # Abaikan header request
+            while True:
+                line = await asyncio.wait_for(reader.readline(), 5.0)
+                if not line or line in (b"\r\n", b"\n"):
+                    break
+
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                body = self.registry.render_prometheus().encode("utf-8")
+                status, content_type = "200 OK", "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                body, status, content_type = b"Not Found\n", "404 Not Found", "text/plain"
+
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def format_value(value: float) -> str:
+    """
+    Format angka untuk exposition Prometheus
+    """
+    if isinstance(value, int):
+        return str(value)
+    return repr(round(float(value), 6))
+
+
+def escape_label(value) -> str:
+    """
+    Escape nilai label Prometheus
+    """
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+# Registry global; None jika METRICS_ENABLED = False sehingga setiap titik
+# instrumentasi hanya berupa satu pengecekan `if METRICS is not None`
+METRICS: Optional[ServerMetrics] = ServerMetrics() if METRICS_ENABLED else None
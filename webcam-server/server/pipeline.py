@@ -0,0 +1,625 @@
+"""
+Frame pipeline module: capture, deteksi/overlay, dan encoding di thread terpisah
+"""
+
+import threading
+import time
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from config import (
+    PIPELINE_QUEUE_SIZE, CAMERA_LOOP_DELAY, STATIC_SKIP_ENABLED, STATIC_REUSE_JPEG,
+    IDLE_WHEN_NO_CLIENTS, IDLE_RELEASE_DELAY
+)
+from encoders import get_encoder
+from metrics import METRICS
+from scene_detector import SceneChangeDetector
+from utils import scale_resolution
+
+
+@dataclass
+class FramePacket:
+    """
+    Data satu frame yang mengalir melalui pipeline
+    """
+    seq: int
+    capture_ts: float
+    width: int = 0
+    height: int = 0
+    frame: Optional[np.ndarray] = None
+    raw_frame: Optional[np.ndarray] = None  # Frame tanpa overlay (stream mode raw)
+    heads: List = field(default_factory=list)
+    hat_index: int = 0
+    modes: Tuple = ()  # Stream mode yang perlu di-render
+    variants: Tuple = ()  # Varian (stream mode, format, kualitas, skala) yang perlu di-encode
+    encoded: Dict[Tuple, bytes] = field(default_factory=dict)  # varian -> frame ter-encode
+    enveloped: Dict[Tuple, bytes] = field(default_factory=dict)  # varian -> header + payload (cache)
+    detect_ms: float = 0.0
+    overlay_ms: float = 0.0
+    encode_ms: float = 0.0
+    thumbnail: Optional[np.ndarray] = None
+    render_key: Optional[Tuple] = None
+    reuse_of: int = 0  # Seq frame referensi jika deteksi dipakai ulang (scene statis)
+
+
+class LatestFrameQueue:
+    """
+    Bounded queue thread-safe dengan kebijakan latest-frame-wins.
+
+    Jika queue penuh, item tertua dibuang dan dihitung sebagai drop,
+    sehingga stage berikutnya selalu memproses frame terbaru.
+    """
+
+    def __init__(self, name: str, maxsize: int = PIPELINE_QUEUE_SIZE):
+        """
+        Initialize queue
+
+        Args:
+            name: Nama stage (untuk statistik)
+            maxsize: Kapasitas maksimum queue
+        """
+        self.name = name
+        self.maxsize = max(1, maxsize)
+        self._items = deque()
+        self._cond = threading.Condition()
+        self.put_count = 0
+        self.drop_count = 0
+
+    def put(self, item: Any):
+        """
+        Masukkan item, buang item tertua jika queue penuh
+
+        Args:
+            item: Item yang dimasukkan
+        """
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.drop_count += 1
+            self._items.append(item)
+            self.put_count += 1
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """
+        Ambil item tertua dari queue
+
+        Args:
+            timeout: Waktu tunggu maksimum (detik)
+
+        Returns:
+            Item, atau None jika timeout
+        """
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def clear(self):
+        """
+        Kosongkan queue
+        """
+        with self._cond:
+            self._items.clear()
+            self._cond.notify_all()
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+    def get_stats(self) -> dict:
+        """
+        Dapatkan statistik queue
+
+        Returns:
+            Dictionary berisi depth, kapasitas, jumlah put dan drop
+        """
+        with self._cond:
+            return {
+                "depth": len(self._items),
+                "capacity": self.maxsize,
+                "put": self.put_count,
+                "dropped": self.drop_count
+            }
+
+
+class FramePipeline:
+    """
+    Pipeline bertahap: capture thread -> detect/overlay worker -> encode worker.
+
+    Setiap stage dihubungkan dengan LatestFrameQueue. Hasil akhir (JPEG)
+    diserahkan ke callback `on_frame`, yang bertanggung jawab memindahkan
+    hasil ke event loop asyncio.
+
+    Pipeline mengikuti permintaan client (`camera.demand_event`). Tanpa
+    client, capture thread berhenti mengirim frame ke stage berikutnya
+    (state "idle"): device live hanya dikuras dengan grab() tanpa decode
+    agar frame pertama saat client datang tidak basi. Setelah
+    IDLE_RELEASE_DELAY, sumber frame dilepas (state "released") dan dibuka
+    lagi oleh client berikutnya.
+    """
+
+    STAGE_TIMEOUT = 0.1  # Timeout get() agar thread bisa berhenti dengan bersih
+    POOL_POLL_INTERVAL = 0.005  # Interval polling hasil detection pool saat ada frame in-flight
+    REOPEN_RETRY_DELAY = 1.0  # Jeda sebelum mencoba membuka ulang sumber frame yang gagal
+
+    # State demand
+    STATE_ACTIVE = "active"
+    STATE_IDLE = "idle"
+    STATE_RELEASED = "released"
+
+    def __init__(self, camera, on_frame: Callable[[FramePacket], None]):
+        """
+        Initialize pipeline
+
+        Args:
+            camera: Instance Camera (sumber frame dan pengaturan encoding)
+            on_frame: Callback yang dipanggil dari encode worker untuk setiap frame jadi
+        """
+        self.camera = camera
+        self.on_frame = on_frame
+        self.logger = logging.getLogger(__name__)
+
+        self.detect_queue = LatestFrameQueue("detect")
+        self.encode_queue = LatestFrameQueue("encode")
+
+        self.captured_count = 0
+        self.capture_failures = 0
+        self.detected_count = 0
+        self.encoded_count = 0
+        self.encode_failures = 0
+
+        # Static scene skip
+        self.scene_detector = SceneChangeDetector() if STATIC_SKIP_ENABLED else None
+        self._reference_seq = 0
+        self._reference_key = None
+        self._reference_heads = []
+        self._last_encoded = {}
+        self._last_encoded_seq = 0
+        self.static_frames = 0
+        self.encode_skips = 0
+
+        # Idle tanpa client
+        self.state = self.STATE_ACTIVE
+        self.idle_periods = 0
+        self.source_releases = 0
+        self.last_reopen_ms: Optional[float] = None
+        self._idle_since = 0.0
+
+        self._seq = 0
+        self._threads: List[threading.Thread] = []
+        self._stop_event = threading.Event()
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._threads) and not self._stop_event.is_set()
+
+    def start(self):
+        """
+        Jalankan semua thread pipeline
+        """
+        if self.is_running:
+            return
+
+        self._stop_event.clear()
+        name = self.camera.name
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name=f"pipeline-capture-{name}", daemon=True),
+            threading.Thread(target=self._detect_loop, name=f"pipeline-detect-{name}", daemon=True),
+            threading.Thread(target=self._encode_loop, name=f"pipeline-encode-{name}", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+        self.logger.info(f"Frame pipeline started ({name})")
+
+    def stop(self, timeout: float = 2.0):
+        """
+        Hentikan semua thread pipeline dan tunggu sampai selesai
+
+        Args:
+            timeout: Waktu tunggu maksimum per thread (detik)
+        """
+        if not self._threads:
+            return
+
+        self._stop_event.set()
+        self.detect_queue.clear()
+        self.encode_queue.clear()
+
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+        self._threads = []
+
+        self.logger.info("Frame pipeline stopped")
+
+    def _capture_loop(self):
+        """
+        Stage 1: baca frame dari kamera (blocking) dan resize ke resolusi output
+        """
+        while not self._stop_event.is_set():
+            if IDLE_WHEN_NO_CLIENTS and not self.camera.demand_event.is_set():
+                self._idle_step()
+                continue
+
+            if self.state != self.STATE_ACTIVE and not self._wake():
+                self._stop_event.wait(self.REOPEN_RETRY_DELAY)
+                continue
+
+            cap = self.camera.cap
+            if cap is None:
+                time.sleep(CAMERA_LOOP_DELAY)
+                continue
+
+            try:
+                ret, frame = cap.read()
+            except Exception as e:
+                self.logger.error(f"Error reading camera: {e}")
+                ret, frame = False, None
+
+            if not ret:
+                self.capture_failures += 1
+                self.logger.warning("Failed to read frame from camera")
+                time.sleep(CAMERA_LOOP_DELAY)
+                continue
+
+            capture_ts = time.time()
+            if METRICS is not None:
+                METRICS.observe_capture(time.perf_counter(), self.camera.name)
+            width, height = self.camera.width, self.camera.height
+
+            # Resize frame jika perlu
+            if frame.shape[1] != width or frame.shape[0] != height:
+                frame = cv2.resize(frame, (width, height))
+
+            self._seq += 1
+            self.captured_count += 1
+            self.detect_queue.put(FramePacket(seq=self._seq, capture_ts=capture_ts,
+                                              width=width, height=height, frame=frame))
+
+    def _idle_step(self):
+        """
+        Satu iterasi capture thread tanpa client: masuk idle, lepas sumber
+        setelah IDLE_RELEASE_DELAY, dan kuras device live selama belum dilepas
+        """
+        if self.state == self.STATE_ACTIVE:
+            self.state = self.STATE_IDLE
+            self._idle_since = time.perf_counter()
+            self.idle_periods += 1
+            self.detect_queue.clear()
+            self.encode_queue.clear()
+            if METRICS is not None:
+                METRICS.observe_idle(self.camera.name)
+            self.logger.info(f"No clients on camera {self.camera.name}, pipeline idle")
+
+        if (self.state == self.STATE_IDLE and IDLE_RELEASE_DELAY >= 0 and
+                time.perf_counter() - self._idle_since >= IDLE_RELEASE_DELAY):
+            self.camera.release_source()
+            self.state = self.STATE_RELEASED
+            self.source_releases += 1
+            self.logger.info(f"Frame source of camera {self.camera.name} released after "
+                             f"{IDLE_RELEASE_DELAY:.0f}s idle")
+
+        cap = self.camera.cap
+        if self.state == self.STATE_IDLE and cap is not None and cap.live:
+            try:
+                if cap.grab():
+                    return
+            except Exception as e:
+                self.logger.debug(f"Idle grab failed: {e}")
+
+        # Tidak ada yang perlu dibaca: tunggu client berikutnya
+        self.camera.demand_event.wait(self.STAGE_TIMEOUT)
+
+    def _wake(self) -> bool:
+        """
+        Keluar dari idle karena client datang; buka ulang sumber jika sudah dilepas
+
+        Returns:
+            True jika pipeline siap capture lagi
+        """
+        if self.state == self.STATE_RELEASED:
+            start = time.perf_counter()
+            if not self.camera.reopen_source():
+                self.capture_failures += 1
+                self.logger.warning(f"Cannot reopen frame source of camera {self.camera.name}, "
+                                    f"retrying in {self.REOPEN_RETRY_DELAY:.0f}s")
+                return False
+            self.last_reopen_ms = round((time.perf_counter() - start) * 1000.0, 1)
+            self.logger.info(f"Frame source of camera {self.camera.name} reopened in {self.last_reopen_ms} ms")
+
+        self.logger.info(f"Camera {self.camera.name} active after {time.perf_counter() - self._idle_since:.1f}s idle")
+        self.state = self.STATE_ACTIVE
+        return True
+
+    def _detect_loop(self):
+        """
+        Stage 2: deteksi kepala dan overlay topi
+        """
+        if self.camera.detection_pool is not None:
+            self._detect_loop_pool(self.camera.detection_pool)
+            return
+        
+        head_detector = self.camera.head_detector
+
+        while not self._stop_event.is_set():
+            packet = self.detect_queue.get(self.STAGE_TIMEOUT)
+            if packet is None:
+                continue
+
+            try:
+                self._prepare(packet)
+                if self._reuse_detection(packet):
+                    if not STATIC_REUSE_JPEG:
+                        self._render(packet)
+                else:
+                    if head_detector.enabled:
+                        start = time.perf_counter()
+                        packet.heads = head_detector.detect_heads(packet.frame)
+                        packet.detect_ms = (time.perf_counter() - start) * 1000.0
+                        if METRICS is not None:
+                            METRICS.stage_duration.observe(packet.detect_ms, "detect")
+                    self._render(packet)
+                    self._set_reference(packet)
+            except Exception as e:
+                self.logger.error(f"Error in detect stage: {e}")
+
+            self.detected_count += 1
+            self.encode_queue.put(packet)
+
+    def _detect_loop_pool(self, pool):
+        """
+        Stage 2 dengan backend process pool: submit frame ke worker selama ada
+        slot kosong, lalu overlay hasilnya sesuai urutan sequence number.
+
+        Args:
+            pool: DetectionPool yang sudah berjalan
+        """
+        head_detector = self.camera.head_detector
+        in_flight = {}  # seq -> (FramePacket, skala deteksi, waktu submit)
+
+        while not self._stop_event.is_set():
+            # Ambil frame baru hanya jika ring punya slot kosong; selebihnya
+            # LatestFrameQueue yang membuang frame lama
+            if pool.has_free_slot():
+                timeout = self.POOL_POLL_INTERVAL if in_flight else self.STAGE_TIMEOUT
+                packet = self.detect_queue.get(timeout)
+                if packet is not None:
+                    self._prepare(packet)
+                    height, width = packet.frame.shape[:2]
+                    scale = head_detector.get_detection_scale(width, height)
+                    in_flight[packet.seq] = (packet, scale, time.perf_counter())
+                    if self._reuse_detection(packet):
+                        pool.skip(packet.seq)
+                    else:
+                        params = head_detector.get_detection_params(scale)
+                        if not (head_detector.enabled and
+                                pool.submit(packet.seq, packet.frame, params, scale)):
+                            pool.skip(packet.seq)
+
+            timeout = 0.0 if pool.has_free_slot() else self.POOL_POLL_INTERVAL
+            for seq, heads in pool.get_results(timeout):
+                if seq not in in_flight:
+                    continue
+                packet, scale, submitted_at = in_flight.pop(seq)
+                packet.detect_ms = (time.perf_counter() - submitted_at) * 1000.0
+
+                try:
+                    if packet.reuse_of:
+                        # Overlay dikerjakan ulang di encode stage hanya jika JPEG tidak bisa dipakai ulang
+                        if not STATIC_REUSE_JPEG:
+                            self._render(packet)
+                    else:
+                        packet.heads = head_detector.rescale_boxes(heads, scale)
+                        if METRICS is not None:
+                            METRICS.stage_duration.observe(packet.detect_ms, "detect")
+                        self._render(packet)
+                        self._set_reference(packet)
+                except Exception as e:
+                    self.logger.error(f"Error in overlay stage: {e}")
+
+                self.detected_count += 1
+                self.encode_queue.put(packet)
+
+    def _prepare(self, packet: FramePacket):
+        """
+        Catat pengaturan yang berlaku untuk frame ini sebelum deteksi
+
+        Args:
+            packet: FramePacket dengan frame mentah
+        """
+        packet.hat_index = self.camera.head_detector.current_hat_idx
+        packet.variants = self.camera.get_stream_variants()
+        packet.modes = self.camera.get_modes(packet.variants)
+
+    def _render(self, packet: FramePacket):
+        """
+        Siapkan frame untuk setiap stream mode yang diminta: salinan bersih
+        untuk mode raw dan overlay topi untuk mode overlay
+
+        Args:
+            packet: FramePacket yang sudah berisi hasil deteksi
+        """
+        overlay = self.camera.STREAM_OVERLAY in packet.modes
+        if self.camera.STREAM_RAW in packet.modes:
+            packet.raw_frame = packet.frame.copy() if overlay and packet.heads else packet.frame
+
+        if overlay and packet.heads:
+            start = time.perf_counter()
+            packet.frame = self.camera.head_detector.draw_heads(packet.frame, packet.heads)
+            packet.overlay_ms = (time.perf_counter() - start) * 1000.0
+            if METRICS is not None:
+                METRICS.stage_duration.observe(packet.overlay_ms, "overlay")
+
+    def _encode_loop(self):
+        """
+        Stage 3: encode frame untuk setiap varian stream (format, kualitas, skala)
+        dan serahkan ke callback
+        """
+        while not self._stop_event.is_set():
+            packet = self.encode_queue.get(self.STAGE_TIMEOUT)
+            if packet is None:
+                continue
+
+            if (packet.reuse_of and STATIC_REUSE_JPEG and self._last_encoded_seq == packet.reuse_of and
+                    all(variant in self._last_encoded for variant in packet.variants)):
+                # Scene statis: pakai ulang JPEG frame referensi
+                packet.encoded = {variant: self._last_encoded[variant] for variant in packet.variants}
+                packet.frame = None
+                self.encode_skips += 1
+                self._deliver(packet)
+                continue
+
+            try:
+                if packet.reuse_of and STATIC_REUSE_JPEG:
+                    # Frame referensi belum ter-encode (di-drop di queue) atau varian
+                    # baru diminta: render di sini
+                    self._render(packet)
+
+                start = time.perf_counter()
+                scaled = {}  # (mode, skala) -> frame yang sudah diperkecil
+                for variant in packet.variants:
+                    mode, fmt, quality, scale = variant
+                    frame = packet.raw_frame if mode == self.camera.STREAM_RAW else packet.frame
+                    if scale < 1.0:
+                        if (mode, scale) not in scaled:
+                            size = scale_resolution(packet.width, packet.height, scale)
+                            scaled[(mode, scale)] = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+                        frame = scaled[(mode, scale)]
+                    packet.encoded[variant] = get_encoder(fmt).encode(frame, quality)
+                packet.encode_ms = (time.perf_counter() - start) * 1000.0
+                if METRICS is not None:
+                    METRICS.stage_duration.observe(packet.encode_ms, "encode")
+            except Exception as e:
+                self.logger.error(f"Error in encode stage: {e}")
+                self.encode_failures += 1
+                continue
+
+            # Frame mentah tidak diperlukan lagi
+            packet.frame = None
+            packet.raw_frame = None
+            self.encoded_count += 1
+
+            self._last_encoded = packet.encoded
+            self._last_encoded_seq = packet.reuse_of or packet.seq
+            self._deliver(packet)
+
+    def _deliver(self, packet: FramePacket):
+        """
+        Serahkan frame jadi ke callback (seq packet bisa diubah publisher setelah ini)
+
+        Args:
+            packet: FramePacket yang sudah di-encode
+        """
+        try:
+            self.on_frame(packet)
+        except Exception as e:
+            # Event loop sudah ditutup saat shutdown
+            self.logger.debug(f"Frame callback failed: {e}")
+
+    def _render_key(self) -> Tuple:
+        """
+        Key pengaturan yang memengaruhi hasil render; frame statis hanya boleh
+        memakai ulang hasil sebelumnya jika key ini tidak berubah
+
+        Returns:
+            Tuple pengaturan saat ini
+        """
+        head_detector = self.camera.head_detector
+        return (
+            head_detector.enabled,
+            head_detector.current_cascade_type,
+            head_detector.current_hat_idx,
+            head_detector.detection_mode,
+            self.camera.get_stream_modes(),
+            self.camera.width,
+            self.camera.height
+        )
+
+    def _reuse_detection(self, packet: FramePacket) -> bool:
+        """
+        Cek scene statis; jika ya, isi packet dengan deteksi dari frame referensi
+
+        Args:
+            packet: FramePacket dengan frame mentah
+
+        Returns:
+            True jika deteksi dipakai ulang dan cascade tidak perlu dijalankan
+        """
+        if self.scene_detector is None:
+            return False
+
+        packet.thumbnail = self.scene_detector.thumbnail(packet.frame)
+        packet.render_key = self._render_key()
+
+        if (packet.render_key == self._reference_key and
+                self.scene_detector.is_static(packet.thumbnail)):
+            packet.heads = list(self._reference_heads)
+            packet.reuse_of = self._reference_seq
+            self.static_frames += 1
+            return True
+
+        return False
+
+    def _set_reference(self, packet: FramePacket):
+        """
+        Jadikan frame yang baru diproses penuh sebagai referensi scene statis
+
+        Args:
+            packet: FramePacket yang sudah melewati deteksi
+        """
+        if self.scene_detector is None or packet.thumbnail is None:
+            return
+
+        self.scene_detector.set_reference(packet.thumbnail)
+        self._reference_key = packet.render_key
+        self._reference_heads = list(packet.heads)
+        self._reference_seq = packet.seq
+
+    def get_stats(self) -> dict:
+        """
+        Dapatkan statistik per-stage pipeline
+
+        Returns:
+            Dictionary berisi queue depth dan jumlah drop per stage
+        """
+        return {
+            "running": self.is_running,
+            "idle": {
+                "enabled": IDLE_WHEN_NO_CLIENTS,
+                "state": self.state,
+                "idle_periods": self.idle_periods,
+                "source_releases": self.source_releases,
+                "last_reopen_ms": self.last_reopen_ms
+            },
+            "capture": {
+                "frames": self.captured_count,
+                "failures": self.capture_failures
+            },
+            "detect": {
+                "frames": self.detected_count,
+                "queue": self.detect_queue.get_stats(),
+                "pool": (self.camera.detection_pool.get_stats()
+                         if self.camera.detection_pool is not None else None)
+            },
+            "encode": {
+                "frames": self.encoded_count,
+                "failures": self.encode_failures,
+                "queue": self.encode_queue.get_stats()
+            },
+            "static_skip": {
+                "enabled": self.scene_detector is not None,
+                "static_frames": self.static_frames,
+                "detect_skips": self.static_frames,
+                "encode_skips": self.encode_skips,
+                "last_diff": round(self.scene_detector.last_diff, 3) if self.scene_detector else None
+            }
+        }
@@ -0,0 +1,126 @@
+"""
+Frame publisher module: publikasi frame ter-encode ke sender asyncio
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from frame_buffer import FrameRingBuffer
+from metrics import METRICS
+from pipeline import FramePacket
+
+
+class FramePublisher:
+    """
+    Titik publikasi frame dengan sequence number yang naik monoton.
+
+    Sender menunggu frame dengan sequence lebih besar dari frame terakhir
+    yang mereka kirim, sehingga setiap frame baru diterima tepat sekali dan
+    segera setelah selesai di-encode. Payload frame terakhir juga disalin ke
+    ring buffer (`buffer`) untuk client yang resume setelah stall atau
+    reconnect. Publisher juga mengukur time-to-first-frame: waktu dari client
+    pertama yang datang saat kamera idle (lihat `mark_wake`) sampai frame
+    pertama sesudahnya terbit. Harus dipakai dari thread event loop.
+    """
+
+    def __init__(self):
+        """
+        Initialize publisher
+        """
+        self.seq = 0
+        self.latest: Optional[FramePacket] = None
+        self.published_count = 0
+        self.buffer = FrameRingBuffer()
+        self._event = asyncio.Event()
+
+        # Time-to-first-frame setelah idle
+        self.wakeups = 0
+        self.last_time_to_first_frame_ms: Optional[float] = None
+        self.last_wake_state: Optional[str] = None
+        self._wake = None  # (perf_counter permintaan, state idle, capture_ts minimum)
+        self.logger = logging.getLogger(__name__)
+
+    def mark_wake(self, idle_state: str, captured_after: float = 0.0):
+        """
+        Catat bahwa client pertama datang saat kamera idle; frame berikutnya
+        yang terbit menutup pengukuran time-to-first-frame
+
+        Args:
+            idle_state: State kamera saat client datang ("idle" atau "released")
+            captured_after: Abaikan frame dengan capture_ts lebih lama dari ini
+                (frame yang masih di pipeline dari sebelum idle)
+        """
+        if self._wake is None:
+            self._wake = (time.perf_counter(), idle_state, captured_after)
+
+    def publish(self, packet: FramePacket):
+        """
+        Publikasikan frame baru dan bangunkan semua sender yang menunggu
+
+        Args:
+            packet: FramePacket yang sudah di-encode (seq akan diisi publisher)
+        """
+        self.seq += 1
+        packet.seq = self.seq
+        self.latest = packet
+        self.published_count += 1
+        self.buffer.put(packet)
+
+        if self._wake is not None and packet.capture_ts >= self._wake[2]:
+            self._finish_wake()
+
+        # Event lama di-set untuk membangunkan waiter, lalu diganti yang baru
+        event, self._event = self._event, asyncio.Event()
+        event.set()
+
+    async def wait_for_frame(self, after_seq: int) -> FramePacket:
+        """
+        Tunggu frame dengan sequence number lebih besar dari `after_seq`
+
+        Args:
+            after_seq: Sequence number frame terakhir yang sudah diterima pemanggil
+
+        Returns:
+            FramePacket terbaru
+        """
+        while self.latest is None or self.seq <= after_seq:
+            await self._event.wait()
+        return self.latest
+
+    @property
+    def wake_pending(self) -> bool:
+        """
+        True jika kamera baru bangun dari idle dan frame segar belum terbit
+        (frame `latest` masih dari sebelum idle)
+        """
+        return self._wake is not None
+
+    def _finish_wake(self):
+        """
+        Tutup pengukuran time-to-first-frame
+        """
+        started, idle_state, _ = self._wake
+        self._wake = None
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        self.wakeups += 1
+        self.last_time_to_first_frame_ms = round(elapsed_ms, 1)
+        self.last_wake_state = idle_state
+        if METRICS is not None:
+            METRICS.time_to_first_frame.observe(elapsed_ms, idle_state)
+        self.logger.info(f"First frame after {idle_state} in {elapsed_ms:.0f} ms")
+
+    def get_wake_stats(self) -> dict:
+        """
+        Dapatkan statistik time-to-first-frame
+
+        Returns:
+            Dictionary berisi jumlah wake dan time-to-first-frame terakhir
+        """
+        return {
+            "wakeups": self.wakeups,
+            "pending": self.wake_pending,
+            "last_time_to_first_frame_ms": self.last_time_to_first_frame_ms,
+            "last_state": self.last_wake_state
+        }
@@ -0,0 +1,140 @@
+"""
+Rate control module: penyesuaian kualitas JPEG dan resolusi per-client
+"""
+
+from config import (
+    ADAPTIVE_MIN_QUALITY, ADAPTIVE_QUALITY_STEP, ADAPTIVE_SCALES,
+    ADAPTIVE_HIGH_LOAD, ADAPTIVE_LOW_LOAD, ADAPTIVE_BUFFER_HIGH, ADAPTIVE_WINDOW
+)
+
+
+class AdaptiveQualityController:
+    """
+    Feedback controller per-client berbasis send latency dan write buffer.
+
+    Jika waktu send mendekati frame budget (1 / fps) atau data menumpuk di
+    write buffer, kualitas JPEG diturunkan satu step; setelah mencapai
+    kualitas minimum, resolusi diturunkan ke skala berikutnya. Saat koneksi
+    longgar, resolusi dipulihkan dulu, baru kemudian kualitas.
+    """
+
+    def __init__(self, max_quality: int, min_quality: int = ADAPTIVE_MIN_QUALITY,
+                 step: int = ADAPTIVE_QUALITY_STEP, scales: tuple = ADAPTIVE_SCALES,
+                 window: int = ADAPTIVE_WINDOW):
+        """
+        Initialize controller
+
+        Args:
+            max_quality: Kualitas JPEG maksimum (permintaan client)
+            min_quality: Kualitas JPEG minimum
+            step: Besar step perubahan kualitas
+            scales: Tangga skala resolusi, dari besar ke kecil
+            window: Jumlah frame yang dirata-rata sebelum mengambil keputusan
+        """
+        self.step = max(1, step)
+        self.scales = tuple(scales) or (1.0,)
+        self.window = max(1, window)
+        self.set_max_quality(max_quality, min_quality)
+
+        self._samples = 0
+        self._send_ms_total = 0.0
+        self._max_buffered = 0
+        self.adjustments = 0
+
+    def set_max_quality(self, max_quality: int, min_quality: int = ADAPTIVE_MIN_QUALITY):
+        """
+        Set batas kualitas dan reset ke kualitas tertinggi
+
+        Args:
+            max_quality: Kualitas JPEG maksimum
+            min_quality: Kualitas JPEG minimum
+        """
+        self.max_quality = max(1, min(100, max_quality))
+        self.min_quality = max(1, min(self.max_quality, min_quality))
+        self.quality = self.max_quality
+        self.scale_index = 0
+
+    @property
+    def scale(self) -> float:
+        return self.scales[self.scale_index]
+
+    def update(self, send_ms: float, buffered_bytes: int, fps: int) -> bool:
+        """
+        Masukkan hasil satu send dan sesuaikan pengaturan di akhir window
+
+        Args:
+            send_ms: Durasi send frame terakhir (ms)
+            buffered_bytes: Data yang masih menunggu di write buffer (bytes)
+            fps: Target FPS client
+
+        Returns:
+            True jika kualitas atau skala berubah
+        """
+        self._samples += 1
+        self._send_ms_total += send_ms
+        self._max_buffered = max(self._max_buffered, buffered_bytes)
+        if self._samples < self.window:
+            return False
+
+        load = (self._send_ms_total / self._samples) / (1000.0 / max(1, fps))
+        congested = load > ADAPTIVE_HIGH_LOAD or self._max_buffered > ADAPTIVE_BUFFER_HIGH
+        relaxed = load < ADAPTIVE_LOW_LOAD and self._max_buffered == 0
+
+        self._samples = 0
+        self._send_ms_total = 0.0
+        self._max_buffered = 0
+
+        if congested:
+            changed = self._step_down()
+        elif relaxed:
+            changed = self._step_up()
+        else:
+            changed = False
+
+        if changed:
+            self.adjustments += 1
+        return changed
+
+    def _step_down(self) -> bool:
+        """
+        Turunkan kualitas, lalu resolusi jika kualitas sudah minimum
+
+        Returns:
+            True jika ada perubahan
+        """
+        if self.quality > self.min_quality:
+            self.quality = max(self.min_quality, self.quality - self.step)
+            return True
+        if self.scale_index < len(self.scales) - 1:
+            self.scale_index += 1
+            return True
+        return False
+
+    def _step_up(self) -> bool:
+        """
+        Pulihkan resolusi dulu, lalu kualitas
+
+        Returns:
+            True jika ada perubahan
+        """
+        if self.scale_index > 0:
+            self.scale_index -= 1
+            return True
+        if self.quality < self.max_quality:
+            self.quality = min(self.max_quality, self.quality + self.step)
+            return True
+        return False
+
+    def get_stats(self) -> dict:
+        """
+        Dapatkan pengaturan yang sedang dipilih controller
+
+        Returns:
+            Dictionary berisi kualitas, skala, dan jumlah penyesuaian
+        """
+        return {
+            "quality": self.quality,
+            "max_quality": self.max_quality,
+            "scale": self.scale,
+            "adjustments": self.adjustments
+        }
@@ -0,0 +1,457 @@
+"""
+Relay module: kamera virtual yang berlangganan sekali ke server upstream dan
+meneruskan frame yang sudah di-encode ke client lokal (tanpa decode/encode ulang)
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Optional
+
+import websockets
+
+from camera import Camera
+from config import (
+    DEFAULT_WIDTH, DEFAULT_HEIGHT, JPEG_QUALITY, DEFAULT_CAMERA_NAME,
+    RELAY_STREAM_MODE, RELAY_FORMAT, RELAY_UPSTREAM_FPS,
+    RELAY_CONNECT_TIMEOUT, RELAY_RECONNECT_DELAY,
+    IDLE_WHEN_NO_CLIENTS, IDLE_RELEASE_DELAY
+)
+from pipeline import FramePacket, FramePipeline
+from publisher import FramePublisher
+from utils import unpack_frame_envelope
+
+
+class RelayCamera:
+    """
+    Pengganti Camera untuk mode relay.
+
+    Relay terhubung ke upstream (server kamera atau relay lain) sebagai satu
+    client dengan envelope aktif dan adaptive quality mati, lalu
+    mempublikasikan payload setiap frame apa adanya ke FramePublisher lokal.
+    Client relay dilayani oleh ClientSession biasa (pacing FPS, envelope,
+    backpressure per-client), tetapi semuanya menerima satu varian yang
+    sama dengan upstream karena relay tidak meng-encode ulang. Timestamp
+    capture dari envelope upstream diteruskan, sehingga latency end-to-end
+    tetap terukur di ujung rantai relay.
+
+    Tanpa client selama IDLE_RELEASE_DELAY, koneksi upstream ditutup agar
+    pipeline upstream juga bisa idle; client pertama berikutnya membuka
+    koneksi lagi.
+    """
+
+    STREAM_OVERLAY = Camera.STREAM_OVERLAY
+    STREAM_RAW = Camera.STREAM_RAW
+    STREAM_MODES = Camera.STREAM_MODES
+
+    def __init__(self, url: str, name: str = DEFAULT_CAMERA_NAME,
+                 stream_mode: str = RELAY_STREAM_MODE, fmt: str = RELAY_FORMAT):
+        """
+        Initialize relay
+
+        Args:
+            url: URL WebSocket upstream (misal ws://10.0.0.5:8765/front)
+            name: Nama kamera di relay ini
+            stream_mode: Stream mode yang diminta dari upstream
+            fmt: Format frame yang diminta dari upstream
+        """
+        self.url = url
+        self.name = name
+        self.publisher = FramePublisher()
+        self.stream_demand = Counter()
+        self.pipeline = None  # Tidak ada pipeline lokal
+        self.is_running = False
+        self.width = DEFAULT_WIDTH
+        self.height = DEFAULT_HEIGHT
+        self.jpeg_quality = JPEG_QUALITY
+        self.requested_mode = stream_mode
+        self.requested_format = fmt
+        self.variant = (stream_mode, fmt, JPEG_QUALITY, 1.0)  # Varian yang dikirim upstream
+        self.upstream_meta = {}
+        self.on_metadata: Optional[Callable[["RelayCamera"], Awaitable]] = None
+
+        self._websocket = None
+        self._configured = False  # True setelah upstream mengonfirmasi envelope
+        self._detections = None  # Pesan deteksi terakhir (stream mode raw)
+        self._last_upstream_seq = 0
+
+        # Idle tanpa client (state sama dengan FramePipeline)
+        self.idle_state = FramePipeline.STATE_ACTIVE
+        self.upstream_releases = 0
+        self._demand = asyncio.Event()
+        self._release_timer: Optional[asyncio.TimerHandle] = None
+
+        # Statistik upstream
+        self.upstream_connects = 0
+        self.frames_received = 0
+        self.bytes_received = 0
+        self.frames_missed = 0  # Celah sequence upstream
+
+        self.logger = logging.getLogger(__name__)
+
+    async def initialize(self) -> bool:
+        """
+        Connect ke upstream dan tunggu frame pertama
+
+        Returns:
+            True jika frame pertama diterima sebelum RELAY_CONNECT_TIMEOUT
+        """
+        deadline = time.perf_counter() + RELAY_CONNECT_TIMEOUT
+        while time.perf_counter() < deadline:
+            try:
+                self._websocket = await self._connect()
+                await asyncio.wait_for(self._receive_first_frame(),
+                                       max(0.0, deadline - time.perf_counter()))
+                self.logger.info(f"Relay {self.name} initialized from {self.url}: "
+                                 f"{self.width}x{self.height} {self.variant[1]} ({self.variant[0]})")
+                return True
+            except asyncio.TimeoutError:
+                break
+            except (OSError, websockets.exceptions.WebSocketException) as e:
+                self.logger.warning(f"Upstream {self.url} not available: {e}")
+                await self._close_upstream()
+                await asyncio.sleep(RELAY_RECONNECT_DELAY)
+
+        self.logger.error(f"No frame from upstream {self.url} within {RELAY_CONNECT_TIMEOUT}s")
+        await self._close_upstream()
+        return False
+
+    async def _connect(self):
+        """
+        Buka koneksi upstream dan minta varian tetap dengan envelope
+
+        Returns:
+            WebSocket connection ke upstream
+        """
+        websocket = await websockets.connect(
+            self.url, max_size=None, ping_interval=20, ping_timeout=10
+        )
+        self._configured = False
+        self._detections = None
+        self._last_upstream_seq = 0
+        self.upstream_connects += 1
+        await websocket.send(json.dumps({"type": "config", "data": {
+            "envelope": True,
+            "stream_mode": self.requested_mode,
+            "format": self.requested_format,
+            "adaptive_quality": False,
+            "fps": RELAY_UPSTREAM_FPS
+        }}))
+        return websocket
+
+    async def _receive_first_frame(self):
+        """
+        Proses pesan upstream sampai satu frame dipublikasikan
+        """
+        published = self.publisher.seq
+        while self.publisher.seq == published:
+            await self._handle_message(await self._websocket.recv())
+
+    async def start_capture_loop(self):
+        """
+        Teruskan pesan upstream sampai relay dihentikan; reconnect otomatis
+        jika upstream terputus
+        """
+        self.is_running = True
+        self.logger.info(f"Relaying {self.url} as camera {self.name}")
+        if not self.stream_demand:
+            self._enter_idle()
+
+        while self.is_running:
+            if self.idle_state == FramePipeline.STATE_RELEASED:
+                await self._wait_for_demand()
+                continue
+
+            if self._websocket is None:
+                try:
+                    self._websocket = await self._connect()
+                    self.logger.info(f"Reconnected to upstream {self.url}")
+                except (OSError, websockets.exceptions.WebSocketException) as e:
+                    self.logger.warning(f"Upstream {self.url} not available: {e}")
+                    await asyncio.sleep(RELAY_RECONNECT_DELAY)
+                    continue
+
+            try:
+                async for message in self._websocket:
+                    await self._handle_message(message)
+            except websockets.exceptions.ConnectionClosed:
+                pass
+
+            self._websocket = None
+            if self.is_running and self.idle_state != FramePipeline.STATE_RELEASED:
+                self.logger.warning(f"Upstream {self.url} disconnected, reconnecting")
+                await asyncio.sleep(RELAY_RECONNECT_DELAY)
+
+    def _enter_idle(self):
+        """
+        Client terakhir pergi: jadwalkan pelepasan upstream setelah IDLE_RELEASE_DELAY
+        """
+        if not IDLE_WHEN_NO_CLIENTS or self.idle_state != FramePipeline.STATE_ACTIVE:
+            return
+        self.idle_state = FramePipeline.STATE_IDLE
+        self._demand.clear()
+        if IDLE_RELEASE_DELAY >= 0:
+            self._release_timer = asyncio.get_running_loop().call_later(
+                IDLE_RELEASE_DELAY, self._release_upstream
+            )
+        self.logger.info(f"No clients on relay {self.name}, idle")
+
+    def _release_upstream(self):
+        """
+        Tutup koneksi upstream karena tidak ada client (dipanggil timer idle)
+        """
+        self._release_timer = None
+        if self.stream_demand or not self.is_running:
+            return
+        self.idle_state = FramePipeline.STATE_RELEASED
+        self.upstream_releases += 1
+        self.logger.info(f"Upstream {self.url} released after {IDLE_RELEASE_DELAY:.0f}s idle")
+        asyncio.get_running_loop().create_task(self._close_upstream())
+
+    async def _wait_for_demand(self):
+        """
+        Tunggu client pertama setelah upstream dilepas
+        """
+        await self._demand.wait()
+        if self.is_running:
+            self.logger.info(f"Client on relay {self.name}, reconnecting to {self.url}")
+
+    async def _handle_message(self, message):
+        """
+        Proses satu pesan upstream
+
+        Args:
+            message: Pesan text (JSON) atau binary (frame)
+        """
+        if isinstance(message, str):
+            await self._handle_text(message)
+        else:
+            self._handle_frame(message)
+
+    async def _handle_text(self, message: str):
+        """
+        Proses pesan JSON upstream: metadata dan deteksi
+        """
+        try:
+            data = json.loads(message)
+        except json.JSONDecodeError:
+            return
+
+        message_type = data.get("type")
+        if message_type == "detections":
+            self._detections = data
+        elif message_type == "meta":
+            await self._apply_metadata(data)
+
+    async def _apply_metadata(self, meta: dict):
+        """
+        Ambil resolusi dan varian dari metadata upstream; client relay
+        diberi tahu jika ada yang berubah
+
+        Args:
+            meta: Pesan meta dari upstream
+        """
+        self.upstream_meta = meta
+        self._configured = bool(meta.get("envelope"))
+        width, height = meta.get("width", self.width), meta.get("height", self.height)
+        variant = (
+            meta.get("stream_mode", self.variant[0]),
+            meta.get("format", self.variant[1]),
+            meta.get("jpeg_quality", self.variant[2]),
+            1.0
+        )
+        if (width, height, variant) == (self.width, self.height, self.variant):
+            return
+
+        self.width, self.height, self.variant = width, height, variant
+        if variant[2]:
+            self.jpeg_quality = variant[2]
+        self.logger.info(f"Upstream stream {self.name}: {width}x{height} {variant[1]} "
+                         f"quality {variant[2]} ({variant[0]})")
+        if self.on_metadata is not None:
+            await self.on_metadata(self)
+
+    def _handle_frame(self, message: bytes):
+        """
+        Publikasikan frame upstream tanpa decode (payload dipakai apa adanya)
+
+        Args:
+            message: Pesan binary upstream (envelope + payload)
+        """
+        envelope = unpack_frame_envelope(message)
+        if envelope is None or not self._configured:
+            # Frame sebelum config relay berlaku (tanpa envelope / varian lama)
+            return
+
+        header, payload = envelope
+        if self._last_upstream_seq and header["seq"] > self._last_upstream_seq + 1:
+            self.frames_missed += header["seq"] - self._last_upstream_seq - 1
+        self._last_upstream_seq = header["seq"]
+        self.frames_received += 1
+        self.bytes_received += len(payload)
+
+        packet = FramePacket(
+            seq=0,
+            capture_ts=header["capture_ts"],
+            width=self.width,
+            height=self.height,
+            detect_ms=header["detect_ms"],
+            encode_ms=header["encode_ms"]
+        )
+        packet.variants = (self.variant,)
+        packet.modes = (self.variant[0],)
+        packet.encoded[self.variant] = payload
+
+        detections = self._detections
+        if detections is not None and detections.get("seq") == header["seq"]:
+            packet.heads = [tuple(box) for box in detections.get("boxes", [])]
+            packet.hat_index = detections.get("hat_index", 0)
+            packet.width = detections.get("width", self.width)
+            packet.height = detections.get("height", self.height)
+
+        self.publisher.publish(packet)
+
+    def resolve_variant(self, variant: tuple) -> tuple:
+        """
+        Relay hanya punya varian upstream; semua client menerima varian ini
+
+        Args:
+            variant: Varian yang diminta client
+
+        Returns:
+            Varian upstream
+        """
+        return self.variant
+
+    def add_stream_client(self, variant: tuple):
+        first = not self.stream_demand
+        self.stream_demand[variant] += 1
+        if not first or self.idle_state == FramePipeline.STATE_ACTIVE:
+            return
+
+        if self._release_timer is not None:
+            self._release_timer.cancel()
+            self._release_timer = None
+        self.publisher.mark_wake(self.idle_state)
+        self.idle_state = FramePipeline.STATE_ACTIVE
+        self._demand.set()
+
+    def remove_stream_client(self, variant: tuple):
+        self.stream_demand[variant] -= 1
+        if self.stream_demand[variant] <= 0:
+            del self.stream_demand[variant]
+        if not self.stream_demand and self.is_running:
+            self._enter_idle()
+
+    async def get_latest_frame(self) -> Optional[bytes]:
+        """
+        Ambil frame terbaru (payload upstream)
+
+        Returns:
+            Frame bytes, atau None jika belum ada frame
+        """
+        packet = self.publisher.latest
+        if packet is None:
+            return None
+        return bytes(packet.encoded[self.variant]) if self.variant in packet.encoded else None
+
+    def _forward_config(self, data: dict) -> bool:
+        """
+        Teruskan config kamera (resolusi, deteksi, topi) ke upstream
+
+        Args:
+            data: Isi pesan config
+
+        Returns:
+            True jika relay sedang terhubung ke upstream
+        """
+        websocket = self._websocket
+        if websocket is None:
+            self.logger.warning(f"Upstream {self.url} not connected, config not forwarded: {data}")
+            return False
+
+        async def send():
+            try:
+                await websocket.send(json.dumps({"type": "config", "data": data}))
+            except websockets.exceptions.ConnectionClosed:
+                pass
+
+        asyncio.get_running_loop().create_task(send())
+        return True
+
+    def set_resolution(self, width: int, height: int):
+        self._forward_config({"resolution": [width, height]})
+
+    def set_jpeg_quality(self, quality: int):
+        self._forward_config({"jpeg_quality": quality})
+
+    def toggle_head_detection(self, enable: bool):
+        self._forward_config({"head_detection": enable})
+
+    def set_cascade(self, cascade_type: str) -> bool:
+        return self._forward_config({"cascade_type": cascade_type})
+
+    def set_detection_mode(self, mode: str) -> bool:
+        return self._forward_config({"detection_mode": mode})
+
+    def set_detection_profile(self, name: str) -> bool:
+        return self._forward_config({"detection_profile": name})
+
+    def set_hat(self, hat_index: int) -> bool:
+        return self._forward_config({"hat_index": hat_index})
+
+    def next_hat(self) -> bool:
+        return self._forward_config({"next_hat": True})
+
+    def previous_hat(self) -> bool:
+        return self._forward_config({"previous_hat": True})
+
+    def get_camera_info(self) -> dict:
+        """
+        Dapatkan informasi relay
+
+        Returns:
+            Dictionary berisi upstream, varian, dan statistik
+        """
+        return {
+            "name": self.name,
+            "width": self.width,
+            "height": self.height,
+            "jpeg_quality": self.jpeg_quality,
+            "is_running": self.is_running,
+            "idle_state": self.idle_state,
+            "time_to_first_frame": self.publisher.get_wake_stats(),
+            "relay": {
+                "upstream": self.url,
+                "connected": self._websocket is not None,
+                "connects": self.upstream_connects,
+                "releases": self.upstream_releases,
+                "frames_received": self.frames_received,
+                "frames_missed": self.frames_missed,
+                "bytes_received": self.bytes_received
+            },
+            "frame_buffer": self.publisher.buffer.get_stats(),
+            "stream_variants": [
+                {"stream_mode": mode, "format": fmt, "quality": quality, "scale": scale, "clients": count}
+                for (mode, fmt, quality, scale), count in sorted(self.stream_demand.items())
+            ]
+        }
+
+    async def _close_upstream(self):
+        websocket, self._websocket = self._websocket, None
+        if websocket is not None:
+            await websocket.close()
+
+    async def stop(self):
+        """
+        Hentikan relay dan tutup koneksi upstream
+        """
+        self.is_running = False
+        if self._release_timer is not None:
+            self._release_timer.cancel()
+            self._release_timer = None
+        self._demand.set()
+        await self._close_upstream()
+        self.logger.info(f"Relay {self.name} stopped")
@@ -0,0 +1,76 @@
+"""
+Scene detector module: deteksi scene statis dengan thumbnail grayscale
+"""
+
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from config import STATIC_THUMBNAIL_SIZE, STATIC_DIFF_THRESHOLD
+
+
+class SceneChangeDetector:
+    """
+    Change detector murah: bandingkan thumbnail grayscale kecil dengan
+    thumbnail frame referensi (frame terakhir yang diproses penuh) memakai
+    mean absolute difference.
+    """
+
+    def __init__(self, size: Tuple[int, int] = STATIC_THUMBNAIL_SIZE,
+                 threshold: float = STATIC_DIFF_THRESHOLD):
+        """
+        Initialize detector
+
+        Args:
+            size: Ukuran thumbnail (width, height)
+            threshold: Mean absolute difference (0-255) maksimum agar scene dianggap statis
+        """
+        self.size = size
+        self.threshold = threshold
+        self._reference: Optional[np.ndarray] = None
+        self.last_diff = 0.0
+
+    def thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Buat thumbnail grayscale dari frame BGR
+
+        Args:
+            frame: Frame BGR
+
+        Returns:
+            Thumbnail grayscale
+        """
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    def is_static(self, thumbnail: np.ndarray) -> bool:
+        """
+        Cek apakah thumbnail hampir sama dengan referensi
+
+        Args:
+            thumbnail: Thumbnail frame saat ini
+
+        Returns:
+            True jika scene tidak berubah sejak frame referensi
+        """
+        if self._reference is None:
+            return False
+
+        self.last_diff = float(cv2.norm(thumbnail, self._reference, cv2.NORM_L1)) / thumbnail.size
+        return self.last_diff <= self.threshold
+
+    def set_reference(self, thumbnail: np.ndarray):
+        """
+        Jadikan thumbnail sebagai referensi (frame yang baru diproses penuh)
+
+        Args:
+            thumbnail: Thumbnail frame referensi
+        """
+        self._reference = thumbnail
+
+    def reset(self):
+        """
+        Hapus referensi sehingga frame berikutnya diproses penuh
+        """
+        self._reference = None
@@ -2,35 +2,149 @@
 WebSocket Server untuk streaming webcam
 """
 
+import argparse
 import asyncio
 import websockets
 import logging
 import json
-from typing import Set, Any
+from typing import Dict, Any, Optional
 
 from camera import Camera
+from client_session import ClientSession
+from encoders import ENCODER_FORMATS
+from frame_sources import (
+    FRAME_SOURCE_TYPES, FrameSource, create_frame_source, create_frame_source_from_spec
+)
+from metrics import METRICS, MetricsHttpServer
+from pipeline import FramePipeline
+from relay import RelayCamera
+from upload import UploadWorkerPool
 from config import (
-    SERVER_HOST, SERVER_PORT, TARGET_FPS, BROADCAST_DELAY,
-    MAX_CLIENTS, LOG_LEVEL, LOG_FORMAT
+    SERVER_HOST, SERVER_PORT, TARGET_FPS,
+    MAX_CLIENTS, LOG_LEVEL, LOG_FORMAT,
+    CAMERA_INDEX, DEFAULT_WIDTH, DEFAULT_HEIGHT,
+    FRAME_SOURCE, FRAME_SOURCE_PATH, SOURCE_FPS, SOURCE_LOOP, SYNTHETIC_HEADS, SYNTHETIC_SEED,
+    CAMERA_SOURCES, DEFAULT_CAMERA_NAME, METRICS_HOST, METRICS_PORT, DETECTION_WORKERS,
+    WEBSOCKET_MAX_MESSAGE_BYTES
 )
 from utils import (
-    setup_logging, create_metadata_message, 
-    parse_client_message, validate_resolution, validate_fps
+    setup_logging, create_metadata_message, create_stats_message, create_cameras_message,
+    parse_client_message, validate_resolution, validate_fps, get_request_path, get_request_query,
+    FRAME_ENVELOPE_VERSION
 )
 
+# Nilai gauge vto_camera_idle per state demand
+IDLE_STATE_VALUES = {
+    FramePipeline.STATE_ACTIVE: 0,
+    FramePipeline.STATE_IDLE: 1,
+    FramePipeline.STATE_RELEASED: 2
+}
+
 class WebcamWebSocketServer:
     """
-    WebSocket server untuk streaming video webcam
+    WebSocket server untuk streaming video webcam.
+
+    Server bisa melayani beberapa kamera bernama; setiap kamera punya
+    pipeline capture/detect/encode sendiri (thread terpisah) dan
+    publisher sendiri. Client memilih kamera lewat path URL ("/front")
+    atau pesan "subscribe". Dalam mode relay, kamera diganti RelayCamera
+    yang meneruskan frame dari server lain tanpa encode ulang. Client
+    dalam mode upload mengirim frame kamera sendiri dan menerima hasil
+    try-on yang diproses di worker pool bersama.
     """
     
-    def __init__(self):
+    def __init__(self, source: Optional[FrameSource] = None,
+                 sources: Optional[Dict[str, Optional[FrameSource]]] = None,
+                 cameras: Optional[Dict[str, Any]] = None):
         """
         Initialize server
+        
+        Args:
+            source: Sumber frame tunggal (default: sesuai FRAME_SOURCE di config)
+            sources: Nama kamera -> sumber frame (default: CAMERA_SOURCES di config,
+                atau satu kamera dari `source`)
+            cameras: Nama kamera -> Camera/RelayCamera yang sudah dibuat
+                (menggantikan source dan sources)
         """
         self.logger = setup_logging(LOG_LEVEL, LOG_FORMAT)
-        self.camera = Camera()
-        self.clients: Set[Any] = set()
+        self.host = SERVER_HOST
+        self.port = SERVER_PORT
+        self.metrics_port = METRICS_PORT
+        if cameras:
+            sources = {}
+        elif not sources:
+            if source is None and CAMERA_SOURCES:
+                sources = create_camera_sources(CAMERA_SOURCES)
+            else:
+                sources = {DEFAULT_CAMERA_NAME: source}
+        # Worker deteksi (backend "process") dibagi rata antar kamera agar
+        # total process tidak melebihi DETECTION_WORKERS
+        detection_workers = max(1, DETECTION_WORKERS // max(1, len(sources)))
+        self.cameras: Dict[str, Camera] = dict(cameras) if cameras else {
+            name: Camera(source=camera_source, name=name, detection_workers=detection_workers)
+            for name, camera_source in sources.items()
+        }
+        for camera in self.cameras.values():
+            if isinstance(camera, RelayCamera):
+                camera.on_metadata = self.refresh_camera_clients
+        self.default_camera = DEFAULT_CAMERA_NAME if DEFAULT_CAMERA_NAME in self.cameras \
+            else next(iter(self.cameras))
+        self.clients: Dict[Any, ClientSession] = {}
         self.is_running = False
+        self.max_clients = MAX_CLIENTS
+        self.metrics_server = None
+        self.upload_pool = UploadWorkerPool()
+        
+        if METRICS is not None:
+            METRICS.add_collector(self.collect_metrics)
+    
+    @property
+    def camera(self) -> Camera:
+        """
+        Kamera default (untuk client di path "/")
+        """
+        return self.cameras[self.default_camera]
+    
+    def get_camera_for_path(self, path: str) -> Optional[Camera]:
+        """
+        Pilih kamera dari path URL: "/" = kamera default, "/front" atau
+        "/cameras/front" = kamera "front"
+        
+        Args:
+            path: Path request WebSocket
+            
+        Returns:
+            Camera, atau None jika nama kamera tidak dikenal
+        """
+        name = path.strip("/").split("/")[-1]
+        if not name:
+            return self.camera
+        return self.cameras.get(name)
+    
+    async def refresh_camera_clients(self, camera: Camera):
+        """
+        Terapkan varian baru dan kirim ulang metadata ke semua client kamera
+        (dipanggil relay saat stream upstream berubah)
+        
+        Args:
+            camera: Kamera yang berubah
+        """
+        await asyncio.gather(
+            *[session.refresh() for session in list(self.clients.values()) if session.camera is camera]
+        )
+    
+    def get_client_camera(self, websocket: Any) -> Camera:
+        """
+        Kamera yang sedang diikuti client
+        
+        Args:
+            websocket: WebSocket connection
+            
+        Returns:
+            Camera milik session client, atau kamera default
+        """
+        session = self.clients.get(websocket)
+        return session.camera if session is not None else self.camera
         
     async def register_client(self, websocket: Any):
         """
@@ -38,17 +152,62 @@ class WebcamWebSocketServer:
         
         Args:
             websocket: WebSocket connection
+            
+        Returns:
+            True jika client diterima, False jika ditolak
         """
-        if len(self.clients) >= MAX_CLIENTS:
+        if len(self.clients) >= self.max_clients:
             await websocket.close(code=1008, reason="Server full")
             self.logger.warning("Client rejected: server full")
-            return
+            return False
+        
+        path = get_request_path(websocket)
+        camera = self.get_camera_for_path(path)
+        if camera is None:
+            await websocket.close(code=1008, reason="Unknown camera")
+            self.logger.warning(f"Client rejected: unknown camera path {path}")
+            return False
             
-        self.clients.add(websocket)
+        session = ClientSession(websocket, camera)
+        self.clients[websocket] = session
         client_addr = websocket.remote_address
-        self.logger.info(f"Client connected: {client_addr}, Total clients: {len(self.clients)}")
+        self.logger.info(f"Client connected: {client_addr} ({camera.name}), Total clients: {len(self.clients)}")
+        
+        # Client yang reconnect bisa langsung meminta envelope dan frame yang
+        # terlewat lewat query string: "?envelope=1&since=<seq>"
+        query = get_request_query(websocket)
+        if query.get("envelope") in ("1", "true"):
+            session.envelope_version = FRAME_ENVELOPE_VERSION
+        
+        # Mode upload: "?upload=1" (frame dari kamera client, tanpa stream kamera server)
+        if query.get("upload") in ("1", "true"):
+            await session.start_upload(self.upload_pool)
+            return True
         
         # Kirim metadata ke client baru
+        await self.send_metadata(websocket)
+        
+        since = query.get("since", "")
+        if since.isdigit():
+            await session.resume(int(since))
+            return True
+        
+        # Frame dikirim oleh sender milik client sendiri
+        session.start()
+        return True
+    
+    async def send_metadata(self, websocket: Any):
+        """
+        Kirim pesan metadata (resolusi, FPS, dan pengaturan client) ke client
+        
+        Args:
+            websocket: WebSocket connection
+        """
+        session = self.clients.get(websocket)
+        if session is not None:
+            await session.send_metadata()
+            return
+        
         camera_info = self.camera.get_camera_info()
         metadata = create_metadata_message(
             camera_info["width"], 
@@ -58,9 +217,8 @@ class WebcamWebSocketServer:
         
         try:
             await websocket.send(metadata)
-            self.logger.debug(f"Metadata sent to {client_addr}")
         except websockets.exceptions.ConnectionClosed:
-            self.logger.warning(f"Client {client_addr} disconnected during metadata send")
+            self.logger.warning(f"Client {websocket.remote_address} disconnected during metadata send")
     
     async def unregister_client(self, websocket: Any):
         """
@@ -69,10 +227,120 @@ class WebcamWebSocketServer:
         Args:
             websocket: WebSocket connection
         """
-        if websocket in self.clients:
-            self.clients.remove(websocket)
+        session = self.clients.pop(websocket, None)
+        if session is not None:
+            await session.close()
             client_addr = websocket.remote_address
             self.logger.info(f"Client disconnected: {client_addr}, Total clients: {len(self.clients)}")
+            self.logger.debug(f"Client stats {client_addr}: {session.get_stats()}")
+    
+    def get_client_stats(self) -> list:
+        """
+        Dapatkan statistik semua client yang terhubung
+        
+        Returns:
+            List dictionary statistik per-client
+        """
+        return [session.get_stats() for session in self.clients.values()]
+    
+    def collect_metrics(self) -> list:
+        """
+        Kumpulkan counter dan gauge dari pipeline dan client session (dipanggil saat scrape)
+        
+        Returns:
+            List metric family (nama, tipe, help, samples)
+        """
+        cameras = list(self.cameras.values())
+        families = [
+            ("vto_clients_connected", "gauge", "Connected websocket clients",
+             [({}, len(self.clients))]),
+            ("vto_camera_clients", "gauge", "Connected websocket clients per camera",
+             [({"camera": camera.name}, sum(1 for session in self.clients.values() if session.camera is camera))
+              for camera in cameras]),
+            ("vto_frames_published_total", "counter", "Frames published to client senders",
+             [({"camera": camera.name}, camera.publisher.published_count) for camera in cameras]),
+            ("vto_camera_idle", "gauge", "0 = streaming, 1 = idle without clients, 2 = frame source released",
+             [({"camera": camera.name}, IDLE_STATE_VALUES.get(camera.idle_state, 0)) for camera in cameras]),
+            ("vto_camera_wakeups_total", "counter", "Times a camera resumed from idle for a new client",
+             [({"camera": camera.name}, camera.publisher.wakeups) for camera in cameras]),
+        ]
+        
+        pipelines = [(camera.name, camera.pipeline) for camera in cameras if camera.pipeline is not None]
+        if pipelines:
+            def per_pipeline(value):
+                return [({"camera": name}, value(pipeline)) for name, pipeline in pipelines]
+            
+            families += [
+                ("vto_frames_captured_total", "counter", "Frames read from the frame source",
+                 per_pipeline(lambda pipeline: pipeline.captured_count)),
+                ("vto_capture_failures_total", "counter", "Failed frame source reads",
+                 per_pipeline(lambda pipeline: pipeline.capture_failures)),
+                ("vto_pipeline_frames_dropped_total", "counter", "Frames dropped by full pipeline queues",
+                 [({"camera": name, "stage": "detect"}, pipeline.detect_queue.drop_count)
+                  for name, pipeline in pipelines] +
+                 [({"camera": name, "stage": "encode"}, pipeline.encode_queue.drop_count)
+                  for name, pipeline in pipelines]),
+                ("vto_static_frames_total", "counter", "Frames that reused detection from a static scene",
+                 per_pipeline(lambda pipeline: pipeline.static_frames)),
+                ("vto_encode_failures_total", "counter", "Frames that failed to encode",
+                 per_pipeline(lambda pipeline: pipeline.encode_failures)),
+            ]
+        
+        relays = [camera for camera in cameras if isinstance(camera, RelayCamera)]
+        if relays:
+            families += [
+                ("vto_relay_upstream_connected", "gauge", "Whether the relay is connected to its upstream",
+                 [({"camera": relay.name}, int(relay.get_camera_info()["relay"]["connected"])) for relay in relays]),
+                ("vto_relay_upstream_connects_total", "counter", "Relay connections made to the upstream",
+                 [({"camera": relay.name}, relay.upstream_connects) for relay in relays]),
+                ("vto_relay_frames_received_total", "counter", "Frames received from the upstream",
+                 [({"camera": relay.name}, relay.frames_received) for relay in relays]),
+                ("vto_relay_frames_missed_total", "counter", "Upstream frames the relay did not receive",
+                 [({"camera": relay.name}, relay.frames_missed) for relay in relays]),
+            ]
+        
+        pool = self.upload_pool
+        families += [
+            ("vto_upload_clients", "gauge", "Clients in upload mode",
+             [({}, sum(1 for session in self.clients.values() if session.upload is not None))]),
+            ("vto_upload_jobs_active", "gauge", "Upload frames being processed or queued in the worker pool",
+             [({}, pool.active_jobs)]),
+            ("vto_upload_frames_total", "counter", "Uploaded frames by outcome",
+             [({"result": "processed"}, pool.frames_processed),
+              ({"result": "dropped"}, pool.frames_dropped),
+              ({"result": "rejected"}, pool.frames_rejected)]),
+        ]
+        
+        sessions = list(self.clients.values())
+        if sessions:
+            def per_client(attribute):
+                return [({"client": session.client_id}, getattr(session, attribute))
+                        for session in sessions]
+            
+            families += [
+                ("vto_client_frames_sent_total", "counter", "Frames sent per client", per_client("frames_sent")),
+                ("vto_client_bytes_sent_total", "counter", "Bytes sent per client", per_client("bytes_sent")),
+                ("vto_client_frames_dropped_total", "counter", "Frames a client missed while sending",
+                 per_client("frames_dropped")),
+                ("vto_client_send_lag_ms", "gauge", "Smoothed send duration per client in milliseconds",
+                 per_client("avg_send_ms")),
+                ("vto_client_target_fps", "gauge", "Target frame rate per client", per_client("fps")),
+                ("vto_client_quality", "gauge", "Encoding quality chosen per client", per_client("quality")),
+            ]
+        return families
+    
+    async def send_stats(self, websocket: Any):
+        """
+        Kirim snapshot metric ke client (balasan pesan "stats")
+        
+        Args:
+            websocket: WebSocket connection
+        """
+        data = METRICS.snapshot() if METRICS is not None else None
+        try:
+            await websocket.send(create_stats_message(data))
+        except websockets.exceptions.ConnectionClosed:
+            pass
     
     async def handle_client_message(self, websocket: Any, message: str):
         """
@@ -95,9 +363,46 @@ class WebcamWebSocketServer:
             # Extract data from config message
             config_data = parsed_message.get("data", {})
             await self.handle_config_message(websocket, config_data)
+        elif message_type == "subscribe":
+            await self.handle_subscribe(websocket, parsed_message.get("camera"))
+        elif message_type == "resume":
+            seq = parsed_message.get("seq")
+            session = self.clients.get(websocket)
+            if isinstance(seq, int) and session is not None and session.upload is None:
+                await session.resume(seq)
+                self.logger.info(f"Client {client_addr} resumed after seq {seq}")
+            else:
+                self.logger.warning(f"Invalid resume from {client_addr}: {seq}")
+        elif message_type == "stats":
+            await self.send_stats(websocket)
         else:
             self.logger.warning(f"Unknown message type from {client_addr}: {message_type}")
     
+    async def handle_subscribe(self, websocket: Any, name: Optional[str]):
+        """
+        Pindahkan client ke kamera lain. Tanpa nama (atau nama tidak dikenal)
+        server hanya membalas daftar kamera.
+        
+        Args:
+            websocket: WebSocket connection
+            name: Nama kamera tujuan
+        """
+        session = self.clients.get(websocket)
+        if session is None:
+            return
+        
+        camera = self.cameras.get(name) if isinstance(name, str) else None
+        if camera is not None:
+            await session.set_camera(camera)
+            self.logger.info(f"Client {websocket.remote_address} subscribed to camera {camera.name}")
+        elif name is not None:
+            self.logger.warning(f"Unknown camera from {websocket.remote_address}: {name}")
+        
+        try:
+            await websocket.send(create_cameras_message(self.cameras, session.camera.name))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+    
     async def handle_config_message(self, websocket: Any, config: dict):
         """
         Handle pesan konfigurasi dari client
@@ -107,61 +412,144 @@ class WebcamWebSocketServer:
             config: Dictionary konfigurasi
         """
         client_addr = websocket.remote_address
+        # Pengaturan sumber dan deteksi berlaku untuk kamera yang diikuti client;
+        # dalam mode upload, pengaturan deteksi dan topi milik client sendiri
+        camera = self.get_client_camera(websocket)
+        session = self.clients.get(websocket)
+        
+        # Handle upload mode toggle
+        if "upload" in config:
+            enable = config["upload"]
+            if isinstance(enable, bool) and session is not None:
+                if enable:
+                    await session.start_upload(self.upload_pool)
+                else:
+                    await session.stop_upload()
+                self.logger.info(f"Upload mode {'enabled' if enable else 'disabled'} for {client_addr}")
+        
+        detector_target = session.upload if session is not None and session.upload is not None else camera
         
         # Handle resolution change
         if "resolution" in config:
             resolution = config["resolution"]
             if isinstance(resolution, list) and len(resolution) == 2:
                 width, height = validate_resolution(resolution[0], resolution[1])
-                self.camera.set_resolution(width, height)
-                self.logger.info(f"Resolution changed by {client_addr}: {width}x{height}")
+                camera.set_resolution(width, height)
+                self.logger.info(f"Resolution of {camera.name} changed by {client_addr}: {width}x{height}")
+                # Resolusi sumber berlaku untuk semua client kamera ini; kirim ulang metadata
+                await asyncio.gather(
+                    *[session.send_metadata() for session in list(self.clients.values())
+                      if session.camera is camera]
+                )
         
         # Handle FPS change
         if "fps" in config:
-            fps = validate_fps(config["fps"])
-            # Note: FPS change memerlukan restart broadcast loop
-            self.logger.info(f"FPS change requested by {client_addr}: {fps}")
+            session = self.clients.get(websocket)
+            if isinstance(config["fps"], (int, float)) and session is not None:
+                fps = validate_fps(int(config["fps"]))
+                await session.set_fps(fps)
+                self.logger.info(f"FPS changed by {client_addr}: {fps}")
+            else:
+                self.logger.warning(f"Invalid FPS from {client_addr}: {config['fps']}")
         
-        # Handle JPEG quality change
+        # Handle stream mode change (overlay di server atau raw + deteksi)
+        if "stream_mode" in config:
+            mode = config["stream_mode"]
+            session = self.clients.get(websocket)
+            if mode in Camera.STREAM_MODES and session is not None:
+                await session.set_stream_mode(mode)
+                self.logger.info(f"Stream mode changed to {mode} by {client_addr}")
+            else:
+                self.logger.warning(f"Invalid stream mode from {client_addr}: {mode}")
+        
+        # Handle binary frame envelope (opt-in, client lama tetap menerima JPEG polos)
+        if "envelope" in config:
+            envelope = config["envelope"]
+            session = self.clients.get(websocket)
+            if isinstance(envelope, (bool, int)):
+                version = FRAME_ENVELOPE_VERSION if envelope else 0
+                if session is not None:
+                    session.envelope_version = version
+                    await self.send_metadata(websocket)
+                self.logger.info(f"Frame envelope {'v' + str(version) if version else 'disabled'} for {client_addr}")
+        
+        # Handle frame format change (jpeg, webp, png, bgr, rgba)
+        if "format" in config:
+            fmt = config["format"]
+            session = self.clients.get(websocket)
+            if fmt in ENCODER_FORMATS and session is not None:
+                await session.set_format(fmt)
+                self.logger.info(f"Frame format changed to {fmt} by {client_addr}")
+            else:
+                self.logger.warning(f"Invalid frame format from {client_addr}: {fmt}")
+        
+        # Handle JPEG quality change (kualitas maksimum untuk client ini saja)
         if "jpeg_quality" in config:
             quality = config["jpeg_quality"]
-            if isinstance(quality, int):
-                self.camera.set_jpeg_quality(quality)
+            session = self.clients.get(websocket)
+            if isinstance(quality, int) and session is not None:
+                await session.set_jpeg_quality(quality)
                 self.logger.info(f"JPEG quality changed by {client_addr}: {quality}")
         
+        # Handle adaptive quality toggle
+        if "adaptive_quality" in config:
+            enable = config["adaptive_quality"]
+            session = self.clients.get(websocket)
+            if isinstance(enable, bool) and session is not None:
+                await session.set_adaptive(enable)
+                self.logger.info(f"Adaptive quality {'enabled' if enable else 'disabled'} for {client_addr}")
+        
         # Handle head detection toggle
         if "head_detection" in config:
             enable = config["head_detection"]
             if isinstance(enable, bool):
-                self.camera.toggle_head_detection(enable)
+                detector_target.toggle_head_detection(enable)
                 self.logger.info(f"Head detection {'enabled' if enable else 'disabled'} by {client_addr}")
         
         # Handle cascade change
         if "cascade_type" in config:
             cascade_type = config["cascade_type"]
             if isinstance(cascade_type, str):
-                if self.camera.set_cascade(cascade_type):
+                if detector_target.set_cascade(cascade_type):
                     self.logger.info(f"Cascade changed to {cascade_type} by {client_addr}")
                 else:
                     self.logger.warning(f"Failed to change cascade to {cascade_type} by {client_addr}")
         
+        # Handle detection mode change
+        if "detection_mode" in config:
+            mode = config["detection_mode"]
+            if isinstance(mode, str):
+                if detector_target.set_detection_mode(mode):
+                    self.logger.info(f"Detection mode changed to {mode} by {client_addr}")
+                else:
+                    self.logger.warning(f"Failed to change detection mode to {mode} by {client_addr}")
+        
+        # Handle detection profile change
+        if "detection_profile" in config:
+            profile = config["detection_profile"]
+            if isinstance(profile, str):
+                if detector_target.set_detection_profile(profile):
+                    self.logger.info(f"Detection profile changed to {profile} by {client_addr}")
+                else:
+                    self.logger.warning(f"Failed to change detection profile to {profile} by {client_addr}")
+        
         # Handle hat change
         if "hat_index" in config:
             hat_index = config["hat_index"]
             if isinstance(hat_index, int):
-                if self.camera.set_hat(hat_index):
+                if detector_target.set_hat(hat_index):
                     self.logger.info(f"Hat changed to index {hat_index} by {client_addr}")
                 else:
                     self.logger.warning(f"Failed to change hat to index {hat_index} by {client_addr}")
         
         # Handle next hat
         if "next_hat" in config and config["next_hat"]:
-            self.camera.next_hat()
+            detector_target.next_hat()
             self.logger.info(f"Switched to next hat by {client_addr}")
         
         # Handle previous hat
         if "previous_hat" in config and config["previous_hat"]:
-            self.camera.previous_hat()
+            detector_target.previous_hat()
             self.logger.info(f"Switched to previous hat by {client_addr}")
     
     async def client_handler(self, websocket: Any):
@@ -171,15 +559,19 @@ class WebcamWebSocketServer:
         Args:
             websocket: WebSocket connection
         """
-        await self.register_client(websocket)
+        if not await self.register_client(websocket):
+            return
         
         try:
             async for message in websocket:
                 if isinstance(message, str):
                     await self.handle_client_message(websocket, message)
                 else:
-                    # Binary message dari client (tidak diharapkan untuk sekarang)
-                    self.logger.warning(f"Unexpected binary message from {websocket.remote_address}")
+                    # Binary message dari client: frame upload
+                    session = self.clients.get(websocket)
+                    if session is None or not session.receive_upload(message):
+                        self.logger.warning(f"Unexpected binary message from {websocket.remote_address} "
+                                            f"(upload mode not enabled)")
         
         except websockets.exceptions.ConnectionClosed:
             pass
@@ -188,71 +580,52 @@ class WebcamWebSocketServer:
         finally:
             await self.unregister_client(websocket)
     
-    async def broadcast_frames(self):
-        """
-        Loop untuk broadcast frame ke semua client
-        """
-        self.logger.info("Starting frame broadcast loop")
-        
-        while self.is_running:
-            try:
-                # Ambil frame terbaru
-                frame_data = await self.camera.get_latest_frame()
-                
-                if frame_data and self.clients:
-                    # Broadcast ke semua client
-                    disconnected_clients = set()
-                    
-                    for client in self.clients.copy():
-                        try:
-                            await client.send(frame_data)
-                        except websockets.exceptions.ConnectionClosed:
-                            disconnected_clients.add(client)
-                        except Exception as e:
-                            self.logger.error(f"Error sending frame to {client.remote_address}: {e}")
-                            disconnected_clients.add(client)
-                    
-                    # Remove disconnected clients
-                    for client in disconnected_clients:
-                        await self.unregister_client(client)
-                
-                await asyncio.sleep(BROADCAST_DELAY)
-                
-            except Exception as e:
-                self.logger.error(f"Error in broadcast loop: {e}")
-                await asyncio.sleep(BROADCAST_DELAY)
-    
     async def start_server(self):
         """
         Start WebSocket server
         """
-        # Initialize camera
-        if not await self.camera.initialize():
-            self.logger.error("Failed to initialize camera")
+        # Initialize cameras; kamera yang gagal dibuka tidak dilayani
+        for name, camera in list(self.cameras.items()):
+            if not await camera.initialize():
+                self.logger.error(f"Failed to initialize camera {name}")
+                del self.cameras[name]
+        if not self.cameras:
+            self.logger.error("No camera available")
             return
+        if self.default_camera not in self.cameras:
+            self.default_camera = next(iter(self.cameras))
         
         self.is_running = True
         
-        # Start camera capture loop
-        camera_task = asyncio.create_task(self.camera.start_capture_loop())
+        # Start pipeline setiap kamera (frame dikirim oleh sender per-client)
+        camera_task = asyncio.gather(
+            *[camera.start_capture_loop() for camera in self.cameras.values()]
+        )
         
-        # Start broadcast loop
-        broadcast_task = asyncio.create_task(self.broadcast_frames())
+        # Start endpoint metrics Prometheus (lokal)
+        if METRICS is not None and self.metrics_port:
+            self.metrics_server = MetricsHttpServer(METRICS, METRICS_HOST, self.metrics_port)
+            try:
+                await self.metrics_server.start()
+            except OSError as e:
+                self.logger.warning(f"Metrics endpoint not started: {e}")
+                self.metrics_server = None
         
         # Start WebSocket server
-        self.logger.info(f"Starting WebSocket server on {SERVER_HOST}:{SERVER_PORT}")
+        self.logger.info(f"Starting WebSocket server on {self.host}:{self.port}, "
+                         f"cameras: {', '.join(self.cameras)} (default: {self.default_camera})")
         
         try:
             async with websockets.serve(
                 self.client_handler,
-                SERVER_HOST,
-                SERVER_PORT,
-                max_size=None,  # No message size limit
+                self.host,
+                self.port,
+                max_size=WEBSOCKET_MAX_MESSAGE_BYTES,  # Upload terlalu besar ditolak di level protokol
                 ping_interval=20,
                 ping_timeout=10
             ):
                 self.logger.info("WebSocket server started successfully")
-                await asyncio.gather(camera_task, broadcast_task)
+                await camera_task
                 
         except Exception as e:
             self.logger.error(f"Server error: {e}")
@@ -269,20 +642,183 @@ class WebcamWebSocketServer:
         # Close all client connections
         if self.clients:
             await asyncio.gather(
-                *[client.close() for client in self.clients],
+                *[client.close() for client in list(self.clients)],
                 return_exceptions=True
             )
         
-        # Stop camera
-        await self.camera.stop()
+        if self.metrics_server is not None:
+            await self.metrics_server.stop()
+            self.metrics_server = None
+        
+        # Stop cameras
+        for camera in self.cameras.values():
+            await camera.stop()
+        
+        self.upload_pool.close()
         
         self.logger.info("Server stopped")
 
-async def main():
+def parse_args(argv: Optional[list] = None) -> argparse.Namespace:
+    """
+    Parse argumen command line (default dari config.py)
+    
+    Args:
+        argv: Daftar argumen (default: sys.argv)
+    
+    Returns:
+        Namespace argumen
+    """
+    parser = argparse.ArgumentParser(description="Webcam WebSocket Server")
+    parser.add_argument("--source", choices=FRAME_SOURCE_TYPES, default=FRAME_SOURCE,
+                        help="Frame source type")
+    parser.add_argument("--source-path", default=FRAME_SOURCE_PATH,
+                        help="Video file or image directory for the video/images sources")
+    parser.add_argument("--source-fps", type=float, default=SOURCE_FPS,
+                        help="Frame rate for non-device sources (0 = source default)")
+    parser.add_argument("--no-loop", action="store_true",
+                        help="Hold the last frame instead of looping video/image sources")
+    parser.add_argument("--camera-index", type=int, default=CAMERA_INDEX,
+                        help="Camera index for the device source")
+    parser.add_argument("--synthetic-heads", type=int, default=SYNTHETIC_HEADS,
+                        help="Number of moving heads for the synthetic source")
+    parser.add_argument("--seed", type=int, default=SYNTHETIC_SEED,
+                        help="Seed for the synthetic source")
+    parser.add_argument("--width", type=int, default=DEFAULT_WIDTH, help="Frame width")
+    parser.add_argument("--height", type=int, default=DEFAULT_HEIGHT, help="Frame height")
+    parser.add_argument("--max-clients", type=int, default=MAX_CLIENTS,
+                        help="Maximum simultaneous clients (see test_client.py --find-ceiling)")
+    parser.add_argument("--camera", action="append", type=parse_camera_arg, metavar="NAME=SPEC",
+                        help="Named camera, repeatable: front=device:0, side=video:clip.mp4, "
+                             "demo=synthetic:3 (overrides --source and CAMERA_SOURCES)")
+    parser.add_argument("--relay", action="append", type=parse_relay_arg, metavar="[NAME=]URL",
+                        help="Relay mode: re-broadcast an upstream server (or relay) without "
+                             "re-encoding, repeatable, e.g. ws://10.0.0.5:8765/front")
+    parser.add_argument("--host", default=SERVER_HOST, help="WebSocket bind address")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help="WebSocket port")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="Prometheus endpoint port (0 = disabled)")
+    return parser.parse_args(argv)
+
+def parse_relay_arg(value: str) -> tuple:
+    """
+    Parse argumen --relay [NAMA=]URL
+    
+    Args:
+        value: Teks argumen
+    
+    Returns:
+        Tuple (nama atau "" jika tidak diberi nama, URL upstream)
+    """
+    name, separator, url = value.partition("=")
+    if not separator or "://" in name:
+        name, url = "", value
+    if not url.startswith(("ws://", "wss://")):
+        raise argparse.ArgumentTypeError(f"Expected a ws:// or wss:// URL, got {value!r}")
+    return name.strip(), url.strip()
+
+def create_relay_cameras(relays: list) -> Dict[str, RelayCamera]:
+    """
+    Buat RelayCamera dari argumen --relay. Relay tanpa nama memakai nama
+    kamera dari path URL upstream, atau DEFAULT_CAMERA_NAME.
+    
+    Args:
+        relays: List (nama, URL)
+    
+    Returns:
+        Nama kamera -> RelayCamera
+    """
+    cameras = {}
+    for name, url in relays:
+        if not name:
+            path = url.split("://", 1)[1].partition("/")[2]
+            name = path.split("?", 1)[0].strip("/").split("/")[-1] or DEFAULT_CAMERA_NAME
+        if name in cameras:
+            raise ValueError(f"Duplicate relay camera name: {name}")
+        cameras[name] = RelayCamera(url, name)
+    return cameras
+
+def parse_camera_arg(value: str) -> tuple:
+    """
+    Parse argumen --camera NAMA=SPEC
+    
+    Args:
+        value: Teks argumen
+    
+    Returns:
+        Tuple (nama, spec sumber)
+    """
+    name, _, spec = value.partition("=")
+    name = name.strip()
+    if not name or not spec or "/" in name:
+        raise argparse.ArgumentTypeError(f"Expected NAME=SPEC, got {value!r}")
+    return name, spec.strip()
+
+def create_camera_sources(specs: Dict[str, str], fps: float = SOURCE_FPS, loop: bool = SOURCE_LOOP,
+                          seed: int = SYNTHETIC_SEED) -> Dict[str, FrameSource]:
+    """
+    Buat sumber frame bernama dari spec teks (lihat create_frame_source_from_spec)
+    
+    Args:
+        specs: Nama kamera -> spec sumber, misal {"front": "device:0"}
+        fps: FPS untuk sumber selain device (0 = default sumber)
+        loop: Putar ulang file video / urutan gambar
+        seed: Seed untuk sumber synthetic
+    
+    Returns:
+        Nama kamera -> FrameSource
+    """
+    return {name: create_frame_source_from_spec(spec, fps, loop, seed) for name, spec in specs.items()}
+
+def create_source_from_args(args: argparse.Namespace) -> FrameSource:
+    """
+    Buat sumber frame dari argumen command line
+    
+    Args:
+        args: Namespace dari parse_args
+    
+    Returns:
+        Instance FrameSource
+    """
+    return create_frame_source(
+        args.source, args.source_path, args.camera_index, args.source_fps,
+        not args.no_loop, args.synthetic_heads, args.seed
+    )
+
+async def main(args: Optional[argparse.Namespace] = None):
     """
     Main function untuk menjalankan server
+    
+    Args:
+        args: Argumen command line (default: parse sys.argv)
     """
-    server = WebcamWebSocketServer()
+    if args is None:
+        args = parse_args()
+    
+    specs = dict(args.camera) if args.camera else dict(CAMERA_SOURCES)
+    if args.camera and len(specs) != len(args.camera):
+        raise SystemExit("Duplicate camera name in --camera")
+    if args.relay:
+        try:
+            server = WebcamWebSocketServer(cameras=create_relay_cameras(args.relay))
+        except ValueError as e:
+            raise SystemExit(str(e))
+    elif specs:
+        try:
+            sources = create_camera_sources(specs, args.source_fps, not args.no_loop, args.seed)
+        except ValueError as e:
+            raise SystemExit(str(e))
+        server = WebcamWebSocketServer(sources=sources)
+    else:
+        server = WebcamWebSocketServer(create_source_from_args(args))
+    if not args.relay:
+        # Resolusi relay mengikuti upstream
+        width, height = validate_resolution(args.width, args.height)
+        for camera in server.cameras.values():
+            camera.set_resolution(width, height)
+    server.host = args.host
+    server.port = args.port
+    server.metrics_port = args.metrics_port
+    server.max_clients = max(1, args.max_clients)
     
     try:
         await server.start_server()
@@ -294,4 +830,4 @@ async def main():
         await server.stop_server()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main(parse_args()))
\ No newline at end of file
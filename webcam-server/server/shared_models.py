@@ -0,0 +1,205 @@
+"""
+Shared models module: cascade dan aset topi yang dimuat sekali per process
+dan dipakai bersama oleh semua HeadDetector (satu per kamera)
+"""
+
+import glob
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional
+
+import cv2
+
+from config import DETECTION_PROFILES_FILE
+from sprite_cache import SpriteCache
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(BASE_DIR, "..", "models")
+HATS_DIR = os.path.join(BASE_DIR, "..", "assets", "hats")
+PROFILES_PATH = os.path.join(MODELS_DIR, DETECTION_PROFILES_FILE)
+
+# Tipe cascade -> path file XML (urutan = prioritas tampilan)
+CASCADE_FILES = {
+    "haar_biwi": os.path.join(MODELS_DIR, "haar_biwi_cascade.xml"),
+    "lbp_biwi": os.path.join(MODELS_DIR, "lbp_biwi_cascade.xml"),
+    "opencv_default": cv2.data.haarcascades + "haarcascade_frontalface_default.xml",
+}
+
+
+class SharedModels:
+    """
+    Cascade XML, gambar topi, dan sprite cache yang dipakai bersama.
+
+    Gambar topi (array read-only) dan sprite cache (thread-safe) langsung
+    dibagi ke semua pipeline. CascadeClassifier menyimpan state sementara
+    saat detectMultiScale sehingga tidak aman dipakai dua thread sekaligus;
+    setiap detector mendapat instance sendiri yang dibangun dari XML yang
+    sudah ada di memori, tanpa membaca file lagi.
+    """
+
+    def __init__(self, cascade_files: Dict[str, str] = CASCADE_FILES, hats_dir: str = HATS_DIR,
+                 profiles_path: str = PROFILES_PATH):
+        """
+        Load cascade XML, gambar topi, dan profil deteksi
+
+        Args:
+            cascade_files: Mapping tipe cascade -> path file XML
+            hats_dir: Direktori gambar topi (PNG dengan alpha)
+            profiles_path: File JSON profil deteksi (ditulis tune_cascade.py)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.cascade_paths: Dict[str, str] = {}
+        self._cascade_xml: Dict[str, str] = {}
+        self.hat_images: List[dict] = []
+        self.sprite_cache = SpriteCache()
+        self.profiles_path = profiles_path
+        self.detection_profiles: Dict[str, Dict[str, dict]] = {}
+        self.active_profile = ""
+
+        self._load_cascades(cascade_files)
+        self._load_hats(hats_dir)
+        self._load_profiles(profiles_path)
+
+    def _load_cascades(self, cascade_files: Dict[str, str]):
+        """
+        Baca semua file cascade ke memori
+        """
+        for cascade_type, path in cascade_files.items():
+            if not os.path.exists(path):
+                self.logger.warning(f"✗ Cascade {cascade_type} not found at {path}")
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                self._cascade_xml[cascade_type] = f.read()
+            self.cascade_paths[cascade_type] = path
+            self.logger.info(f"✓ Cascade {cascade_type} loaded from {path}")
+
+    def _load_hats(self, hats_dir: str):
+        """
+        Load semua gambar topi (read-only agar aman dibagi antar thread)
+        """
+        if not os.path.exists(hats_dir):
+            self.logger.warning(f"Hats directory not found: {hats_dir}")
+            return
+
+        for hat_file in sorted(glob.glob(os.path.join(hats_dir, "*.png"))):
+            hat_img = cv2.imread(hat_file, cv2.IMREAD_UNCHANGED)
+            if hat_img is None:
+                continue
+            hat_img.setflags(write=False)
+            self.hat_images.append({
+                "name": os.path.basename(hat_file),
+                "image": hat_img
+            })
+            self.logger.info(f"✓ Hat loaded: {os.path.basename(hat_file)}")
+
+        if not self.hat_images:
+            self.logger.warning("No hat images found")
+
+    def _load_profiles(self, path: str):
+        """
+        Baca profil deteksi bernama: nama -> tipe cascade -> parameter
+        detectMultiScale. Entri yang tidak valid dilewati dengan warning.
+        """
+        if not os.path.exists(path):
+            self.logger.info(f"No detection profiles at {path}, using built-in parameters")
+            return
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"✗ Cannot read detection profiles {path}: {e}")
+            return
+
+        for name, cascades in data.get("profiles", {}).items():
+            params = {}
+            for cascade_type, values in cascades.items():
+                try:
+                    params[cascade_type] = {
+                        "scale_factor": float(values["scale_factor"]),
+                        "min_neighbors": int(values["min_neighbors"]),
+                        "min_size": (int(values["min_size"][0]), int(values["min_size"][1]))
+                    }
+                except (KeyError, IndexError, TypeError, ValueError):
+                    self.logger.warning(f"✗ Invalid parameters for {cascade_type} in profile {name}")
+                    continue
+                if params[cascade_type]["scale_factor"] <= 1.0:
+                    self.logger.warning(f"✗ scale_factor must be > 1 ({cascade_type} in profile {name})")
+                    del params[cascade_type]
+            self.detection_profiles[name] = params
+
+        active = data.get("active", "")
+        self.active_profile = active if active in self.detection_profiles else ""
+        self.logger.info(f"✓ Detection profiles loaded from {path}: {', '.join(self.detection_profiles)}"
+                         f" (active: {self.active_profile or 'default'})")
+
+    def create_cascade(self, cascade_type: str) -> Optional[cv2.CascadeClassifier]:
+        """
+        Buat CascadeClassifier baru dari XML di memori
+
+        Args:
+            cascade_type: Tipe cascade (haar_biwi, lbp_biwi, opencv_default)
+
+        Returns:
+            CascadeClassifier, atau None jika tipe tidak tersedia / gagal dibaca
+        """
+        xml = self._cascade_xml.get(cascade_type)
+        if xml is None:
+            return None
+
+        storage = cv2.FileStorage(xml, cv2.FILE_STORAGE_READ | cv2.FILE_STORAGE_MEMORY)
+        cascade = cv2.CascadeClassifier()
+        if not cascade.read(storage.getFirstTopLevelNode()) or cascade.empty():
+            # Format lama (haartraining) hanya bisa dibaca dari file
+            cascade = cv2.CascadeClassifier(self.cascade_paths[cascade_type])
+        storage.release()
+        return None if cascade.empty() else cascade
+
+    def create_cascades(self) -> Dict[str, cv2.CascadeClassifier]:
+        """
+        Buat satu set CascadeClassifier untuk satu detector
+
+        Returns:
+            Mapping tipe cascade -> CascadeClassifier
+        """
+        cascades = {}
+        for cascade_type in self.cascade_paths:
+            cascade = self.create_cascade(cascade_type)
+            if cascade is not None:
+                cascades[cascade_type] = cascade
+        return cascades
+
+    def get_info(self) -> dict:
+        """
+        Dapatkan informasi model bersama
+
+        Returns:
+            Dictionary berisi cascade, topi, dan statistik sprite cache
+        """
+        return {
+            "cascades": list(self.cascade_paths),
+            "hats": [hat["name"] for hat in self.hat_images],
+            "hat_bytes": sum(hat["image"].nbytes for hat in self.hat_images),
+            "detection_profiles": list(self.detection_profiles),
+            "sprite_cache": self.sprite_cache.get_stats()
+        }
+
+
+_shared_models: Optional[SharedModels] = None
+_shared_models_lock = threading.Lock()
+
+
+def get_shared_models() -> SharedModels:
+    """
+    Instance SharedModels milik process ini (dimuat saat pertama dipakai)
+
+    Returns:
+        SharedModels
+    """
+    global _shared_models
+    with _shared_models_lock:
+        if _shared_models is None:
+            _shared_models = SharedModels()
+        return _shared_models
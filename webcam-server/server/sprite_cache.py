@@ -0,0 +1,185 @@
+"""
+Sprite cache module: cache sprite topi yang sudah di-resize dan premultiplied,
+serta compositing in-place ke frame
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Tuple
+
+import cv2
+import numpy as np
+
+from config import SPRITE_CACHE_MAX_BYTES, SPRITE_SIZE_BUCKET
+
+
+class SpriteCache:
+    """
+    LRU cache untuk sprite topi, dengan key (nama topi, lebar bucket, tinggi bucket).
+
+    Setiap entry berisi gambar BGR uint8 dengan alpha premultiplied dan
+    inverse alpha uint8 (255 - alpha), siap untuk blending fixed-point
+    tanpa resize atau konversi ulang. Aman dipakai bersama oleh beberapa
+    pipeline (thread) sekaligus.
+    """
+
+    def __init__(self, max_bytes: int = SPRITE_CACHE_MAX_BYTES, bucket: int = SPRITE_SIZE_BUCKET):
+        """
+        Initialize cache
+
+        Args:
+            max_bytes: Batas total memori sprite (bytes)
+            bucket: Kuantisasi ukuran sprite (pixel)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.max_bytes = max_bytes
+        self.bucket = max(1, bucket)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def quantize(self, size: int) -> int:
+        """
+        Bulatkan ukuran ke bucket terdekat
+
+        Args:
+            size: Ukuran dalam pixel
+
+        Returns:
+            Ukuran hasil kuantisasi (minimal satu bucket)
+        """
+        return max(self.bucket, int(round(size / self.bucket)) * self.bucket)
+
+    def get(self, name: str, image: np.ndarray, width: int, height: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Ambil sprite siap-blend untuk ukuran tertentu, buat jika belum ada
+
+        Args:
+            name: Nama topi (bagian dari key cache)
+            image: Gambar topi BGRA resolusi penuh
+            width: Lebar sprite yang diinginkan
+            height: Tinggi sprite yang diinginkan
+
+        Returns:
+            Tuple (premultiplied_bgr, inverse_alpha) dengan ukuran bucket
+        """
+        key = (name, self.quantize(width), self.quantize(height))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        # Resize di luar lock agar pipeline lain tidak ikut menunggu
+        entry = self._build(image, key[1], key[2])
+        with self._lock:
+            if key not in self._entries:
+                self._insert(key, entry)
+        return entry
+
+    def _build(self, image: np.ndarray, width: int, height: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Resize gambar topi dan siapkan alpha premultiplied
+
+        Args:
+            image: Gambar topi BGRA
+            width: Lebar target
+            height: Tinggi target
+
+        Returns:
+            Tuple (premultiplied_bgr, inverse_alpha)
+        """
+        resized = cv2.resize(image, (width, height))
+        alpha = cv2.cvtColor(resized[:, :, 3], cv2.COLOR_GRAY2BGR)
+        premultiplied = cv2.multiply(resized[:, :, :3], alpha, scale=1.0 / 255.0)
+        inverse_alpha = cv2.bitwise_not(alpha)
+        return premultiplied, inverse_alpha
+
+    def _insert(self, key: Tuple, entry: Tuple[np.ndarray, np.ndarray]):
+        """
+        Simpan entry baru dan buang entry LRU jika melebihi batas memori
+
+        Args:
+            key: Key cache
+            entry: Tuple sprite
+        """
+        size = sum(array.nbytes for array in entry)
+        if size > self.max_bytes:
+            # Sprite terlalu besar untuk di-cache, tetap dipakai sekali
+            return
+
+        self._entries[key] = entry
+        self.current_bytes += size
+
+        while self.current_bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= sum(array.nbytes for array in evicted)
+            self.evictions += 1
+
+    def clear(self):
+        """
+        Kosongkan cache
+        """
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def get_stats(self) -> dict:
+        """
+        Dapatkan statistik cache
+
+        Returns:
+            Dictionary berisi jumlah entry, memori, hit, miss, dan eviction
+        """
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+def composite_sprite(frame: np.ndarray, premultiplied: np.ndarray, inverse_alpha: np.ndarray,
+                     x: int, y: int) -> bool:
+    """
+    Blend sprite premultiplied ke frame secara in-place dengan aritmatika uint8.
+
+    frame = premultiplied + frame * inverse_alpha / 255, ditulis langsung ke ROI
+    frame tanpa array sementara. Sprite yang keluar dari tepi frame (termasuk
+    tepi atas/kiri) dipotong, bukan digeser.
+
+    Args:
+        frame: Frame BGR uint8 (dimodifikasi in-place)
+        premultiplied: Sprite BGR uint8 dengan alpha premultiplied
+        inverse_alpha: Inverse alpha uint8 3-channel (255 - alpha)
+        x, y: Posisi pojok kiri atas sprite di frame (boleh negatif)
+
+    Returns:
+        True jika ada bagian sprite yang digambar
+    """
+    sprite_height, sprite_width = premultiplied.shape[:2]
+    frame_height, frame_width = frame.shape[:2]
+
+    x0, y0 = max(0, x), max(0, y)
+    x1 = min(frame_width, x + sprite_width)
+    y1 = min(frame_height, y + sprite_height)
+    if x1 <= x0 or y1 <= y0:
+        return False
+
+    # Offset di dalam sprite untuk bagian yang terpotong di atas/kiri
+    sx0, sy0 = x0 - x, y0 - y
+    sx1, sy1 = sx0 + (x1 - x0), sy0 + (y1 - y0)
+
+    roi = frame[y0:y1, x0:x1]
+    cv2.multiply(roi, inverse_alpha[sy0:sy1, sx0:sx1], dst=roi, scale=1.0 / 255.0)
+    cv2.add(roi, premultiplied[sy0:sy1, sx0:sx1], dst=roi)
+    return True
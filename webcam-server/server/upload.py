@@ -0,0 +1,380 @@
+"""
+Upload module: try-on untuk frame dari kamera milik client (ponsel/browser).
+Decode, deteksi, overlay, dan encode dijalankan di worker pool bersama.
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, List, Optional
+
+import cv2
+
+from camera import Camera
+from config import UPLOAD_WORKERS, UPLOAD_MAX_BYTES, MAX_FRAME_WIDTH, MAX_FRAME_HEIGHT
+from encoders import decode_frame, get_encoder
+from head_detector import HeadDetector
+from metrics import METRICS
+from utils import scale_resolution, unpack_frame_envelope
+
+
+@dataclass
+class UploadResult:
+    """
+    Hasil satu frame upload
+    """
+    seq: int
+    capture_ts: float
+    mode: str
+    width: int = 0  # Resolusi hasil (frame overlay diperkecil sesuai skala varian)
+    height: int = 0
+    heads: List = field(default_factory=list)
+    hat_index: int = 0
+    payload: Optional[bytes] = None  # Frame ter-encode (stream mode overlay)
+    decode_ms: float = 0.0
+    detect_ms: float = 0.0
+    encode_ms: float = 0.0
+
+
+class UploadWorkerPool:
+    """
+    Thread pool yang dipakai bersama oleh semua client upload.
+
+    Decode, detectMultiScale, overlay, dan encode di OpenCV/libjpeg-turbo
+    melepas GIL, sehingga thread cukup untuk memakai beberapa core tanpa
+    menyalin frame antar process. Event loop hanya menerima bytes dan
+    mengirim hasil. Jumlah job dibatasi oleh backpressure per-client
+    (paling banyak satu job per client).
+    """
+
+    def __init__(self, workers: int = UPLOAD_WORKERS):
+        """
+        Initialize pool (thread dibuat saat job pertama)
+
+        Args:
+            workers: Jumlah worker thread
+        """
+        self.workers = max(1, workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.active_jobs = 0
+        self.completed_jobs = 0
+
+        # Total semua client (statistik per-client ada di UploadSession)
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.frames_rejected = 0
+
+    async def run(self, func: Callable, *args):
+        """
+        Jalankan fungsi di worker thread tanpa memblokir event loop
+
+        Args:
+            func: Fungsi yang dijalankan
+            *args: Argumen fungsi
+
+        Returns:
+            Hasil fungsi
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="upload-worker")
+
+        self.active_jobs += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.active_jobs -= 1
+            self.completed_jobs += 1
+
+    def close(self):
+        """
+        Hentikan worker thread (job yang belum mulai dibatalkan)
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def get_stats(self) -> dict:
+        """
+        Dapatkan statistik pool
+
+        Returns:
+            Dictionary berisi jumlah worker, job, dan frame
+        """
+        return {
+            "workers": self.workers,
+            "active_jobs": self.active_jobs,
+            "queued_jobs": max(0, self.active_jobs - self.workers),
+            "completed_jobs": self.completed_jobs,
+            "frames_processed": self.frames_processed,
+            "frames_dropped": self.frames_dropped,
+            "frames_rejected": self.frames_rejected
+        }
+
+
+class UploadSession:
+    """
+    Mode upload untuk satu client.
+
+    Client mengirim frame (JPEG, PNG, atau WebP) sebagai pesan binary,
+    opsional dibungkus frame envelope agar seq dan capture_ts miliknya
+    dikembalikan di hasil. Setiap client punya HeadDetector sendiri,
+    sehingga topi, cascade, dan mode deteksi tidak memengaruhi kamera atau
+    client lain. Method pengaturannya sama dengan Camera, sehingga pesan
+    config deteksi/topi bisa diarahkan ke session ini.
+
+    Backpressure per-client: paling banyak satu frame diproses dan satu
+    frame menunggu. Frame yang datang saat masih ada frame menunggu
+    menggantikannya (latest-frame-wins), jadi client yang mengirim lebih
+    cepat dari kemampuan server hanya kehilangan frame miliknya sendiri.
+    Hasil berikutnya baru diproses setelah hasil sebelumnya terkirim.
+    """
+
+    PROCESS_SMOOTHING = 0.1  # Bobot EMA untuk waktu proses per frame
+
+    def __init__(self, pool: UploadWorkerPool,
+                 send_result: Callable[[UploadResult], Awaitable]):
+        """
+        Initialize session
+
+        Args:
+            pool: Worker pool bersama
+            send_result: Coroutine pengirim hasil ke client
+        """
+        self.pool = pool
+        self.send_result = send_result
+        self.head_detector: Optional[HeadDetector] = None
+        self.logger = logging.getLogger(__name__)
+
+        self._pending = None  # (pesan, waktu terima, seq, varian) yang menunggu giliran
+        self._task: Optional[asyncio.Task] = None
+
+        # Statistik
+        self.frames_received = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0  # Tergantikan frame yang lebih baru
+        self.frames_rejected = 0  # Terlalu besar atau gagal di-decode
+        self.avg_process_ms = 0.0
+        self.last_decode_ms = 0.0
+        self.last_detect_ms = 0.0
+        self.last_encode_ms = 0.0
+
+    @property
+    def is_running(self) -> bool:
+        return self.head_detector is not None
+
+    async def start(self, template: Optional[HeadDetector] = None):
+        """
+        Buat HeadDetector client di worker pool (membangun cascade tidak
+        dilakukan di event loop)
+
+        Args:
+            template: Detector yang pengaturan awalnya disalin (detector kamera)
+        """
+        detector = await self.pool.run(HeadDetector)
+        if template is not None:
+            detector.toggle_detection(template.enabled)
+            if template.current_cascade_type != detector.current_cascade_type:
+                detector.set_cascade(template.current_cascade_type)
+            if template.detection_mode != detector.detection_mode:
+                detector.set_detection_mode(template.detection_mode)
+            if template.detection_profile != detector.detection_profile:
+                detector.set_detection_profile(template.detection_profile)
+            if template.current_hat_idx != detector.current_hat_idx:
+                detector.set_hat(template.current_hat_idx)
+        self.head_detector = detector
+
+    async def stop(self):
+        """
+        Hentikan pemrosesan; frame yang menunggu dibuang
+        """
+        self.head_detector = None
+        self._pending = None
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def receive(self, message: bytes, variant: tuple):
+        """
+        Terima satu frame dari client (dipanggil dari event loop, tidak memblokir)
+
+        Args:
+            message: Pesan binary client (gambar, opsional dengan envelope)
+            variant: Varian hasil (stream mode, format, kualitas, skala) saat frame diterima
+        """
+        if not self.is_running:
+            return
+
+        self.frames_received += 1
+        if len(message) > UPLOAD_MAX_BYTES:
+            self._reject(f"Upload frame of {len(message)} bytes exceeds {UPLOAD_MAX_BYTES} bytes")
+            return
+
+        item = (message, time.time(), self.frames_received, variant)
+        if self._task is None:
+            self._task = asyncio.create_task(self._process_loop(item))
+            return
+
+        if self._pending is not None:
+            self.frames_dropped += 1
+            self.pool.frames_dropped += 1
+        self._pending = item
+
+    async def _process_loop(self, item: tuple):
+        """
+        Proses frame di worker pool dan kirim hasilnya, lalu lanjut ke frame
+        yang menunggu (jika ada)
+
+        Args:
+            item: (pesan, waktu terima, seq, varian)
+        """
+        try:
+            while item is not None and self.is_running:
+                result = await self.pool.run(self._process, *item)
+                if result is not None:
+                    await self.send_result(result)
+                item, self._pending = self._pending, None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.logger.error(f"Error processing upload frame: {e}")
+            self._pending = None
+        finally:
+            if self._task is asyncio.current_task():
+                self._task = None
+
+    def _process(self, message: bytes, received_at: float, seq: int,
+                 variant: tuple) -> Optional[UploadResult]:
+        """
+        Decode, deteksi, overlay, dan encode satu frame (dijalankan di worker thread)
+
+        Args:
+            message: Pesan binary client
+            received_at: Waktu pesan diterima (unix timestamp)
+            seq: Nomor frame dari server (diganti seq envelope jika ada)
+            variant: Varian hasil (stream mode, format, kualitas, skala)
+
+        Returns:
+            UploadResult, atau None jika frame ditolak
+        """
+        detector = self.head_detector
+        if detector is None:
+            return None
+
+        capture_ts = received_at
+        envelope = unpack_frame_envelope(message)
+        if envelope is not None:
+            header, message = envelope
+            seq, capture_ts = header["seq"], header["capture_ts"]
+
+        start = time.perf_counter()
+        frame = decode_frame(message)
+        if frame is None:
+            self._reject("Cannot decode upload frame")
+            return None
+        height, width = frame.shape[:2]
+        if width > MAX_FRAME_WIDTH or height > MAX_FRAME_HEIGHT:
+            self._reject(f"Upload frame {width}x{height} exceeds {MAX_FRAME_WIDTH}x{MAX_FRAME_HEIGHT}")
+            return None
+        decoded = time.perf_counter()
+
+        mode, fmt, quality, scale = variant
+        result = UploadResult(seq=seq, capture_ts=capture_ts, mode=mode, width=width, height=height,
+                              hat_index=detector.current_hat_idx)
+        if mode == Camera.STREAM_OVERLAY:
+            frame, result.heads = detector.process_frame(frame)
+        elif detector.enabled:
+            result.heads = detector.detect_heads(frame)
+        detected = time.perf_counter()
+
+        if mode == Camera.STREAM_OVERLAY:
+            # Mode raw: client sudah punya frame-nya, cukup kirim deteksi
+            if scale < 1.0:
+                size = scale_resolution(width, height, scale)
+                frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+                result.width, result.height = size
+            result.payload = get_encoder(fmt).encode(frame, quality)
+        finished = time.perf_counter()
+
+        result.decode_ms = (decoded - start) * 1000.0
+        result.detect_ms = (detected - decoded) * 1000.0
+        result.encode_ms = (finished - detected) * 1000.0
+        self._record_process(result, (finished - start) * 1000.0)
+        return result
+
+    def _record_process(self, result: UploadResult, process_ms: float):
+        """
+        Catat statistik satu frame yang selesai diproses
+        """
+        self.frames_processed += 1
+        self.pool.frames_processed += 1
+        self.last_decode_ms = result.decode_ms
+        self.last_detect_ms = result.detect_ms
+        self.last_encode_ms = result.encode_ms
+        self.avg_process_ms = process_ms if self.frames_processed == 1 else \
+            self.avg_process_ms + self.PROCESS_SMOOTHING * (process_ms - self.avg_process_ms)
+
+        if METRICS is not None:
+            METRICS.stage_duration.observe(result.decode_ms, "upload_decode")
+            METRICS.stage_duration.observe(result.detect_ms, "upload_detect")
+            if result.payload is not None:
+                METRICS.stage_duration.observe(result.encode_ms, "upload_encode")
+
+    def _reject(self, reason: str):
+        """
+        Catat frame yang ditolak
+        """
+        self.frames_rejected += 1
+        self.pool.frames_rejected += 1
+        self.logger.warning(reason)
+
+    def toggle_head_detection(self, enable: bool):
+        if self.head_detector is not None:
+            self.head_detector.toggle_detection(enable)
+
+    def set_cascade(self, cascade_type: str) -> bool:
+        return self.head_detector is not None and self.head_detector.set_cascade(cascade_type)
+
+    def set_detection_mode(self, mode: str) -> bool:
+        return self.head_detector is not None and self.head_detector.set_detection_mode(mode)
+
+    def set_detection_profile(self, name: str) -> bool:
+        return self.head_detector is not None and self.head_detector.set_detection_profile(name)
+
+    def set_hat(self, hat_index: int) -> bool:
+        return self.head_detector is not None and self.head_detector.set_hat(hat_index)
+
+    def next_hat(self) -> bool:
+        return self.head_detector is not None and self.head_detector.next_hat()
+
+    def previous_hat(self) -> bool:
+        return self.head_detector is not None and self.head_detector.previous_hat()
+
+    def get_stats(self) -> dict:
+        """
+        Dapatkan statistik upload client
+
+        Returns:
+            Dictionary berisi jumlah frame, waktu proses, dan pengaturan deteksi
+        """
+        detector = self.head_detector
+        return {
+            "frames_received": self.frames_received,
+            "frames_processed": self.frames_processed,
+            "frames_dropped": self.frames_dropped,
+            "frames_rejected": self.frames_rejected,
+            "busy": self._task is not None,
+            "avg_process_ms": round(self.avg_process_ms, 2),
+            "last_decode_ms": round(self.last_decode_ms, 2),
+            "last_detect_ms": round(self.last_detect_ms, 2),
+            "last_encode_ms": round(self.last_encode_ms, 2),
+            "cascade_type": detector.current_cascade_type if detector else None,
+            "detection_mode": detector.detection_mode if detector else None,
+            "detection_profile": detector.detection_profile if detector else None,
+            "hat_index": detector.current_hat_idx if detector else None
+        }
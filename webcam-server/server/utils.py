@@ -4,7 +4,16 @@ Utility functions untuk Webcam WebSocket Server
 
 import json
 import logging
-from typing import Dict, Any
+import struct
+from urllib.parse import parse_qs, urlparse
+from typing import Dict, Any, Optional, Tuple
+
+# Binary frame envelope (opt-in via config "envelope"):
+# magic "VT", version, header size, seq, capture timestamp (unix detik),
+# detect ms, encode ms, payload length - little endian, diikuti payload JPEG
+FRAME_ENVELOPE_MAGIC = b"VT"
+FRAME_ENVELOPE_VERSION = 1
+FRAME_ENVELOPE_STRUCT = struct.Struct("<2sBBIdffI")
 
 def setup_logging(level: str = "INFO", format_str: str = None) -> logging.Logger:
     """
@@ -30,7 +39,8 @@ def setup_logging(level: str = "INFO", format_str: str = None) -> logging.Logger
     
     return logging.getLogger(__name__)
 
-def create_metadata_message(width: int, height: int, fps: int) -> str:
+def create_metadata_message(width: int, height: int, fps: int,
+                            extra: Optional[Dict[str, Any]] = None) -> str:
     """
     Buat pesan metadata dalam format JSON
     
@@ -38,6 +48,7 @@ def create_metadata_message(width: int, height: int, fps: int) -> str:
         width: Lebar frame
         height: Tinggi frame
         fps: Frame per second
+        extra: Field tambahan (opsional), misal versi envelope
     
     Returns:
         JSON string metadata
@@ -48,8 +59,167 @@ def create_metadata_message(width: int, height: int, fps: int) -> str:
         "height": height,
         "fps": fps
     }
+    if extra:
+        metadata.update(extra)
     return json.dumps(metadata)
 
+def pack_frame_envelope(seq: int, capture_ts: float, detect_ms: float,
+                        encode_ms: float, payload: bytes) -> bytes:
+    """
+    Bungkus payload frame dengan header binary versi FRAME_ENVELOPE_VERSION
+    
+    Args:
+        seq: Sequence number frame
+        capture_ts: Waktu capture (unix timestamp, detik)
+        detect_ms: Durasi deteksi (ms)
+        encode_ms: Durasi encoding (ms)
+        payload: Frame JPEG bytes
+    
+    Returns:
+        Header + payload sebagai bytes
+    """
+    header = FRAME_ENVELOPE_STRUCT.pack(
+        FRAME_ENVELOPE_MAGIC, FRAME_ENVELOPE_VERSION, FRAME_ENVELOPE_STRUCT.size,
+        seq & 0xFFFFFFFF, capture_ts, detect_ms, encode_ms, len(payload)
+    )
+    return header + payload
+
+def unpack_frame_envelope(data: bytes) -> Optional[Tuple[Dict[str, Any], memoryview]]:
+    """
+    Pisahkan header envelope dari payload frame
+    
+    Args:
+        data: Pesan binary dari server
+    
+    Returns:
+        Tuple (header dict, payload), atau None jika bukan envelope yang valid
+    """
+    if len(data) < FRAME_ENVELOPE_STRUCT.size or data[:2] != FRAME_ENVELOPE_MAGIC:
+        return None
+    
+    magic, version, header_size, seq, capture_ts, detect_ms, encode_ms, payload_len = \
+        FRAME_ENVELOPE_STRUCT.unpack_from(data)
+    if header_size < FRAME_ENVELOPE_STRUCT.size or len(data) < header_size + payload_len:
+        return None
+    
+    header = {
+        "version": version,
+        "seq": seq,
+        "capture_ts": capture_ts,
+        "detect_ms": detect_ms,
+        "encode_ms": encode_ms,
+        "payload_len": payload_len
+    }
+    return header, memoryview(data)[header_size:header_size + payload_len]
+
+def create_detections_message(seq: int, heads: list, hat_index: int,
+                              width: int, height: int) -> str:
+    """
+    Buat pesan deteksi kepala dalam format JSON (stream mode raw)
+    
+    Args:
+        seq: Sequence number frame
+        heads: List of (x, y, w, h)
+        hat_index: Index topi yang aktif
+        width: Lebar frame
+        height: Tinggi frame
+    
+    Returns:
+        JSON string deteksi
+    """
+    detections = {
+        "type": "detections",
+        "seq": seq,
+        "boxes": [[int(v) for v in box] for box in heads],
+        "hat_index": hat_index,
+        "width": width,
+        "height": height
+    }
+    return json.dumps(detections, separators=(",", ":"))
+
+def create_stats_message(data: Optional[Dict[str, Any]]) -> str:
+    """
+    Buat pesan statistik server dalam format JSON (balasan pesan "stats")
+    
+    Args:
+        data: Snapshot metric, atau None jika metrics dimatikan
+    
+    Returns:
+        JSON string statistik
+    """
+    stats = {
+        "type": "stats",
+        "enabled": data is not None,
+        "data": data
+    }
+    return json.dumps(stats)
+
+def create_cameras_message(cameras: list, current: str) -> str:
+    """
+    Buat pesan daftar kamera (balasan pesan "subscribe")
+    
+    Args:
+        cameras: Nama kamera yang tersedia
+        current: Nama kamera yang sedang diikuti client
+    
+    Returns:
+        JSON string daftar kamera
+    """
+    return json.dumps({
+        "type": "cameras",
+        "cameras": list(cameras),
+        "current": current
+    })
+
+def create_resume_message(after_seq: int, seqs: list, missing: int) -> str:
+    """
+    Buat pesan balasan "resume" (dikirim sebelum frame dari ring buffer)
+    
+    Args:
+        after_seq: Sequence terakhir yang dimiliki client
+        seqs: Sequence frame yang akan dikirim ulang
+        missing: Jumlah frame setelah after_seq yang sudah tidak ada di buffer
+    
+    Returns:
+        JSON string resume
+    """
+    return json.dumps({
+        "type": "resume",
+        "after_seq": after_seq,
+        "count": len(seqs),
+        "first_seq": seqs[0] if seqs else None,
+        "last_seq": seqs[-1] if seqs else None,
+        "missing": missing
+    })
+
+def get_request_path(websocket: Any) -> str:
+    """
+    Path URL yang diminta client saat handshake (misal "/front")
+    
+    Args:
+        websocket: WebSocket connection
+    
+    Returns:
+        Path request tanpa query string, "/" jika tidak tersedia
+    """
+    request = getattr(websocket, "request", None)
+    path = getattr(request, "path", None) or getattr(websocket, "path", None) or "/"
+    return path.split("?", 1)[0]
+
+def get_request_query(websocket: Any) -> Dict[str, str]:
+    """
+    Parameter query string dari URL handshake (misal "?since=120")
+    
+    Args:
+        websocket: WebSocket connection
+    
+    Returns:
+        Dictionary parameter (nilai terakhir jika parameter berulang)
+    """
+    request = getattr(websocket, "request", None)
+    path = getattr(request, "path", None) or getattr(websocket, "path", None) or "/"
+    return {key: values[-1] for key, values in parse_qs(urlparse(path).query).items()}
+
 def parse_client_message(message: str) -> Dict[str, Any]:
     """
     Parse pesan JSON dari client
@@ -87,6 +257,22 @@ def validate_resolution(width: int, height: int) -> tuple[int, int]:
     
     return width, height
 
+def scale_resolution(width: int, height: int, scale: float) -> tuple[int, int]:
+    """
+    Hitung resolusi frame setelah diperkecil dengan skala adaptif
+    
+    Args:
+        width: Lebar frame asli
+        height: Tinggi frame asli
+        scale: Skala resolusi (0-1)
+    
+    Returns:
+        Tuple (width, height) hasil skala
+    """
+    if scale >= 1.0:
+        return width, height
+    return max(1, int(round(width * scale))), max(1, int(round(height * scale)))
+
 def validate_fps(fps: int) -> int:
     """
     Validasi dan perbaiki FPS
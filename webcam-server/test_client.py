@@ -1,38 +1,455 @@
 #!/usr/bin/env python3
 """
-Test client untuk Webcam WebSocket Server
+Test client dan load generator untuk Webcam WebSocket Server
+
+Tanpa argumen: satu koneksi, terima beberapa frame (smoke test).
+
+Load test:
+    python test_client.py --clients 200 --processes 4 --duration 30
+    python test_client.py --clients 100 --mix fast=0.6,slow=0.2,churn=0.1,storm=0.1
+    python test_client.py --find-ceiling --step 25 --max 500 --min-fps 12
+
+Behaviour client:
+    fast   - baca frame secepat mungkin
+    slow   - tidur --slow-delay detik setelah setiap frame (client lemah / jaringan lambat)
+    churn  - baca frame sambil mengirim perubahan config acak (fps, stream mode, kualitas)
+    storm  - connect, tunggu frame pertama, disconnect, ulangi (mengukur time-to-first-frame)
 """
 
+import argparse
 import asyncio
-import websockets
 import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+import websockets
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server"))
+
+from utils import unpack_frame_envelope  # noqa: E402
+
+BEHAVIOURS = ("fast", "slow", "churn", "storm")
+CLOSE_SERVER_FULL = 1008
 
-async def test_websocket_connection():
-    uri = "ws://localhost:8765"
+
+async def test_websocket_connection(uri: str = "ws://localhost:8765"):
     print(f"Connecting to {uri}...")
-    
+
     try:
         async with websockets.connect(uri) as websocket:
             print("✅ Connected successfully!")
-            
+
             # Wait for metadata message
             message = await websocket.recv()
             if isinstance(message, str):
                 metadata = json.loads(message)
                 print(f"📊 Received metadata: {metadata}")
-            
+
+            # Minta header binary (seq + timestamp) sebelum setiap frame
+            await websocket.send(json.dumps({"type": "config", "data": {"envelope": True}}))
+
             # Receive a few frames
             frame_count = 0
             while frame_count < 3:
                 message = await websocket.recv()
                 if isinstance(message, bytes):
                     frame_count += 1
-                    print(f"🎥 Received frame {frame_count}, size: {len(message)} bytes")
-                
+                    envelope = unpack_frame_envelope(message)
+                    if envelope is None:
+                        print(f"🎥 Received frame {frame_count}, size: {len(message)} bytes")
+                        continue
+
+                    header, payload = envelope
+                    latency_ms = (time.time() - header["capture_ts"]) * 1000.0
+                    print(f"🎥 Received frame {frame_count}, seq: {header['seq']}, "
+                          f"size: {len(payload)} bytes, latency: {latency_ms:.1f} ms "
+                          f"(detect {header['detect_ms']:.1f} ms, encode {header['encode_ms']:.1f} ms)")
+
             print("✅ Test completed successfully!")
-            
+
     except Exception as e:
         print(f"❌ Connection failed: {e}")
 
+
+class ClientResult:
+    """
+    Statistik satu client simulasi
+    """
+
+    def __init__(self, client_id: int, behaviour: str):
+        self.client_id = client_id
+        self.behaviour = behaviour
+        self.connects = 0
+        self.rejected = 0  # Ditolak server (server full)
+        self.disconnects = 0  # Koneksi putus tanpa diminta client
+        self.errors = 0
+        self.frames = 0
+        self.bytes = 0
+        self.missed = 0  # Frame yang seharusnya diterima pada fps client tapi tidak sampai
+        self.rate_skipped = 0  # Celah sequence yang memang dilewati server karena fps client lebih rendah
+        self.config_changes = 0
+        self.active_seconds = 0.0
+        self.intervals = []  # Jarak antar frame (ms)
+        self.latencies = []  # capture -> diterima (ms), dari envelope
+        self.first_frame_ms = []  # connect -> frame pertama (ms)
+        self.last_error = ""
+
+    def record_close(self, error: Exception):
+        """
+        Klasifikasikan penutupan koneksi dari server
+        """
+        received = getattr(error, "rcvd", None)
+        code = getattr(received, "code", None) or getattr(error, "code", None)
+        if code == CLOSE_SERVER_FULL:
+            self.rejected += 1
+        else:
+            self.disconnects += 1
+        self.last_error = str(error)[:120]
+
+    def to_dict(self) -> dict:
+        intervals = np.asarray(self.intervals) if self.intervals else None
+        latencies = np.asarray(self.latencies) if self.latencies else None
+        # Storm hanya menerima frame pertama per koneksi, fps-nya tidak bermakna
+        measured = self.behaviour != "storm" and self.active_seconds
+        return {
+            "client": self.client_id,
+            "behaviour": self.behaviour,
+            "connects": self.connects,
+            "rejected": self.rejected,
+            "disconnects": self.disconnects,
+            "errors": self.errors,
+            "frames": self.frames,
+            "missed": self.missed,
+            "rate_skipped": self.rate_skipped,
+            "bytes": self.bytes,
+            "config_changes": self.config_changes,
+            "fps": round(self.frames / self.active_seconds, 2) if measured else 0.0,
+            "jitter_ms": round(float(intervals.std()), 2) if intervals is not None else None,
+            "interval_p95_ms": round(float(np.percentile(intervals, 95)), 2) if intervals is not None else None,
+            "latency_p50_ms": round(float(np.percentile(latencies, 50)), 2) if latencies is not None else None,
+            "latency_p95_ms": round(float(np.percentile(latencies, 95)), 2) if latencies is not None else None,
+            "latency_p99_ms": round(float(np.percentile(latencies, 99)), 2) if latencies is not None else None,
+            "first_frame_ms": round(float(np.mean(self.first_frame_ms)), 1) if self.first_frame_ms else None,
+            "last_error": self.last_error
+        }
+
+
+def record_frame(result: ClientResult, message: bytes, received_at: float, state: dict):
+    """
+    Catat satu frame binary (dengan atau tanpa envelope)
+    """
+    result.frames += 1
+    if state["last_frame_at"]:
+        result.intervals.append((received_at - state["last_frame_at"]) * 1000.0)
+    state["last_frame_at"] = received_at
+
+    envelope = unpack_frame_envelope(message)
+    if envelope is None:
+        result.bytes += len(message)
+        return
+
+    header, payload = envelope
+    result.bytes += len(payload)
+    result.latencies.append((time.time() - header["capture_ts"]) * 1000.0)
+    gap = header["seq"] - state["last_seq"] - 1
+    if state["last_seq"] and gap > 0:
+        # Server hanya mengirim satu frame per interval fps client; yang
+        # dihitung hilang hanya interval yang terlewat tanpa frame
+        elapsed = header["capture_ts"] - state["last_capture_ts"]
+        interval = max(1.0 / state["fps"] if state["fps"] else 0.0, elapsed / (gap + 1))
+        missed = min(gap, max(0, round(elapsed / interval) - 1)) if interval > 0 else gap
+        result.missed += missed
+        result.rate_skipped += gap - missed
+    state["last_seq"] = header["seq"]
+    state["last_capture_ts"] = header["capture_ts"]
+
+
+def record_metadata(message: str, state: dict):
+    """
+    Catat fps dari pesan meta; celah sequence saat fps berubah tidak dihitung
+    """
+    try:
+        data = json.loads(message)
+    except ValueError:
+        return
+    if data.get("type") == "meta" and data.get("fps") != state["fps"]:
+        state["fps"] = data.get("fps") or 0
+        state["last_seq"] = 0
+
+
+async def run_session(args, result: ClientResult, deadline: float, rng: random.Random,
+                      until_first_frame: bool = False):
+    """
+    Satu koneksi: connect, opt-in envelope, baca frame sesuai behaviour sampai deadline
+    """
+    connect_start = time.perf_counter()
+    async with websockets.connect(args.uri, max_size=None, open_timeout=args.timeout) as websocket:
+        result.connects += 1
+        await websocket.send(json.dumps({"type": "config", "data": {"envelope": True}}))
+        if args.fps:
+            await websocket.send(json.dumps({"type": "config", "data": {"fps": args.fps}}))
+
+        state = {"last_frame_at": 0.0, "last_seq": 0, "last_capture_ts": 0.0, "fps": 0}
+        session_start = time.perf_counter()
+        next_churn = session_start + args.churn_interval
+        try:
+            while True:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return
+                try:
+                    message = await asyncio.wait_for(websocket.recv(), min(remaining, args.timeout))
+                except asyncio.TimeoutError:
+                    if time.perf_counter() < deadline:
+                        result.errors += 1
+                        result.last_error = "frame timeout"
+                    return
+
+                if not isinstance(message, bytes):
+                    record_metadata(message, state)
+                    continue
+
+                received_at = time.perf_counter()
+                if until_first_frame:
+                    result.first_frame_ms.append((received_at - connect_start) * 1000.0)
+                    result.frames += 1
+                    return
+                if state["last_frame_at"] == 0.0:
+                    result.first_frame_ms.append((received_at - connect_start) * 1000.0)
+                record_frame(result, message, received_at, state)
+
+                if result.behaviour == "slow":
+                    await asyncio.sleep(args.slow_delay)
+                elif result.behaviour == "churn" and received_at >= next_churn:
+                    next_churn = received_at + args.churn_interval
+                    await websocket.send(json.dumps({"type": "config", "data": random_config(rng)}))
+                    result.config_changes += 1
+        finally:
+            result.active_seconds += time.perf_counter() - session_start
+
+
+def random_config(rng: random.Random) -> dict:
+    """
+    Perubahan config acak untuk behaviour churn (hanya pengaturan per-client)
+    """
+    choice = rng.randrange(4)
+    if choice == 0:
+        return {"fps": rng.choice((5, 10, 15, 30))}
+    if choice == 1:
+        return {"stream_mode": rng.choice(("overlay", "raw"))}
+    if choice == 2:
+        return {"jpeg_quality": rng.choice((50, 70, 80, 90))}
+    return {"adaptive_quality": rng.choice((True, False))}
+
+
+async def run_client(args, client_id: int, behaviour: str, start_delay: float, deadline: float) -> dict:
+    """
+    Jalankan satu client simulasi sampai deadline
+    """
+    result = ClientResult(client_id, behaviour)
+    rng = random.Random(args.seed * 100003 + client_id)
+    await asyncio.sleep(start_delay)
+
+    while time.perf_counter() < deadline:
+        try:
+            await run_session(args, result, deadline, rng, until_first_frame=(behaviour == "storm"))
+            if behaviour != "storm":
+                break
+            await asyncio.sleep(rng.uniform(0, args.storm_pause))
+        except websockets.exceptions.ConnectionClosed as e:
+            result.record_close(e)
+            if result.rejected and not args.retry:
+                break
+            await asyncio.sleep(args.reconnect_delay)
+        except Exception as e:
+            result.errors += 1
+            result.last_error = f"{type(e).__name__}: {e}"[:120]
+            await asyncio.sleep(args.reconnect_delay)
+
+    return result.to_dict()
+
+
+def assign_behaviours(count: int, mix: dict) -> list:
+    """
+    Bagi behaviour ke client sesuai proporsi mix (deterministik)
+    """
+    total = sum(mix.values()) or 1.0
+    behaviours = []
+    for name, weight in mix.items():
+        behaviours += [name] * int(round(count * weight / total))
+    behaviours = (behaviours + ["fast"] * count)[:count]
+    return behaviours
+
+
+async def run_clients_async(args, client_ids: list, behaviours: list) -> list:
+    deadline = time.perf_counter() + args.ramp + args.duration
+    tasks = []
+    for client_id, behaviour in zip(client_ids, behaviours):
+        start_delay = args.ramp * client_id / max(1, args.clients)
+        tasks.append(run_client(args, client_id, behaviour, start_delay, deadline))
+    return await asyncio.gather(*tasks)
+
+
+def run_clients_process(payload) -> list:
+    """
+    Entry point worker process
+    """
+    args, client_ids, behaviours = payload
+    return asyncio.run(run_clients_async(args, client_ids, behaviours))
+
+
+def run_round(args) -> list:
+    """
+    Jalankan satu putaran load test, dibagi ke beberapa process
+
+    Returns:
+        List statistik per-client
+    """
+    behaviours = assign_behaviours(args.clients, args.mix)
+    ids = list(range(args.clients))
+    processes = max(1, min(args.processes, args.clients))
+    if processes == 1:
+        return asyncio.run(run_clients_async(args, ids, behaviours))
+
+    chunks = [(args, ids[i::processes], behaviours[i::processes]) for i in range(processes)]
+    with multiprocessing.get_context("spawn").Pool(processes) as pool:
+        results = pool.map(run_clients_process, chunks)
+    return sorted((r for chunk in results for r in chunk), key=lambda r: r["client"])
+
+
+def summarize(results: list, args) -> dict:
+    """
+    Ringkasan seluruh client
+    """
+    served = [r for r in results if r["frames"] > 0 and r["behaviour"] != "storm"]
+    fps = np.asarray([r["fps"] for r in served]) if served else np.zeros(1)
+    latencies = [r["latency_p50_ms"] for r in served if r["latency_p50_ms"] is not None]
+    jitter = [r["jitter_ms"] for r in served if r["jitter_ms"] is not None]
+    first_frame = [r["first_frame_ms"] for r in results if r["first_frame_ms"] is not None]
+    return {
+        "clients": len(results),
+        "served": len(served),
+        "rejected_clients": sum(1 for r in results if r["rejected"] and not r["frames"]),
+        "connects": sum(r["connects"] for r in results),
+        "disconnects": sum(r["disconnects"] for r in results),
+        "errors": sum(r["errors"] for r in results),
+        "missed": sum(r["missed"] for r in results),
+        "rate_skipped": sum(r["rate_skipped"] for r in results),
+        "total_fps": round(float(sum(r["fps"] for r in served)), 1),
+        "fps_mean": round(float(fps.mean()), 2),
+        "fps_p5": round(float(np.percentile(fps, 5)), 2),
+        "fps_min": round(float(fps.min()), 2),
+        "latency_p50_ms": round(float(np.median(latencies)), 1) if latencies else None,
+        "latency_p95_ms": round(float(np.percentile(latencies, 95)), 1) if latencies else None,
+        "jitter_ms_mean": round(float(np.mean(jitter)), 2) if jitter else None,
+        "first_frame_ms_mean": round(float(np.mean(first_frame)), 1) if first_frame else None,
+        "mbit_per_s": round(sum(r["bytes"] for r in results) * 8 / 1e6 / max(args.duration, 1e-6), 2)
+    }
+
+
+def print_report(results: list, summary: dict, per_client: bool):
+    if per_client:
+        print(f"{'id':>4} {'behaviour':<7} {'fps':>6} {'jitter':>7} {'lat p50':>8} {'lat p95':>8} "
+              f"{'missed':>6} {'skip':>5} {'conn':>4} {'disc':>4} {'rej':>4} {'err':>4}")
+        for r in results:
+            def fmt(value, width):
+                return f"{value:>{width}.1f}" if value is not None else f"{'-':>{width}}"
+            print(f"{r['client']:>4} {r['behaviour']:<7} {r['fps']:>6.1f} {fmt(r['jitter_ms'], 7)} "
+                  f"{fmt(r['latency_p50_ms'], 8)} {fmt(r['latency_p95_ms'], 8)} {r['missed']:>6} {r['rate_skipped']:>5} "
+                  f"{r['connects']:>4} {r['disconnects']:>4} {r['rejected']:>4} {r['errors']:>4}")
+    print(f"📊 {summary['clients']} clients, {summary['served']} served, "
+          f"{summary['rejected_clients']} rejected, {summary['disconnects']} disconnects, {summary['errors']} errors, "
+          f"{summary['missed']} frames missed ({summary['rate_skipped']} skipped for lower client fps)")
+    print(f"   fps mean {summary['fps_mean']}, p5 {summary['fps_p5']}, min {summary['fps_min']}, "
+          f"total {summary['total_fps']} | latency p50 {summary['latency_p50_ms']} ms, p95 {summary['latency_p95_ms']} ms "
+          f"| jitter {summary['jitter_ms_mean']} ms | {summary['mbit_per_s']} Mbit/s")
+
+
+def find_ceiling(args) -> list:
+    """
+    Naikkan jumlah client per putaran sampai client terlemah (p5) jatuh di
+    bawah --min-fps atau server mulai menolak/memutus client
+
+    Returns:
+        List ringkasan per putaran
+    """
+    rounds = []
+    count = args.step
+    while count <= args.max:
+        args.clients = count
+        results = run_round(args)
+        summary = summarize(results, args)
+        rounds.append(summary)
+        print_report(results, summary, per_client=False)
+
+        failed = (summary["fps_p5"] < args.min_fps or summary["rejected_clients"] or
+                  summary["disconnects"] or summary["errors"])
+        if failed:
+            healthy = rounds[-2]["clients"] if len(rounds) > 1 else 0
+            print(f"🚧 Ceiling reached: {count} clients failed, last healthy round: {healthy} clients")
+            break
+        count += args.step
+    else:
+        print(f"✅ No ceiling found up to {args.max} clients")
+    return rounds
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in BEHAVIOURS:
+            raise argparse.ArgumentTypeError(f"Unknown behaviour: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Webcam WebSocket test client and load generator")
+    parser.add_argument("--uri", default="ws://localhost:8765")
+    parser.add_argument("--clients", type=int, help="Concurrent clients (enables load test mode)")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes to spread clients over")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds each round measures")
+    parser.add_argument("--ramp", type=float, default=2.0, help="Seconds over which clients connect")
+    parser.add_argument("--mix", type=parse_mix, default={"fast": 1.0},
+                        help="Behaviour mix, e.g. fast=0.7,slow=0.2,churn=0.1")
+    parser.add_argument("--fps", type=int, default=0, help="Requested fps per client (0 = server default)")
+    parser.add_argument("--slow-delay", type=float, default=0.25, help="Sleep per frame for slow clients")
+    parser.add_argument("--churn-interval", type=float, default=1.0, help="Seconds between churn config changes")
+    parser.add_argument("--storm-pause", type=float, default=0.5, help="Max pause between storm reconnects")
+    parser.add_argument("--reconnect-delay", type=float, default=0.5)
+    parser.add_argument("--retry", action="store_true", help="Keep retrying after the server rejects a client")
+    parser.add_argument("--timeout", type=float, default=5.0, help="Connect / frame timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--find-ceiling", action="store_true", help="Ramp client count until clients starve")
+    parser.add_argument("--step", type=int, default=10, help="Clients added per ceiling round")
+    parser.add_argument("--max", type=int, default=500, help="Maximum clients for the ceiling search")
+    parser.add_argument("--min-fps", type=float, default=10.0, help="Ceiling: minimum p5 fps per client")
+    parser.add_argument("--per-client", action="store_true", help="Always print the per-client table")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    if args.find_ceiling:
+        report = {"rounds": find_ceiling(args)}
+    elif args.clients:
+        results = run_round(args)
+        summary = summarize(results, args)
+        print_report(results, summary, per_client=args.per_client or len(results) <= 50)
+        report = {"summary": summary, "clients": results}
+    else:
+        asyncio.run(test_websocket_connection(args.uri))
+        return
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Results written to {args.json}")
+
+
 if __name__ == "__main__":
-    asyncio.run(test_websocket_connection())
\ No newline at end of file
+    main()
@@ -0,0 +1,46 @@
+"""
+Test batas memori FrameRingBuffer
+"""
+
+from frame_buffer import FrameRingBuffer
+from pipeline import FramePacket
+
+JPEG = ("overlay", "jpeg", 80, 1.0)
+BGR = ("overlay", "bgr", 80, 1.0)
+
+
+def packet(seq: int, encoded: dict) -> FramePacket:
+    return FramePacket(seq=seq, capture_ts=0.0, width=1920, height=1080, encoded=encoded)
+
+
+def test_uncompressed_variants_are_not_buffered():
+    buffer = FrameRingBuffer(capacity=4, slot_bytes=1024, max_bytes=4 * 1024 * 1024)
+    frame = buffer.put(packet(1, {JPEG: b"j" * 5000, BGR: b"b" * (1920 * 1080 * 3)}))
+
+    assert bytes(frame.view(JPEG)) == b"j" * 5000
+    assert frame.view(BGR) is None
+    assert buffer.get_stats()["skipped_variants"] == 1
+
+
+def test_arena_bytes_stay_within_max_bytes():
+    buffer = FrameRingBuffer(capacity=8, slot_bytes=1024, max_bytes=1024 * 1024)  # Jatah slot 128 KB
+    for seq in range(1, 37):
+        # Payload membesar terus; arena tidak boleh tumbuh melewati jatah slot
+        buffer.put(packet(seq, {JPEG: bytes(seq * 4 * 1024)}))
+
+    stats = buffer.get_stats()
+    assert stats["arena_bytes"] <= stats["max_bytes"]
+    assert len(buffer.get(32).view(JPEG)) == 128 * 1024
+    assert buffer.get(33).view(JPEG) is None  # 132 KB > jatah slot
+    assert stats["skipped_variants"] == 4
+
+
+def test_arena_is_reused_after_warmup():
+    buffer = FrameRingBuffer(capacity=4, slot_bytes=1024, max_bytes=4 * 1024 * 1024)
+    for seq in range(1, 5):
+        buffer.put(packet(seq, {JPEG: bytes(100 * 1024)}))
+    growths = buffer.get_stats()["arena_growths"]
+    for seq in range(5, 41):
+        buffer.put(packet(seq, {JPEG: bytes(90 * 1024 + seq)}))
+
+    assert buffer.get_stats()["arena_growths"] == growths
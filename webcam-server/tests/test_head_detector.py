@@ -0,0 +1,61 @@
+"""
+Test mode deteksi HeadDetector pada frame sintetis (cascade opencv_default
+mengenali wajah sintetis)
+"""
+
+import math
+
+import cv2
+import pytest
+
+from frame_sources import create_frame_source
+from head_detector import HeadDetector
+
+
+def synthetic_frames(count: int, heads: int = 2, width: int = 1280, height: int = 720) -> list:
+    source = create_frame_source("synthetic", fps=30, heads=heads, seed=0)
+    source.pace = False
+    source.open(width, height)
+    frames = [source.read()[1] for _ in range(count)]
+    source.release()
+    return frames
+
+
+@pytest.fixture
+def detector():
+    detector = HeadDetector()
+    if not detector.set_cascade(HeadDetector.CASCADE_OPENCV_DEFAULT):
+        pytest.skip("opencv_default cascade not available")
+    return detector
+
+
+@pytest.fixture(scope="module")
+def frame():
+    return synthetic_frames(1)[0]
+
+
+@pytest.mark.parametrize("mode", HeadDetector.DETECTION_MODES)
+def test_first_frame_after_mode_switch_has_detections(detector, frame, mode):
+    detector.set_detection_mode(HeadDetector.MODE_FULL)
+    expected = len(detector.detect_heads(frame))
+    assert expected == 2
+
+    detector.set_detection_mode(mode)
+    assert len(detector.detect_heads(frame)) == expected
+
+
+@pytest.mark.parametrize("mode", HeadDetector.DETECTION_MODES)
+def test_first_frame_after_resolution_change_has_detections(detector, frame, mode):
+    detector.set_detection_mode(mode)
+    detector.detect_heads(frame)
+    assert len(detector.detect_heads(cv2.resize(frame, (640, 360)))) == 2
+
+
+def test_track_mode_keeps_keyframe_interval_without_heads(detector):
+    frames = synthetic_frames(25, heads=0)
+    detector.set_detection_mode(HeadDetector.MODE_TRACK)
+    for empty in frames:
+        assert detector.detect_heads(empty) == []
+
+    expected = math.ceil(len(frames) / detector.track_keyframe_interval)
+    assert detector.detection_stats["full_scans"] == expected
@@ -0,0 +1,45 @@
+"""
+Test stage encode FramePipeline
+"""
+
+import threading
+import time
+
+import numpy as np
+
+from camera import Camera
+from frame_sources import create_frame_source
+from pipeline import FramePacket, FramePipeline
+
+
+def test_render_failure_on_static_reuse_does_not_stop_encode_stage():
+    camera = Camera(source=create_frame_source("synthetic", heads=0))
+    delivered = []
+    pipeline = FramePipeline(camera, delivered.append)
+
+    def failing_render(packet):
+        raise RuntimeError("overlay failed")
+
+    pipeline._render = failing_render
+    variant = (Camera.STREAM_OVERLAY, "jpeg", 80, 1.0)
+    frame = np.zeros((48, 64, 3), np.uint8)
+
+    thread = threading.Thread(target=pipeline._encode_loop, daemon=True)
+    thread.start()
+    try:
+        # Frame referensi tidak pernah ter-encode: fallback render di encode stage
+        pipeline.encode_queue.put(FramePacket(seq=2, capture_ts=time.time(), width=64, height=48,
+                                              frame=frame.copy(), variants=(variant,), reuse_of=1))
+        deadline = time.monotonic() + 2.0
+        while pipeline.encode_failures == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        pipeline.encode_queue.put(FramePacket(seq=3, capture_ts=time.time(), width=64, height=48,
+                                              frame=frame.copy(), variants=(variant,)))
+        while not delivered and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        pipeline._stop_event.set()
+        thread.join(2.0)
+
+    assert pipeline.encode_failures == 1
+    assert [packet.seq for packet in delivered] == [3]
@@ -0,0 +1,32 @@
+"""
+Test pemrosesan frame UploadSession
+"""
+
+import cv2
+import numpy as np
+
+from camera import Camera
+from encoders import decode_frame
+from head_detector import HeadDetector
+from upload import UploadSession, UploadWorkerPool
+
+
+def process(variant: tuple):
+    session = UploadSession(UploadWorkerPool(1), None)
+    session.head_detector = HeadDetector()
+    _, jpeg = cv2.imencode(".jpg", np.zeros((480, 640, 3), np.uint8))
+    return session._process(jpeg.tobytes(), 0.0, 1, variant)
+
+
+def test_overlay_result_follows_variant_scale():
+    result = process((Camera.STREAM_OVERLAY, "jpeg", 80, 0.5))
+
+    assert (result.width, result.height) == (320, 240)
+    assert decode_frame(result.payload).shape[:2] == (240, 320)
+
+
+def test_raw_result_keeps_upload_resolution():
+    result = process((Camera.STREAM_RAW, "jpeg", 80, 0.5))
+
+    assert (result.width, result.height) == (640, 480)
+    assert result.payload is None
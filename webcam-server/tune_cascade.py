@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Tuning parameter cascade (scale_factor, min_neighbors, min_size) per tipe
+cascade pada set frame berlabel: ukur recall, precision, dan ms/frame, cetak
+Pareto front, lalu tulis profil deteksi bernama ke models/detection_profiles.json
+yang dimuat HeadDetector saat startup.
+
+Label berupa file JSON atau CSV berisi box kepala (x, y, w, h) per gambar,
+misalnya frame BIWI yang box-nya sudah diekstrak atau frame rekaman dengan box
+tersimpan:
+
+    JSON: {"frame_0001.png": [[x, y, w, h], ...], "frame_0002.png": [], ...}
+    CSV:  image,x,y,w,h  (satu baris per box; baris tanpa koordinat = frame tanpa kepala)
+
+Tanpa --labels, frame diambil dari sumber sintetis dengan ground truth
+get_head_boxes() (hanya cascade opencv_default yang mengenali wajah sintetis).
+
+Contoh:
+    python tune_cascade.py --labels frames/labels.json --output sweep.json --write
+    python tune_cascade.py --synthetic-frames 40 --cascades opencv_default --write --active fast
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server"))
+
+from config import DETECTION_MAX_DIMENSION  # noqa: E402
+from frame_sources import create_frame_source  # noqa: E402
+from head_detector import HeadDetector  # noqa: E402
+from shared_models import PROFILES_PATH  # noqa: E402
+
+CASCADES = (HeadDetector.CASCADE_HAAR_BIWI, HeadDetector.CASCADE_LBP_BIWI, HeadDetector.CASCADE_OPENCV_DEFAULT)
+SCALE_FACTORS = (1.05, 1.1, 1.15, 1.2, 1.3)
+MIN_NEIGHBORS = (2, 3, 4, 5, 6)
+MIN_SIZES = ("40", "60", "80", "100")
+
+# Nama profil -> rasio F1 minimum terhadap F1 terbaik; dipilih titik Pareto tercepat yang memenuhi
+PROFILE_RATIOS = {"accurate": 1.0, "balanced": 0.95, "fast": 0.8}
+
+
+def parse_size(text: str) -> tuple:
+    """
+    "60" -> (60, 60), "60x75" -> (60, 75)
+    """
+    if "x" in text.lower():
+        width, height = text.lower().split("x")
+        return int(width), int(height)
+    return int(text), int(text)
+
+
+def parse_resolution(text: str) -> tuple:
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def load_labels(path: str, image_dir: str) -> list:
+    """
+    Baca frame berlabel dari file JSON atau CSV
+
+    Returns:
+        List (nama, frame BGR, list box ground truth)
+    """
+    boxes = {}
+    if path.lower().endswith(".csv"):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                entry = boxes.setdefault(row["image"], [])
+                if row.get("x") not in (None, ""):
+                    entry.append(tuple(int(float(row[key])) for key in ("x", "y", "w", "h")))
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            data = {item["image"]: item.get("boxes", []) for item in data}
+        for name, items in data.items():
+            boxes[name] = [tuple(int(v) for v in box) for box in items]
+
+    frames = []
+    for name, items in boxes.items():
+        frame = cv2.imread(os.path.join(image_dir, name), cv2.IMREAD_COLOR)
+        if frame is None:
+            print(f"⚠️  Cannot read {name}, skipped")
+            continue
+        frames.append((name, frame, items))
+    return frames
+
+
+def synthetic_frames(args) -> list:
+    """
+    Frame dari sumber sintetis dengan ground truth posisi kepala
+
+    Returns:
+        List (nama, frame BGR, list box ground truth)
+    """
+    source = create_frame_source("synthetic", fps=30, heads=args.heads, seed=args.seed)
+    source.pace = False
+    source.open(*parse_resolution(args.resolution))
+    frames = []
+    try:
+        for index in range(args.synthetic_frames * args.stride):
+            ok, frame = source.read()
+            if not ok:
+                break
+            if index % args.stride == 0:
+                frames.append((f"synthetic_{index:05d}", frame, source.get_head_boxes(index)))
+    finally:
+        source.release()
+    return frames
+
+
+def iou(a: tuple, b: tuple) -> float:
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+def match(detections: list, truths: list, threshold: float) -> tuple:
+    """
+    Pasangkan deteksi ke ground truth secara greedy berdasarkan IoU tertinggi
+
+    Returns:
+        Tuple (true positive, false positive, false negative)
+    """
+    pairs = sorted(((iou(d, t), i, j) for i, d in enumerate(detections) for j, t in enumerate(truths)),
+                   reverse=True)
+    used_d, used_t = set(), set()
+    for score, i, j in pairs:
+        if score < threshold:
+            break
+        if i in used_d or j in used_t:
+            continue
+        used_d.add(i)
+        used_t.add(j)
+    tp = len(used_d)
+    return tp, len(detections) - tp, len(truths) - tp
+
+
+def evaluate(detector: HeadDetector, prepared: list, scale_factor: float, min_neighbors: int,
+             min_size: tuple, threshold: float) -> dict:
+    """
+    Jalankan satu kombinasi parameter pada semua frame (deteksi full-frame,
+    resolusi deteksi sama dengan server)
+
+    Returns:
+        Dictionary recall, precision, F1, dan ms/frame
+    """
+    detector.scale_factor = scale_factor
+    detector.min_neighbors = min_neighbors
+    detector.min_size = min_size
+
+    tp = fp = fn = 0
+    timings = []
+    for gray, scale, truths in prepared:
+        start = time.perf_counter()
+        found = detector.detect_heads_gray(gray, scale)
+        timings.append((time.perf_counter() - start) * 1000.0)
+        result = match(found, truths, threshold)
+        tp, fp, fn = tp + result[0], fp + result[1], fn + result[2]
+
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    # Tanpa deteksi sama sekali precision dianggap 0 (kecuali memang tidak ada kepala berlabel)
+    precision = tp / (tp + fp) if tp + fp else float(tp + fn == 0)
+    f1 = 2 * recall * precision / (recall + precision) if recall + precision else 0.0
+    data = np.asarray(timings, dtype=np.float64)
+    return {
+        "scale_factor": scale_factor,
+        "min_neighbors": min_neighbors,
+        "min_size": list(min_size),
+        "recall": round(recall, 4),
+        "precision": round(precision, 4),
+        "f1": round(f1, 4),
+        "tp": tp,
+        "fp": fp,
+        "fn": fn,
+        "ms_per_frame": round(float(data.mean()), 3),
+        "ms_p95": round(float(np.percentile(data, 95)), 3)
+    }
+
+
+def pareto_front(results: list) -> list:
+    """
+    Titik yang tidak didominasi (recall dan precision lebih tinggi, ms lebih rendah)
+
+    Returns:
+        List hasil, urut dari yang tercepat
+    """
+    def dominates(a, b):
+        better_or_equal = (a["recall"] >= b["recall"] and a["precision"] >= b["precision"]
+                           and a["ms_per_frame"] <= b["ms_per_frame"])
+        strictly = (a["recall"] > b["recall"] or a["precision"] > b["precision"]
+                    or a["ms_per_frame"] < b["ms_per_frame"])
+        return better_or_equal and strictly
+
+    front = [r for r in results if not any(dominates(other, r) for other in results)]
+    return sorted(front, key=lambda r: r["ms_per_frame"])
+
+
+def choose_profiles(front: list, ratios: dict) -> dict:
+    """
+    Pilih satu titik Pareto per profil: tercepat dengan F1 >= rasio * F1 terbaik
+
+    Returns:
+        Mapping nama profil -> hasil
+    """
+    best_f1 = max(r["f1"] for r in front)
+    chosen = {}
+    for name, ratio in ratios.items():
+        candidates = [r for r in front if r["f1"] >= ratio * best_f1 - 1e-9]
+        chosen[name] = min(candidates, key=lambda r: (r["ms_per_frame"], -r["f1"]))
+    return chosen
+
+
+def print_result(result: dict, prefix: str = ""):
+    size = "x".join(str(v) for v in result["min_size"])
+    print(f"{prefix}sf={result['scale_factor']:<5} mn={result['min_neighbors']:<2} min={size:<8} "
+          f"recall={result['recall']:.3f} precision={result['precision']:.3f} f1={result['f1']:.3f} "
+          f"{result['ms_per_frame']:7.2f} ms/frame", flush=True)
+
+
+def write_profiles(path: str, chosen: dict, active: str, meta: dict):
+    """
+    Gabungkan profil hasil tuning ke file profil (entri cascade lain dipertahankan)
+    """
+    data = {"active": active, "profiles": {}}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        data["active"] = active
+
+    for cascade, profiles in chosen.items():
+        for name, result in profiles.items():
+            data["profiles"].setdefault(name, {})[cascade] = {
+                key: result[key] for key in ("scale_factor", "min_neighbors", "min_size",
+                                             "recall", "precision", "ms_per_frame")
+            }
+    data.setdefault("tuning", {}).update({cascade: meta for cascade in chosen})
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+    print(f"\n✓ Profiles {', '.join(PROFILE_RATIOS)} written to {path} (active: {active})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep cascade parameters and write detection profiles")
+    parser.add_argument("--labels", help="JSON/CSV file with head boxes per image (default: synthetic frames)")
+    parser.add_argument("--image-dir", help="Directory of the labeled images (default: next to --labels)")
+    parser.add_argument("--synthetic-frames", type=int, default=40, help="Frames from the synthetic source")
+    parser.add_argument("--stride", type=int, default=7, help="Keep every Nth synthetic frame")
+    parser.add_argument("--heads", type=int, default=2, help="Heads in the synthetic source")
+    parser.add_argument("--resolution", default="640x480", help="Synthetic source resolution")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cascades", nargs="+", default=list(CASCADES))
+    parser.add_argument("--scale-factors", nargs="+", type=float, default=list(SCALE_FACTORS))
+    parser.add_argument("--min-neighbors", nargs="+", type=int, default=list(MIN_NEIGHBORS))
+    parser.add_argument("--min-sizes", nargs="+", default=list(MIN_SIZES),
+                        help="Minimum head size in frame pixels (N or WxH)")
+    parser.add_argument("--detection-max-dimension", type=int, default=DETECTION_MAX_DIMENSION,
+                        help="Detection resolution, same meaning as in config.py")
+    parser.add_argument("--iou", type=float, default=0.4, help="IoU needed to count a detection as a hit")
+    parser.add_argument("--active", choices=tuple(PROFILE_RATIOS), default="balanced",
+                        help="Profile HeadDetector starts with")
+    parser.add_argument("--write", nargs="?", const=PROFILES_PATH,
+                        help=f"Write profiles to this file (default: {os.path.normpath(PROFILES_PATH)})")
+    parser.add_argument("--output", help="Write the full sweep as JSON to this file")
+    args = parser.parse_args()
+
+    if args.labels:
+        frames = load_labels(args.labels, args.image_dir or os.path.dirname(os.path.abspath(args.labels)))
+        dataset = os.path.abspath(args.labels)
+    else:
+        frames = synthetic_frames(args)
+        dataset = f"synthetic heads={args.heads} seed={args.seed} {args.resolution}"
+    if not frames:
+        raise SystemExit("❌ No labeled frames")
+
+    detector = HeadDetector()
+    detector.detection_max_dimension = args.detection_max_dimension
+    detector.set_detection_mode(HeadDetector.MODE_FULL)
+    cascades = [c for c in args.cascades if c in detector.cascades]
+    missing = set(args.cascades) - set(cascades)
+    if missing:
+        print(f"⚠️  Cascades not available, skipped: {', '.join(sorted(missing))}")
+
+    # Grayscale + resize tidak bergantung pada parameter cascade, cukup sekali
+    prepared = []
+    for _, frame, truths in frames:
+        gray, scale = detector.prepare_gray(frame)
+        prepared.append((gray, scale, truths))
+    total_heads = sum(len(truths) for _, _, truths in frames)
+    print(f"{len(frames)} frames, {total_heads} labeled heads ({dataset})")
+
+    min_sizes = [parse_size(text) for text in args.min_sizes]
+    meta = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "opencv": cv2.__version__,
+        "dataset": dataset,
+        "frames": len(frames),
+        "heads": total_heads,
+        "iou": args.iou,
+        "detection_max_dimension": args.detection_max_dimension
+    }
+    sweep = {"meta": meta, "cascades": {}}
+    chosen = {}
+
+    for cascade in cascades:
+        detector.set_cascade(cascade)
+        results = []
+        for scale_factor in args.scale_factors:
+            for min_neighbors in args.min_neighbors:
+                for min_size in min_sizes:
+                    results.append(evaluate(detector, prepared, scale_factor, min_neighbors,
+                                            min_size, args.iou))
+        front = pareto_front(results)
+        sweep["cascades"][cascade] = {"results": results, "pareto_front": front}
+
+        print(f"\n{cascade}: {len(results)} combinations, Pareto front:")
+        for result in front:
+            print_result(result, "  ")
+
+        if max(r["f1"] for r in front) <= 0.0:
+            print(f"⚠️  {cascade} found no labeled heads, no profile written for it")
+            continue
+        chosen[cascade] = choose_profiles(front, PROFILE_RATIOS)
+        sweep["cascades"][cascade]["profiles"] = chosen[cascade]
+        for name, result in chosen[cascade].items():
+            print_result(result, f"  {name:>9}: ")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(sweep, f, indent=2)
+        print(f"\nSweep written to {args.output}")
+
+    if args.write:
+        if not chosen:
+            raise SystemExit("❌ No cascade produced a usable profile, nothing written")
+        write_profiles(args.write, chosen, args.active, meta)
+
+
+if __name__ == "__main__":
+    main()